@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -28,6 +29,10 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Worker processes serving the app, exported by gunicorn.conf.py. Caches
+# with the 'local' backend aren't shared between them.
+WORKER_PROCESSES = int(os.environ.get('WEB_CONCURRENCY', 1))
+
 
 # Application definition
 
@@ -46,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,16 +85,74 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# core.db.postgresql adds connection health checks and an optional
+# in-process pool to Django's PostgreSQL backend, see core.db.mixins
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # keep connections between requests, testing them before reuse
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# DB_POOL_SIZE switches to a pool of that many connections per worker
+# process; requests then hand their connection back when they finish
+if int(os.environ.get('DB_POOL_SIZE', 0)):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': int(os.environ['DB_POOL_SIZE']),
+        'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+    }
+
+# Read replicas of the default database: DB_REPLICA_HOSTS is a comma
+# separated list of hosts. Safe-method API reads go to a random replica,
+# see core.db.routers; tests read the default database instead.
+for _i, _host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica{_i}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Django cache that every worker process reaches, used by the 'shared'
+# backends below. Memcached at MEMCACHED_LOCATION when set, which needs
+# pymemcache; otherwise a table of the default database, created with
+# ``manage.py createcachetable``.
+if os.environ.get('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ['MEMCACHED_LOCATION'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'core_cache',
+        }
+    }
+
+# After a write, a user's reads stay on the primary for TIMEOUT seconds,
+# which should exceed the replication lag. Use the 'shared' backend when
+# several worker processes serve the same users; with the 'local' backend
+# and more than one worker, every read goes to the primary.
+REPLICA_PIN = {
+    'BACKEND': os.environ.get('REPLICA_PIN_BACKEND', 'local'),
+    'TIMEOUT': int(os.environ.get('REPLICA_PIN_SECONDS', 5)),
+    'MAX_SIZE': 100000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -108,6 +172,41 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+
+# The first hasher hashes new passwords; passwords stored with any of the
+# others verify and are rehashed with the first one on the next login.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if importlib.util.find_spec('bcrypt'):
+    PASSWORD_HASHERS.insert(0, 'core.hashers.TunedBCryptSHA256PasswordHasher')
+if importlib.util.find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, 'core.hashers.TunedArgon2PasswordHasher')
+
+_preferred_hasher = {
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}.get(os.environ.get('PASSWORD_HASHER'))
+if _preferred_hasher in PASSWORD_HASHERS:
+    PASSWORD_HASHERS.remove(_preferred_hasher)
+    PASSWORD_HASHERS.insert(0, _preferred_hasher)
+
+PASSWORD_HASHER_COST = {
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+    'BCRYPT_ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 12)),
+}
+
+# Logins verify passwords in a bounded thread pool, see core.hashers
+AUTHENTICATION_BACKENDS = ['core.backends.PooledModelBackend']
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -135,5 +234,85 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+# JSON_BACKEND=orjson swaps DRF's JSON renderer and parser for the faster
+# ones in core.renderers, when orjson is installed
+if (os.environ.get('JSON_BACKEND') == 'orjson'
+        and importlib.util.find_spec('orjson')):
+    _json_renderer = 'core.renderers.ORJSONRenderer'
+    _json_parser = 'core.renderers.ORJSONParser'
+else:
+    _json_renderer = 'rest_framework.renderers.JSONRenderer'
+    _json_parser = 'rest_framework.parsers.JSONParser'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        _json_renderer,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        _json_parser,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # token bucket capacity and refill per period, see core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'token': os.environ.get('THROTTLE_TOKEN_RATE', '20/min'),
+        'user_create': os.environ.get(
+            'THROTTLE_USER_CREATE_RATE', '20/hour'
+        ),
+        'recipe_read': os.environ.get(
+            'THROTTLE_RECIPE_READ_RATE', '1200/min'
+        ),
+        'recipe_write': os.environ.get(
+            'THROTTLE_RECIPE_WRITE_RATE', '300/min'
+        ),
+    },
+}
+
+# Per view timings of DB queries, serialization and rendering, see
+# core.middleware.RequestTimingMiddleware. Disabled it is dropped from
+# the middleware stack; enabled it times a SAMPLE_RATE fraction of the
+# requests and aggregates them at /api/metrics/timings/.
+REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0.1)),
+    'SERVER_TIMING': os.environ.get('REQUEST_TIMING_HEADER', '1') == '1',
+}
+
+# Token buckets of the API throttles. 'local' keeps them in each worker
+# process; 'shared' keeps them in the Django cache ALIAS so every worker
+# counts against the same budget, at a cache round trip per request.
+THROTTLE_BUCKETS = {
+    'BACKEND': os.environ.get('THROTTLE_BACKEND', 'local'),
+    'ALIAS': 'default',
+    'MAX_KEYS': 100000,
+}
+
+# Serve recipe API reads from async views, see recipe.async_views. Only
+# worth it under ASGI, e.g. with the uvicorn workers in gunicorn.conf.py
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+# Cache of authenticated API tokens, see core.cache.build_cache. Token
+# and user changes must reach every worker at once, so several workers
+# default to the 'shared' backend; a 'local' one then caches nothing.
+TOKEN_AUTH_CACHE = {
+    'BACKEND': os.environ.get(
+        'TOKEN_AUTH_CACHE_BACKEND',
+        'local' if WORKER_PROCESSES <= 1 else 'shared'
+    ),
+    'TIMEOUT': int(os.environ.get('TOKEN_AUTH_CACHE_TIMEOUT', 300)),
+    'MAX_SIZE': 10000,
+}
+
+# Cache of rendered recipe API responses, keyed by their ETag
+RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'local'),
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 600)),
+    'MAX_SIZE': int(os.environ.get('RESPONSE_CACHE_MAX_SIZE', 2000)),
+}
+
 # EMAIL_HOST_USER = os.environ.get('TEST_EMAIL')
 # EMAIL_HOST_PASS = os.environ.get('TEST_EMAIL_PASS')
\ No newline at end of file
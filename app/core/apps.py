@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # connect the signal handlers of each module
+        from core import (  # noqa: F401
+            authentication, cache, changes, search, signals, stats,
+            throttling
+        )
@@ -0,0 +1,84 @@
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import named_cache, serves_every_worker
+
+
+def get_token_cache():
+    '''Return the cache of authenticated tokens, see TOKEN_AUTH_CACHE'''
+    return named_cache('TOKEN_AUTH_CACHE', key_prefix='auth:')
+
+
+def _token_key(key):
+    return f'token:{key}'
+
+
+def _user_key(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_token(key):
+    '''Remove a token from the authentication cache'''
+    get_token_cache().delete(_token_key(key))
+
+
+def invalidate_user(user_id):
+    '''Remove the cached token of a user from the authentication cache'''
+    cache = get_token_cache()
+    key = cache.get(_user_key(user_id))
+    if key is not None:
+        cache.delete_many([_token_key(key), _user_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''Token authentication that caches the token and user lookup
+
+    Drop-in replacement for ``TokenAuthentication``. A successful lookup
+    is cached by token key, so later requests with the same token skip
+    the token and user query. The signal handlers below evict
+    the entry when the token is deleted or its user is changed. Those
+    evictions must reach every worker, so without a cache that every
+    worker sees lookups aren't cached.
+    '''
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if not serves_every_worker(cache):
+            return super().authenticate_credentials(key)
+        cached = cache.get(_token_key(key))
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(_token_key(key), (user, token))
+            cache.set(_user_key(user.pk), key)
+        else:
+            user, token = cached
+
+        # views may modify request.user, so never hand out the cached object
+        return copy.copy(user), token
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    '''Evict a changed or deleted token from the authentication cache
+
+    Evicted once the change commits; before that, a concurrent request
+    would read the old row and cache it again.
+    '''
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    '''Evict the token of a changed, deactivated or deleted user
+
+    Evicted once the change commits, like ``invalidate_cached_token``.
+    '''
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
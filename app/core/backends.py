@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.hashers import hash_password, verify_password
+
+
+class PooledModelBackend(ModelBackend):
+    '''Model backend verifying passwords in the bounded hash pool
+
+    Behaves like ``ModelBackend``: a password stored with an outdated
+    hasher or work factor is rehashed with ``User.set_password`` after a
+    successful login. The rehash and save run in the calling thread.
+    '''
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash once anyway so unknown users take as long as known ones
+            hash_password(password)
+            return
+
+        is_correct, needs_update = verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return
+        if needs_update:
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        return user
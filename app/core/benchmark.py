@@ -0,0 +1,291 @@
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from decimal import Decimal
+from itertools import cycle
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Ingredient, Recipe, Tag
+from core.signals import bulk_m2m_changed, bulk_saved, deferred_updates
+
+
+BENCH_PASSWORD = 'benchpassword'
+
+WORDS = (
+    'apple', 'basil', 'bean', 'beef', 'bread', 'broccoli', 'butter',
+    'carrot', 'cheese', 'chicken', 'chili', 'coconut', 'curry', 'egg',
+    'garlic', 'ginger', 'honey', 'lemon', 'lentil', 'mushroom', 'noodle',
+    'onion', 'pasta', 'pepper', 'pork', 'potato', 'rice', 'salmon',
+    'spinach', 'tofu', 'tomato', 'yogurt',
+)
+
+
+def bench_email(prefix, number):
+    return f'{prefix}{number}@example.com'
+
+
+def _create_with_pks(model, instances, created):
+    '''Bulk insert instances and set their primary keys
+
+    ``created`` selects the new rows; on backends that can't return the
+    keys of a bulk insert they are read back in insertion order.
+    '''
+    model.objects.bulk_create(instances, batch_size=1000)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        pks = created.order_by('pk').values_list('pk', flat=True)
+        for instance, pk in zip(instances, pks):
+            instance.pk = pk
+    bulk_saved.send(sender=model, instances=instances, created=True)
+    return instances
+
+
+def _link(field_name, recipes, choices):
+    '''Insert the links of each recipe to its chosen objects'''
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    through.objects.bulk_create([
+        through(**{source: recipe, target: related})
+        for recipe, chosen in zip(recipes, choices)
+        for related in chosen
+    ], batch_size=1000)
+    bulk_m2m_changed.send(sender=through, instances=recipes, replaced=False)
+
+
+def seed_dataset(users=10, recipes=100, tags=20, ingredients=50, seed=0,
+                 prefix='bench'):
+    '''Create users with recipes, tags and ingredients from a fixed seed
+
+    Every user gets ``recipes`` recipes linked to some of their ``tags``
+    tags and ``ingredients`` ingredients, and an auth token. The same
+    seed yields the same data; users of an earlier run with the same
+    ``prefix`` are deleted first. Returns the created users.
+    '''
+    rng = random.Random(seed)
+    emails = [bench_email(prefix, i) for i in range(users)]
+    user_model = get_user_model()
+    user_model.objects.filter(email__in=emails).delete()
+
+    with deferred_updates():
+        password = make_password(BENCH_PASSWORD)
+        accounts = _create_with_pks(user_model, [
+            user_model(email=email, name=f'Bench user {i}', password=password)
+            for i, email in enumerate(emails)
+        ], user_model.objects.filter(email__in=emails))
+        Token.objects.bulk_create([
+            Token(user=user, key=Token.generate_key()) for user in accounts
+        ])
+
+        attrs = {}
+        for model, count in ((Tag, tags), (Ingredient, ingredients)):
+            attrs[model] = _create_with_pks(model, [
+                model(user=user, name=f'{word} {i}')
+                for user in accounts
+                for i, word in enumerate(rng.choices(WORDS, k=count))
+            ], model.objects.filter(user__in=accounts))
+
+        created = _create_with_pks(Recipe, [
+            Recipe(
+                user=user,
+                title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 9999)) / 100,
+            )
+            for user in accounts
+            for _ in range(recipes)
+        ], Recipe.objects.filter(user__in=accounts))
+
+        for model, field_name, most in ((Tag, 'tags', 3),
+                                        (Ingredient, 'ingredients', 6)):
+            owned = {user.pk: [] for user in accounts}
+            for obj in attrs[model]:
+                owned[obj.user_id].append(obj)
+            _link(field_name, created, [
+                rng.sample(
+                    owned[recipe.user_id],
+                    rng.randint(0, min(most, len(owned[recipe.user_id])))
+                )
+                for recipe in created
+            ])
+    return accounts
+
+
+def endpoints():
+    '''Return the benchmarked (name, method, path) routes'''
+    return (
+        ('recipes', 'get', reverse('recipe:recipe-list')),
+        ('tags', 'get', reverse('recipe:tag-list')),
+        ('ingredients', 'get', reverse('recipe:ingredient-list')),
+        ('token', 'post', reverse('user:token')),
+        ('me', 'get', reverse('user:me')),
+    )
+
+
+def _percentile(latencies, fraction):
+    return latencies[int(fraction * (len(latencies) - 1))]
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS
+             if host not in ('*',) and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+class _Worker(threading.local):
+    '''Per thread test client and query counter'''
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=_host())
+        self.queries = 0
+
+    def count(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def _send(worker, method, path, token, email):
+    '''Send one request, return its (latency, queries, ok)'''
+    if method == 'post':
+        request = worker.client.post
+        kwargs = {'data': {'email': email, 'password': BENCH_PASSWORD}}
+    else:
+        request = worker.client.get
+        kwargs = {'HTTP_AUTHORIZATION': f'Token {token}'}
+    worker.queries = 0
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(worker.count))
+        start = time.perf_counter()
+        response = request(path, **kwargs)
+        latency = time.perf_counter() - start
+    return latency, worker.queries, response.status_code < 400
+
+
+def _allocations(method, path, credentials, samples):
+    '''Return the mean peak of traced allocations per request, in KiB'''
+    if not samples:
+        return None
+    worker = _Worker()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _, (token, email) in zip(range(samples), credentials):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            _send(worker, method, path, token, email)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return round(sum(peaks) / len(peaks) / 1024, 1)
+
+
+def run_benchmark(requests=200, concurrency=1, prefix='bench',
+                  allocation_samples=10):
+    '''Drive every endpoint with the seeded users, return their figures
+
+    Requests go through the full middleware and URL stack in process,
+    spread over ``concurrency`` threads with a client each. Throttles
+    are disabled for the run. Figures per endpoint: requests/sec,
+    p50/p95/p99 latency in milliseconds, mean queries per request,
+    errors, and the mean allocation peak per request.
+    '''
+    credentials = list(
+        Token.objects.filter(user__email__startswith=prefix)
+        .order_by('user_id').values_list('key', 'user__email')
+    )
+    if not credentials:
+        raise ValueError(f'No {prefix} users, seed a dataset first')
+
+    rates = dict.fromkeys(
+        settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})
+    )
+    unthrottled = {
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates
+    }
+    worker = _Worker()
+    results = {}
+    with override_settings(REST_FRAMEWORK=unthrottled), \
+            ThreadPoolExecutor(concurrency) as pool:
+        for name, method, path in endpoints():
+            users = cycle(credentials)
+            jobs = [next(users) for _ in range(requests)]
+
+            def send(credential):
+                return _send(worker, method, path, *credential)
+
+            start = time.perf_counter()
+            if concurrency > 1:
+                samples = list(pool.map(send, jobs))
+            else:
+                samples = [send(job) for job in jobs]
+            elapsed = time.perf_counter() - start
+
+            latencies = sorted(latency * 1000 for latency, _, _ in samples)
+            results[name] = {
+                'requests_per_second': round(requests / elapsed, 1),
+                'p50_ms': round(_percentile(latencies, 0.5), 2),
+                'p95_ms': round(_percentile(latencies, 0.95), 2),
+                'p99_ms': round(_percentile(latencies, 0.99), 2),
+                'mean_queries': round(
+                    sum(queries for _, queries, _ in samples) / requests, 2
+                ),
+                'errors': sum(not ok for _, _, ok in samples),
+                'peak_alloc_kib': _allocations(
+                    method, path, cycle(credentials), allocation_samples
+                ),
+            }
+        if concurrency > 1:
+            # each worker thread opened connections of its own, the
+            # barrier makes every thread take one of the close jobs
+            barrier = threading.Barrier(concurrency)
+
+            def close():
+                barrier.wait()
+                connections.close_all()
+
+            for future in [pool.submit(close) for _ in range(concurrency)]:
+                future.result()
+    return results
+
+
+def compare_results(results, baseline, tolerance=0.2):
+    '''Return the regressions of results against a saved baseline
+
+    Throughput may drop and latency may grow by ``tolerance``; query
+    counts may not grow at all.
+    '''
+    regressions = []
+    for name, before in baseline.items():
+        after = results.get(name)
+        if after is None:
+            continue
+        if after['requests_per_second'] < \
+                before['requests_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {after['requests_per_second']} requests/sec, "
+                f"baseline {before['requests_per_second']}"
+            )
+        if after['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {after['p95_ms']} ms, "
+                f"baseline {before['p95_ms']} ms"
+            )
+        if after['mean_queries'] > before['mean_queries']:
+            regressions.append(
+                f"{name}: {after['mean_queries']} queries per request, "
+                f"baseline {before['mean_queries']}"
+            )
+        if after['errors'] > before['errors']:
+            regressions.append(f"{name}: {after['errors']} errors")
+    return regressions
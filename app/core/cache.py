@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class LocalLRUCache:
+    '''Thread safe in-process LRU cache with a per-entry time to live
+
+    Entries live in the worker process only, so lookups never leave the
+    process. Invalidation is immediate in that process but does not reach
+    other workers; use ``SharedCache`` when that matters.
+    '''
+
+    shared = False
+
+    def __init__(self, max_size=10000, timeout=300):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        '''Return the cached value, or default if missing or expired'''
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, timeout=None):
+        '''Cache the value, evicting the least recently used entries'''
+        if timeout is None:
+            timeout = self.timeout
+        expires = time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        '''Remove the key from the cache'''
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        '''Remove every key from the cache'''
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        '''Remove every entry from the cache'''
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        '''Return the usage counters of the cache'''
+        return {
+            'backend': 'local',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'max_size': self.max_size,
+        }
+
+
+def check_shared_alias(alias):
+    '''Refuse a Django cache alias whose entries stay in one process
+
+    ``LocMemCache`` keeps its entries in the process that set them and
+    ``DummyCache`` keeps none, so neither is shared by the workers.
+    '''
+    if isinstance(caches[alias], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f'The {alias!r} cache is not shared by worker processes, '
+            f'configure one that is in CACHES'
+        )
+
+
+def serves_every_worker(cache):
+    '''Return whether every worker process sees the entries of a cache
+
+    A local cache does when a single worker serves the app.
+    '''
+    return cache.shared or getattr(settings, 'WORKER_PROCESSES', 1) <= 1
+
+
+class SharedCache:
+    '''Cache stored in a Django cache alias shared by every worker
+
+    Evictions happen inside the cache server, so they are not counted.
+    Aliases local to a process are refused, see ``check_shared_alias``.
+    '''
+
+    shared = True
+
+    def __init__(self, alias='default', timeout=300, key_prefix=''):
+        check_shared_alias(alias)
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f'{self.key_prefix}{key}'
+
+    def get(self, key, default=None):
+        '''Return the cached value, or default if missing'''
+        value = self._cache.get(self._key(key))
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, timeout=None):
+        '''Cache the value'''
+        if timeout is None:
+            timeout = self.timeout
+        self._cache.set(self._key(key), value, timeout)
+
+    def delete(self, key):
+        '''Remove the key from the cache'''
+        self._cache.delete(self._key(key))
+
+    def delete_many(self, keys):
+        '''Remove every key from the cache'''
+        self._cache.delete_many([self._key(key) for key in keys])
+
+    def clear(self):
+        '''Remove every entry from the underlying cache alias'''
+        self._cache.clear()
+
+    def stats(self):
+        '''Return the usage counters of the cache'''
+        return {
+            'backend': 'shared',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': None,
+            'alias': self.alias,
+        }
+
+
+def build_cache(config, key_prefix=''):
+    '''Return a cache configured by a settings dict
+
+    ``BACKEND`` is ``local`` (the default) for a ``LocalLRUCache`` sized
+    by ``MAX_SIZE``, or ``shared`` for a ``SharedCache`` on the Django
+    cache ``ALIAS``. ``TIMEOUT`` is the entry lifetime in seconds.
+    '''
+    backend = config.get('BACKEND', 'local')
+    timeout = config.get('TIMEOUT', 300)
+    if backend == 'local':
+        return LocalLRUCache(
+            max_size=config.get('MAX_SIZE', 10000),
+            timeout=timeout
+        )
+    if backend == 'shared':
+        return SharedCache(
+            alias=config.get('ALIAS', 'default'),
+            timeout=timeout,
+            key_prefix=key_prefix
+        )
+    raise ImproperlyConfigured(f'Unknown cache backend {backend!r}')
+
+
+_named_caches = {}
+_named_caches_lock = threading.Lock()
+
+
+def named_cache(setting, key_prefix=''):
+    '''Return the process wide cache configured by the named setting
+
+    The cache is built on first use with ``build_cache`` and reused
+    afterwards, until ``reset_named_cache`` drops it.
+    '''
+    cache = _named_caches.get(setting)
+    if cache is None:
+        with _named_caches_lock:
+            cache = _named_caches.get(setting)
+            if cache is None:
+                cache = build_cache(
+                    getattr(settings, setting, {}),
+                    key_prefix=key_prefix
+                )
+                _named_caches[setting] = cache
+    return cache
+
+
+def reset_named_cache(setting):
+    '''Drop a named cache so it is rebuilt from the current settings'''
+    with _named_caches_lock:
+        _named_caches.pop(setting, None)
+
+
+def named_cache_stats():
+    '''Return the usage counters of every named cache built so far'''
+    return {
+        setting: cache.stats()
+        for setting, cache in list(_named_caches.items())
+    }
+
+
+@receiver(setting_changed)
+def reset_changed_cache(setting, **kwargs):
+    '''Rebuild a named cache when its setting is overridden'''
+    reset_named_cache(setting)
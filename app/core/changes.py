@@ -0,0 +1,170 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import ChangeLog, Ingredient, Recipe, RecipeStats, Tag
+from core.signals import (
+    bulk_m2m_changed, bulk_saved, changed_links, is_being_deleted
+)
+from core.stats import store_stats
+
+
+KINDS = {
+    Recipe: ChangeLog.RECIPE,
+    Tag: ChangeLog.TAG,
+    Ingredient: ChangeLog.INGREDIENT,
+}
+
+# Changes logged inside deferred(), {(model, user_id): {pk: deleted}}
+_pending_changes = ContextVar('pending_changes', default=None)
+
+
+def _reserve_seqs(user_id, count):
+    '''Reserve the next ``count`` sequence numbers of a user's changes
+
+    Returns the last one. The increment locks the user's stats row until
+    the transaction commits, so the changes of a user commit in sequence
+    order and a token never skips a change that commits later.
+    '''
+    stats = RecipeStats.objects.filter(user_id=user_id)
+    if not stats.update(change_seq=F('change_seq') + count):
+        # a user without stats yet, the new row continues their sequence
+        store_stats(user_id)
+        stats.update(change_seq=F('change_seq') + count)
+    return stats.values_list('change_seq', flat=True).get()
+
+
+def record_changes(model, user_id, ids, deleted=False):
+    '''Log changes of a user's objects, replacing their earlier entries
+
+    The replaced entries are deleted, then the new ones inserted with the
+    user's next sequence numbers, in one transaction. Inside ``deferred``
+    the changes are collected instead, the last one of an object winning.
+    '''
+    ids = sorted(set(ids))
+    if not ids:
+        return
+    pending = _pending_changes.get()
+    if pending is not None:
+        pending.setdefault((model, user_id), {}) \
+            .update(dict.fromkeys(ids, deleted))
+        return
+    kind = KINDS[model]
+    with transaction.atomic():
+        last = _reserve_seqs(user_id, len(ids))
+        ChangeLog.objects.filter(kind=kind, object_id__in=ids).delete()
+        ChangeLog.objects.bulk_create([
+            ChangeLog(
+                user_id=user_id, seq=seq, kind=kind, object_id=pk,
+                deleted=deleted
+            )
+            for seq, pk in enumerate(ids, start=last - len(ids) + 1)
+        ])
+
+
+@contextmanager
+def deferred():
+    '''Log the changes made inside the block once per object
+
+    Like ``CollectionVersion.objects.deferred``, so it should sit inside
+    the transaction.
+    '''
+    if _pending_changes.get() is not None:
+        yield
+        return
+
+    pending = {}
+    token = _pending_changes.set(pending)
+    try:
+        yield
+    finally:
+        _pending_changes.reset(token)
+    for (model, user_id), objects in pending.items():
+        for deleted in (False, True):
+            record_changes(
+                model, user_id,
+                [pk for pk, gone in objects.items() if gone is deleted],
+                deleted=deleted
+            )
+
+
+def changes_since(user_id, token, limit):
+    '''Return the entries of a user after a token, and if more follow
+
+    Entries are (seq, kind, object_id, deleted) tuples, oldest first, at
+    most ``limit`` of them.
+    '''
+    entries = list(
+        ChangeLog.objects.filter(user_id=user_id, seq__gt=token)
+        .order_by('seq')
+        .values_list('seq', 'kind', 'object_id', 'deleted')[:limit + 1]
+    )
+    return entries[:limit], len(entries) > limit
+
+
+def _by_user(instances):
+    '''Return the pks of the instances grouped by their user'''
+    users = {}
+    for instance in instances:
+        if not is_being_deleted(instance.user_id):
+            users.setdefault(instance.user_id, []).append(instance.pk)
+    return users
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def log_saved(sender, instance, raw, **kwargs):
+    '''Log a created or changed object for delta sync'''
+    if not raw and not is_being_deleted(instance.user_id):
+        record_changes(sender, instance.user_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def log_deleted(sender, instance, **kwargs):
+    '''Log a tombstone of a deleted object for delta sync'''
+    if is_being_deleted(instance.user_id):
+        return
+    record_changes(
+        sender, instance.user_id, [instance.pk], deleted=True
+    )
+    if sender is not Recipe:
+        # its recipes lost a link, collected by collect_linked_recipes
+        record_changes(
+            Recipe, instance.user_id,
+            getattr(instance, '_linked_recipe_ids', ())
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def log_link_change(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Log the recipes whose links changed for delta sync'''
+    _, ids = changed_links(action, instance, pk_set)
+    if ids and not is_being_deleted(instance.user_id):
+        record_changes(
+            Recipe, instance.user_id, ids if reverse else [instance.pk]
+        )
+
+
+@receiver(bulk_saved, sender=Recipe)
+@receiver(bulk_saved, sender=Tag)
+@receiver(bulk_saved, sender=Ingredient)
+def log_bulk_saved(sender, instances, **kwargs):
+    '''Log objects written in bulk for delta sync'''
+    for user_id, ids in _by_user(instances).items():
+        record_changes(sender, user_id, ids)
+
+
+@receiver(bulk_m2m_changed, sender=Recipe.tags.through)
+@receiver(bulk_m2m_changed, sender=Recipe.ingredients.through)
+def log_bulk_link_change(sender, instances, **kwargs):
+    '''Log the recipes whose links were written in bulk'''
+    for user_id, ids in _by_user(instances).items():
+        record_changes(Recipe, user_id, ids)
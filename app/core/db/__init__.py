@@ -0,0 +1,17 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def check_connection(alias=DEFAULT_DB_ALIAS):
+    '''Run a trivial query on a database, raising if it is unreachable
+
+    Goes through the configured backend, so pooled and health checked
+    connections are probed exactly as requests would use them. A failed
+    connection is closed so the next call starts afresh.
+    '''
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        connection.close()
+        raise
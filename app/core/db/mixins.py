@@ -0,0 +1,83 @@
+import functools
+
+from core.db.pool import get_pool
+
+
+def ping(conn):
+    '''Return whether a raw connection answers a trivial query'''
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    finally:
+        cursor.close()
+    return True
+
+
+class HealthCheckMixin:
+    '''Check persistent connections before their first use in a request
+
+    Backport of Django 4.1's ``CONN_HEALTH_CHECKS``: a connection kept
+    from an earlier request is tested once before the first query of the
+    next one and reopened if the server dropped it in the meantime.
+    '''
+
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        '''Close the connection if it no longer answers'''
+        if (self.connection is None or self.health_check_done
+                or self.in_atomic_block
+                or not self.settings_dict.get('CONN_HEALTH_CHECKS')):
+            return
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+
+class PooledConnectionMixin:
+    '''Borrow connections from an in-process pool configured by POOL
+
+    Without a ``POOL`` settings dict the wrapper connects as usual. With
+    one, opening a connection checks it out of the pool of the alias and
+    database, and closing it rolls back whatever is left open and hands it
+    back. Pair it with ``CONN_MAX_AGE = 0`` so every request returns its
+    connection.
+    '''
+
+    @property
+    def connection_pool(self):
+        config = self.settings_dict.get('POOL')
+        if not config:
+            return None
+        key = f"{self.alias}:{self.settings_dict['NAME']}"
+        return get_pool(key, config, check=ping)
+
+    def get_new_connection(self, conn_params):
+        connect = functools.partial(super().get_new_connection, conn_params)
+        pool = self.connection_pool
+        if pool is None:
+            return connect()
+        return pool.acquire(connect)
+
+    def _close(self):
+        pool = self.connection_pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        try:
+            self.connection.rollback()
+        except Exception:
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
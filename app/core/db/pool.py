@@ -0,0 +1,154 @@
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    '''Raised when no pooled connection became free in time'''
+
+
+class ConnectionPool:
+    '''Bounded pool of raw DB-API connections shared by a process's threads
+
+    At most ``max_size`` connections are open at once; a checkout waits up
+    to ``timeout`` seconds for one to be released before raising
+    ``PoolTimeout``. Connections idle for ``check_after`` seconds or more
+    are passed to ``check`` before reuse and replaced if it fails.
+    '''
+
+    def __init__(self, max_size=10, timeout=30.0, check=None,
+                 check_after=30.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def acquire(self, connect):
+        '''Return an idle connection, or a new one made by connect()'''
+        with self._cond:
+            self.checkouts += 1
+        while True:
+            conn, idle_since = self._reserve()
+            if conn is None:
+                try:
+                    return connect()
+                except Exception:
+                    self._forget()
+                    raise
+            if self._healthy(conn, idle_since):
+                return conn
+            self.discard(conn)
+
+    def release(self, conn):
+        '''Return a checked out connection to the pool'''
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        '''Close a checked out connection, freeing its slot'''
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.discarded += 1
+            self._size -= 1
+            self._cond.notify()
+
+    def close_idle(self):
+        '''Close every idle connection'''
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self.discard(conn)
+
+    def stats(self):
+        '''Return the usage counters and current sizes'''
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
+
+    def _reserve(self):
+        '''Take an idle connection or a slot for a new one, waiting if full'''
+        deadline = None
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                if deadline is None:
+                    self.waits += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No connection available within {self.timeout}s'
+                    )
+                self._cond.wait(remaining)
+            if self._idle:
+                # reuse the most recently released connection first
+                return self._idle.pop()
+            self._size += 1
+            self.created += 1
+            return None, None
+
+    def _forget(self):
+        '''Free the slot of a connection that failed to open'''
+        with self._cond:
+            self._size -= 1
+            self.created -= 1
+            self._cond.notify()
+
+    def _healthy(self, conn, idle_since):
+        if self.check is None or self.check_after is None:
+            return True
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            return self.check(conn)
+        except Exception:
+            return False
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, config, check=None):
+    '''Return the process wide pool stored under key
+
+    ``config`` is a ``POOL`` settings dict with ``MAX_SIZE``, ``TIMEOUT``
+    and ``CHECK_AFTER``. Pools are sized per worker process.
+    '''
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                max_size=config.get('MAX_SIZE', 10),
+                timeout=config.get('TIMEOUT', 30.0),
+                check=check,
+                check_after=config.get('CHECK_AFTER', 30.0)
+            )
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats():
+    '''Return the usage counters of every pool created so far'''
+    return {key: pool.stats() for key, pool in list(_pools.items())}
@@ -0,0 +1,13 @@
+from django.db.backends.postgresql import base
+
+from core.db.mixins import HealthCheckMixin, PooledConnectionMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, PooledConnectionMixin,
+                      base.DatabaseWrapper):
+    '''PostgreSQL backend with connection health checks and pooling
+
+    Set ``CONN_HEALTH_CHECKS`` to test persistent connections before
+    reuse, or a ``POOL`` dict to share an in-process pool, see
+    core.db.mixins.
+    '''
@@ -0,0 +1,101 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import named_cache, serves_every_worker
+
+
+# Replica alias the reads of the current request go to, if any
+_read_replica = ContextVar('read_replica', default=None)
+
+
+def get_pin_cache():
+    '''Return the cache of users pinned to the primary, see REPLICA_PIN'''
+    return named_cache('REPLICA_PIN', key_prefix='pin:')
+
+
+def pin_to_primary(user_id):
+    '''Send the reads of a user to the primary for the next few seconds
+
+    Called after every write, so the user reads their own writes while
+    the replicas catch up. The window is the REPLICA_PIN cache timeout.
+    '''
+    get_pin_cache().set(user_id, True)
+
+
+def pins_shared():
+    '''Return whether every worker process sees the pins of the others
+
+    A 'local' pin cache only holds the writes of its own process, which
+    serves a single worker alone. A 'shared' one refuses process local
+    Django caches.
+    '''
+    return serves_every_worker(get_pin_cache())
+
+
+def is_pinned(user_id):
+    '''Return whether the reads of a user must go to the primary
+
+    Without pins shared by every worker, a write served by another worker
+    can't be seen, so everyone is pinned.
+    '''
+    return not pins_shared() or get_pin_cache().get(user_id) is not None
+
+
+def _replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def route_reads_to_replica():
+    '''Send the reads that follow to a randomly chosen replica, if any
+
+    Returns a token for ``reset_read_routing``.
+    '''
+    replicas = _replicas()
+    return _read_replica.set(random.choice(replicas) if replicas else None)
+
+
+def reset_read_routing(token):
+    '''Restore the read routing from before ``route_reads_to_replica``'''
+    _read_replica.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    '''Route the reads in the block to a replica'''
+    token = route_reads_to_replica()
+    try:
+        yield
+    finally:
+        reset_read_routing(token)
+
+
+class ReplicaRouter:
+    '''Route reads inside ``replica_reads`` to a read replica
+
+    Everything else goes where Django would send it, except that rows read
+    from a replica are saved to the primary. Replicas hold the same data,
+    so relations across them are always allowed.
+    '''
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'django_cache':
+            # DatabaseCache entries, as pins, must not lag behind writes
+            return None
+        return _read_replica.get()
+
+    def db_for_write(self, model, **hints):
+        # rows read from a replica are written back to the primary
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in _replicas():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+
+
+_DONE = object()
+
+
+def _close(response):
+    '''Close a streamed response and the connections of this thread'''
+    try:
+        response.close()
+    finally:
+        connections.close_all()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    '''ASGI handler reading streaming responses off the event loop
+
+    Django 3.2 iterates streaming responses on the event loop, where the
+    database can't be used, so a generator reading rows as it goes fails
+    after the headers went out. Here the parts of a streaming response
+    are pulled in a thread of its own, which keeps the generator's
+    connection and server-side cursor in that one thread.
+    '''
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            parts = iter(response)
+            try:
+                while True:
+                    part = await loop.run_in_executor(
+                        executor, next, parts, _DONE
+                    )
+                    if part is _DONE:
+                        break
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            finally:
+                await loop.run_in_executor(executor, _close, response)
+        await send({'type': 'http.response.body'})
+        # as request_finished would after Django's own close
+        await sync_to_async(close_old_connections, thread_sensitive=True)()
+
+
+def get_asgi_application():
+    '''Set Django up and return the ASGI application, like Django's own'''
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, check_password,
+    make_password
+)
+
+
+def _cost(name, default):
+    '''Return a work factor from the PASSWORD_HASHER_COST setting'''
+    return getattr(settings, 'PASSWORD_HASHER_COST', {}).get(name, default)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    '''Argon2 hasher with its cost parameters taken from settings
+
+    Hashes stored with other parameters are upgraded on the next login.
+    '''
+
+    @property
+    def time_cost(self):
+        return _cost('ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _cost('ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _cost('ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    '''BCrypt hasher with its rounds taken from settings'''
+
+    @property
+    def rounds(self):
+        return _cost('BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+
+class PasswordHashTimeout(Exception):
+    '''Raised when a password hash waited too long for a pool worker'''
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    '''Return the thread pool running password hashes'''
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None)
+            _pool = ThreadPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1,
+                thread_name_prefix='password-hash'
+            )
+        return _pool
+
+
+def _run_in_pool(func, *args):
+    '''Run func in the hash pool and wait for its result'''
+    future = get_hash_pool().submit(func, *args)
+    try:
+        return future.result(
+            timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', None)
+        )
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHashTimeout()
+
+
+def _verify(password, encoded):
+    '''Check the password, reporting whether its hash needs an upgrade'''
+    needs_update = []
+    is_correct = check_password(
+        password, encoded, setter=lambda raw: needs_update.append(True)
+    )
+    return is_correct, bool(needs_update)
+
+
+def verify_password(password, encoded):
+    '''Verify a password in the bounded hash pool
+
+    Returns a ``(is_correct, needs_update)`` pair. Hashing is CPU bound,
+    so a burst of logins is limited to PASSWORD_HASH_WORKERS concurrent
+    hashes while the rest of the requests keep their cores. Nothing in the
+    pool touches the database, so it stays in the caller's connection.
+    '''
+    return _run_in_pool(_verify, password, encoded)
+
+
+def hash_password(password):
+    '''Hash a password with the preferred hasher in the bounded hash pool'''
+    return _run_in_pool(make_password, password)
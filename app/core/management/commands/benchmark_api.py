@@ -0,0 +1,88 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import compare_results, run_benchmark
+
+
+COLUMNS = (
+    ('requests_per_second', 'req/s'),
+    ('p50_ms', 'p50 ms'),
+    ('p95_ms', 'p95 ms'),
+    ('p99_ms', 'p99 ms'),
+    ('mean_queries', 'queries'),
+    ('peak_alloc_kib', 'alloc KiB'),
+    ('errors', 'errors'),
+)
+
+
+class Command(BaseCommand):
+    '''Django command to load test the API with the seeded users'''
+
+    help = (
+        'Measure throughput, latency, queries and allocations of the API '
+        'endpoints; run seed_recipes first'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests per endpoint'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Worker threads sending requests'
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument(
+            '--save-baseline', metavar='PATH',
+            help='Write the results to this JSON file'
+        )
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Fail if the results regressed from this baseline'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed throughput and latency regression (default 0.2)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = run_benchmark(
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                prefix=options['prefix'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(
+            f"{'endpoint':<12}"
+            + ''.join(f'{label:>11}' for _, label in COLUMNS)
+        )
+        for name, figures in results.items():
+            self.stdout.write(
+                f'{name:<12}'
+                + ''.join(f'{figures[key]!s:>11}' for key, _ in COLUMNS)
+            )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2)
+            self.stdout.write(f"Baseline saved to {options['save_baseline']}")
+
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline: {exc}')
+            regressions = compare_results(
+                results, baseline, options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressed from baseline:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('No regressions'))
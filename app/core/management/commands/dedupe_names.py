@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import search
+from core.changes import record_changes
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+from core.names import find_duplicates, merge_duplicates
+from core.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    '''Django command to merge tags and ingredients named alike'''
+
+    help = (
+        'Merge tags and ingredients whose names differ only in case or '
+        'spacing into the oldest of them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the duplicates without merging them'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Tag, Ingredient):
+            found = find_duplicates(model)
+            count = sum(len(duplicates) for duplicates in found.values())
+            label = model._meta.verbose_name_plural
+            if options['dry_run']:
+                self.stdout.write(
+                    f'{count} duplicate {label} of {len(found)} users'
+                )
+                continue
+            for user_id, duplicates in found.items():
+                # a transaction per user keeps the locks short
+                with transaction.atomic(), \
+                        CollectionVersion.objects.deferred():
+                    recipe_ids = merge_duplicates(model, duplicates)
+                    search.refresh_search_documents(recipe_ids)
+                    record_changes(Recipe, user_id, recipe_ids)
+                    reconcile_stats([user_id])
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {count} duplicate {label} of {len(found)} users'
+            ))
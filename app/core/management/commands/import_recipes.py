@@ -0,0 +1,65 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.imports import IMPORT_FORMATS, RecipeImporter
+
+
+class Command(BaseCommand):
+    '''Django command to import a user's recipes from NDJSON or CSV'''
+
+    help = 'Import recipes from an NDJSON or CSV file in large batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='File to import, or - to read standard input'
+        )
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user the recipes are created for'
+        )
+        parser.add_argument(
+            '--format', choices=sorted(IMPORT_FORMATS), default=None,
+            help='Format of the file (default: from its extension)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows inserted per batch'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']}")
+
+        path = options['path']
+        import_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson'
+        )
+        if path == '-':
+            self._import(user, import_format, sys.stdin, options)
+            return
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as lines:
+                self._import(user, import_format, lines, options)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc.strerror}')
+
+    def _import(self, user, import_format, lines, options):
+        importer = RecipeImporter(user, options['batch_size'])
+        for _ in importer.batches(IMPORT_FORMATS[import_format](lines)):
+            self.stdout.write(
+                f'{importer.rows} rows '
+                f'({importer.rows_per_second:.0f} rows/sec)'
+            )
+
+        for error in importer.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} recipes from {importer.rows} rows '
+            f'in {importer.seconds:.1f}s '
+            f'({importer.rows_per_second:.0f} rows/sec), '
+            f'{importer.failed} failed'
+        ))
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    '''Django command to recompute the stored recipe stats'''
+
+    help = 'Recompute the recipe stats of every user from their rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Email of the only user to recompute'
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        if options['user']:
+            users = users.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f"Unknown user {options['user']}")
+        user_ids = list(users.values_list('pk', flat=True))
+        reconcile_stats(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed the stats of {len(user_ids)} users'
+        ))
@@ -1,21 +1,32 @@
 import time
 
-from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core.db import check_connection
 
 
 class Command(BaseCommand):
     '''Django command to pause execution until database
     is available'''
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=None,
+            help='Give up after this many seconds (default: wait forever)'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        timeout = options['timeout']
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
             try:
-                db_conn = connections['default']
+                check_connection()
+                break
             except OperationalError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise CommandError('Database unavailable, giving up')
                 self.stdout.write('Database unavailable, waiting 1 second..')
                 time.sleep(1)
         self.stdout.write(self.style.SUCCESS('Database available!'))
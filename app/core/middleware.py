@@ -0,0 +1,137 @@
+import asyncio
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.timing import (
+    RequestTimer, activate_timer, deactivate_timer, install_query_timer,
+    record_timer
+)
+
+
+def view_name(view_func, method):
+    '''Return a readable name of a view, with the viewset action'''
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    name = f'{cls.__module__}.{cls.__name__}'
+    actions = getattr(view_func, 'actions', None)
+    if actions and method.lower() in actions:
+        name = f'{name}.{actions[method.lower()]}'
+    return name
+
+
+class RequestTimingMiddleware:
+    '''Time the database, serialization and rendering of sampled requests
+
+    Configured by the ``REQUEST_TIMING`` setting. When it isn't
+    ``ENABLED`` the middleware removes itself from the stack, so it costs
+    nothing. Otherwise a ``SAMPLE_RATE`` fraction of requests is timed:
+    their queries through ``core.timing.time_query``, serialization
+    through ``TimedSerializerMixin`` and rendering around
+    ``response.render()``. Timings are added to per view histograms,
+    see ``core.timing.timing_stats``, and returned in a ``Server-Timing``
+    header when ``SERVER_TIMING`` is set.
+
+    Both sync and async capable, so under ASGI it doesn't force the
+    middleware chain onto the single sync thread.
+    '''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'REQUEST_TIMING', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config.get('SAMPLE_RATE', 1.0)
+        self.server_timing = config.get('SERVER_TIMING', False)
+
+        connection_created.connect(
+            install_query_timer, dispatch_uid='core.install_query_timer'
+        )
+        for connection in connections.all():
+            install_query_timer(connection)
+
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # lets the handler await __call__, as Django's MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            # the handler runs sync hooks of async chains on the sync thread
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timer, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop(timer, token)
+        return self.finish(timer, response)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timer, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.stop(timer, token)
+        return self.finish(timer, response)
+
+    def start(self, request):
+        '''Start timing a sampled request, return its timer and token'''
+        timer = request._timer = RequestTimer()
+        token = activate_timer(timer)
+        timer.start('total')
+        return timer, token
+
+    def stop(self, timer, token):
+        timer.stop('total')
+        deactivate_timer(token)
+
+    def finish(self, timer, response):
+        '''Record the timings of a request and add them to its response'''
+        if timer.view is not None:
+            record_timer(timer)
+        if self.server_timing:
+            response['Server-Timing'] = timer.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._name_view(request, view_func)
+
+    def process_template_response(self, request, response):
+        return self._time_render(request, response)
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        self._name_view(request, view_func)
+
+    async def aprocess_template_response(self, request, response):
+        return self._time_render(request, response)
+
+    def _name_view(self, request, view_func):
+        timer = getattr(request, '_timer', None)
+        if timer is not None:
+            timer.view = view_name(view_func, request.method)
+
+    def _time_render(self, request, response):
+        # the handler renders the response right after this hook
+        timer = getattr(request, '_timer', None)
+        if timer is not None:
+            timer.start('render')
+            response.add_post_render_callback(
+                lambda rendered: timer.stop('render')
+            )
+        return response
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:10
+
+from django.db import migrations
+
+
+def _target_fields(apps):
+    '''Yield the M2M table and target column field of each recipe link'''
+    Recipe = apps.get_model('core', 'Recipe')
+    for name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(name)
+        through = field.remote_field.through
+        yield through, through._meta.get_field(field.m2m_reverse_field_name())
+
+
+def drop_target_indexes(apps, schema_editor):
+    '''Drop the single column target indexes the covering ones lead with'''
+    for through, field in _target_fields(apps):
+        for name in schema_editor._constraint_names(
+            through, [field.column], index=True
+        ):
+            schema_editor.execute(schema_editor._delete_index_sql(
+                through, name
+            ))
+
+
+def create_target_indexes(apps, schema_editor):
+    '''Restore the single column target indexes of the foreign keys'''
+    for through, field in _target_fields(apps):
+        schema_editor.execute(schema_editor._create_index_sql(
+            through, fields=[field]
+        ))
+
+
+class Migration(migrations.Migration):
+    '''Covering (target, recipe) indexes on the auto-created M2M tables
+
+    Filtering recipes by tag/ingredient IDs and the assigned_only EXISTS
+    lookups start from the target column and only need recipe_id, which
+    these indexes answer without touching the table rows. They replace
+    the single column tag_id and ingredient_id indexes of the foreign
+    keys, which they lead with; the unique (recipe_id, target) constraint
+    still serves lookups by recipe.
+    '''
+
+    dependencies = [
+        ('core', '0006_drop_redundant_user_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX core_recipe_tags_tag_recipe_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingr_ingr_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            'DROP INDEX core_recipe_ingr_ingr_recipe_idx',
+        ),
+        migrations.RunPython(drop_target_indexes, create_target_indexes),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:23
+
+from django.db import migrations, models
+
+
+# frozen copies of core.search as of this migration, the app code may
+# change later while this migration must not
+FTS_TABLE = 'core_recipe_fts'
+
+
+def build_search_documents(recipes, recipe_ids, using):
+    parts = {
+        pk: [title]
+        for pk, title in recipes.objects.using(using)
+        .filter(pk__in=recipe_ids)
+        .order_by().values_list('pk', 'title')
+    }
+    for field_name in ('ingredients', 'tags'):
+        field = recipes._meta.get_field(field_name)
+        target = field.m2m_reverse_name()
+        links = field.remote_field.through.objects.using(using) \
+            .filter(recipe_id__in=parts) \
+            .order_by(f'{target}__name') \
+            .values_list('recipe_id', f'{target}__name')
+        for pk, name in links:
+            parts[pk].append(name)
+    return {pk: ' '.join(words) for pk, words in parts.items()}
+
+
+def sync_fts(connection, recipes):
+    ids = [recipe.pk for recipe in recipes]
+    rows = [
+        (recipe.pk, recipe.search_document)
+        for recipe in recipes if recipe.search_document
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+            f'({", ".join(["%s"] * len(ids))})',
+            ids
+        )
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, search_document) '
+                f'VALUES (%s, %s)',
+                rows
+            )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_idx ON core_recipe USING gin '
+            "(to_tsvector('simple'::regconfig, search_document))"
+        )
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(search_document)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX core_recipe_search_idx')
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+def build_documents(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    db = schema_editor.connection.alias
+    ids = list(Recipe.objects.using(db).values_list('pk', flat=True))
+    for start in range(0, len(ids), 1000):
+        documents = build_search_documents(
+            Recipe, ids[start:start + 1000], using=db
+        )
+        recipes = [
+            Recipe(pk=pk, search_document=document)
+            for pk, document in documents.items()
+        ]
+        Recipe.objects.using(db).bulk_update(recipes, ['search_document'])
+        if schema_editor.connection.vendor == 'sqlite':
+            sync_fts(schema_editor.connection, recipes)
+
+
+class Migration(migrations.Migration):
+    '''Denormalized recipe search documents and their full text index
+
+    PostgreSQL indexes the tsvector of the document with GIN, which
+    core.search queries with the identical expression. SQLite keeps the
+    documents in an FTS5 table instead, which core.search writes to.
+    '''
+
+    dependencies = [
+        ('core', '0008_updated_at_collectionversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
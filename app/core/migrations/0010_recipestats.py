@@ -0,0 +1,105 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:44
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+# frozen copy of core.stats as of this migration, the app code may change
+# later while this migration must not
+TIME_MINUTES_BOUNDS = (10, 20, 30, 45, 60, 90, 120)
+PRICE_BOUNDS = (5, 10, 20, 50, 100)
+HISTOGRAMS = (
+    ('time_minutes', 'time_minutes_histogram', TIME_MINUTES_BOUNDS),
+    ('price', 'price_histogram', PRICE_BOUNDS),
+)
+
+
+def bucket_filters(field_name, bounds):
+    filters = []
+    lower = None
+    for upper in bounds + (None,):
+        condition = Q()
+        if lower is not None:
+            condition &= Q(**{f'{field_name}__gt': lower})
+        if upper is not None:
+            condition &= Q(**{f'{field_name}__lte': upper})
+        filters.append(condition)
+        lower = upper
+    return filters
+
+
+def compute_stats(recipes, tags, ingredients, user_id, using):
+    aggregates = {
+        'recipe_count': Count('id'),
+        'time_minutes_sum': Sum('time_minutes'),
+        'price_sum': Sum('price'),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        for i, condition in enumerate(bucket_filters(field_name, bounds)):
+            aggregates[f'{histogram}_{i}'] = Count('id', filter=condition)
+    totals = recipes.objects.using(using).filter(user_id=user_id) \
+        .aggregate(**aggregates)
+
+    stats = {
+        'recipe_count': totals['recipe_count'],
+        'time_minutes_sum': totals['time_minutes_sum'] or 0,
+        'price_sum': totals['price_sum'] or Decimal('0'),
+        'tag_count': tags.objects.using(using)
+        .filter(user_id=user_id).count(),
+        'ingredient_count': ingredients.objects.using(using)
+        .filter(user_id=user_id).count(),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        stats[histogram] = [
+            totals[f'{histogram}_{i}'] for i in range(len(bounds) + 1)
+        ]
+    for field_name in ('tags', 'ingredients'):
+        through = recipes._meta.get_field(field_name).remote_field.through
+        stats[f'{field_name[:-1]}_link_count'] = through.objects \
+            .using(using).filter(recipe__user_id=user_id).count()
+    return stats
+
+
+def compute_all_stats(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    models = [
+        apps.get_model('core', name)
+        for name in ('Recipe', 'Tag', 'Ingredient')
+    ]
+    db = schema_editor.connection.alias
+    for user_id in User.objects.using(db).values_list('pk', flat=True):
+        RecipeStats.objects.using(db).create(
+            user_id=user_id, **compute_stats(*models, user_id, using=db)
+        )
+
+
+class Migration(migrations.Migration):
+    '''Per user recipe stats, computed for the existing users'''
+
+    dependencies = [
+        ('core', '0009_recipe_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.user')),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('tag_count', models.PositiveIntegerField(default=0)),
+                ('ingredient_count', models.PositiveIntegerField(default=0)),
+                ('tag_link_count', models.PositiveIntegerField(default=0)),
+                ('ingredient_link_count', models.PositiveIntegerField(default=0)),
+                ('time_minutes_sum', models.PositiveBigIntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_minutes_histogram', models.JSONField(default=list)),
+                ('price_histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(compute_all_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# frozen copy of core.stats as of this migration, the app code may change
+# later while this migration must not
+def count_recipes(model, filters, using):
+    through = model._meta.get_field('recipe').through
+    name = model._meta.model_name
+    links = through.objects.using(using).filter(**{name: OuterRef('pk')}) \
+        .order_by().values(name).annotate(count=Count('pk')).values('count')
+    return model.objects.using(using).filter(**filters) \
+        .update(recipe_count=Coalesce(Subquery(links), 0))
+
+
+def count_all_recipes(apps, schema_editor):
+    db = schema_editor.connection.alias
+    for name in ('Tag', 'Ingredient'):
+        count_recipes(apps.get_model('core', name), {}, using=db)
+
+
+class Migration(migrations.Migration):
+    '''Stored recipe counts of tags and ingredients, and their ordering'''
+
+    dependencies = [
+        ('core', '0010_recipestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='core_ingr_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+        migrations.RunPython(count_all_recipes, migrations.RunPython.noop),
+    ]
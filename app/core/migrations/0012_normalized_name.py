@@ -0,0 +1,171 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:02
+
+from decimal import Decimal
+
+import core.models
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+# frozen copies of core.models, core.names and core.stats as of this
+# migration, the app code may change later while this migration must not
+TIME_MINUTES_BOUNDS = (10, 20, 30, 45, 60, 90, 120)
+PRICE_BOUNDS = (5, 10, 20, 50, 100)
+HISTOGRAMS = (
+    ('time_minutes', 'time_minutes_histogram', TIME_MINUTES_BOUNDS),
+    ('price', 'price_histogram', PRICE_BOUNDS),
+)
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+def find_duplicates(model, using):
+    kept = {}
+    duplicates = {}
+    objects = model.objects.using(using).order_by('pk') \
+        .values_list('pk', 'user_id', 'name')
+    for pk, user_id, name in objects.iterator():
+        key = (user_id, normalize_name(name))
+        if key in kept:
+            duplicates.setdefault(user_id, {})[pk] = kept[key]
+        else:
+            kept[key] = pk
+    return duplicates
+
+
+def merge_duplicates(model, duplicates, using, batch_size=500):
+    through = model._meta.get_field('recipe').through
+    target = model._meta.model_name
+    links = through.objects.using(using)
+    duplicate_ids = list(duplicates)
+    for start in range(0, len(duplicate_ids), batch_size):
+        batch = duplicate_ids[start:start + batch_size]
+        kept_ids = {duplicates[pk] for pk in batch}
+        linked = set(
+            links.filter(**{f'{target}__in': kept_ids})
+            .values_list('recipe_id', f'{target}_id')
+        )
+        moved = []
+        dropped = []
+        for link in links.filter(**{f'{target}__in': batch}):
+            pair = (link.recipe_id, duplicates[getattr(link, f'{target}_id')])
+            if pair in linked:
+                dropped.append(link.pk)
+            else:
+                linked.add(pair)
+                setattr(link, f'{target}_id', pair[1])
+                moved.append(link)
+        links.bulk_update(moved, [target], batch_size=batch_size)
+        links.filter(pk__in=dropped).delete()
+        model.objects.using(using).filter(pk__in=batch).delete()
+
+
+def count_recipes(model, filters, using):
+    through = model._meta.get_field('recipe').through
+    name = model._meta.model_name
+    links = through.objects.using(using).filter(**{name: OuterRef('pk')}) \
+        .order_by().values(name).annotate(count=Count('pk')).values('count')
+    return model.objects.using(using).filter(**filters) \
+        .update(recipe_count=Coalesce(Subquery(links), 0))
+
+
+def bucket_filters(field_name, bounds):
+    filters = []
+    lower = None
+    for upper in bounds + (None,):
+        condition = Q()
+        if lower is not None:
+            condition &= Q(**{f'{field_name}__gt': lower})
+        if upper is not None:
+            condition &= Q(**{f'{field_name}__lte': upper})
+        filters.append(condition)
+        lower = upper
+    return filters
+
+
+def compute_stats(recipes, tags, ingredients, user_id, using):
+    aggregates = {
+        'recipe_count': Count('id'),
+        'time_minutes_sum': Sum('time_minutes'),
+        'price_sum': Sum('price'),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        for i, condition in enumerate(bucket_filters(field_name, bounds)):
+            aggregates[f'{histogram}_{i}'] = Count('id', filter=condition)
+    totals = recipes.objects.using(using).filter(user_id=user_id) \
+        .aggregate(**aggregates)
+
+    stats = {
+        'recipe_count': totals['recipe_count'],
+        'time_minutes_sum': totals['time_minutes_sum'] or 0,
+        'price_sum': totals['price_sum'] or Decimal('0'),
+        'tag_count': tags.objects.using(using)
+        .filter(user_id=user_id).count(),
+        'ingredient_count': ingredients.objects.using(using)
+        .filter(user_id=user_id).count(),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        stats[histogram] = [
+            totals[f'{histogram}_{i}'] for i in range(len(bounds) + 1)
+        ]
+    for field_name in ('tags', 'ingredients'):
+        through = recipes._meta.get_field(field_name).remote_field.through
+        stats[f'{field_name[:-1]}_link_count'] = through.objects \
+            .using(using).filter(recipe__user_id=user_id).count()
+    return stats
+
+
+def merge_and_normalize(apps, schema_editor):
+    db = schema_editor.connection.alias
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    models = [
+        apps.get_model('core', name)
+        for name in ('Recipe', 'Tag', 'Ingredient')
+    ]
+    for model in models[1:]:
+        found = find_duplicates(model, using=db)
+        for user_id, duplicates in found.items():
+            merge_duplicates(model, duplicates, using=db)
+            count_recipes(model, {'user_id': user_id}, using=db)
+            RecipeStats.objects.using(db).filter(user_id=user_id).update(
+                **compute_stats(*models, user_id, using=db)
+            )
+        objects = list(model.objects.using(db).only('name'))
+        for obj in objects:
+            obj.normalized_name = normalize_name(obj.name)
+        model.objects.using(db).bulk_update(
+            objects, ['normalized_name'], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+    '''Normalized tag and ingredient names, merging existing duplicates
+
+    The links of duplicates move to the oldest object of each name, and
+    the counts of their users are recomputed. The unique constraint
+    follows in the next migration, which PostgreSQL can't add in the
+    transaction that rewrote the rows.
+    '''
+
+    dependencies = [
+        ('core', '0011_recipe_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=core.models.NormalizedNameField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=core.models.NormalizedNameField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_and_normalize, migrations.RunPython.noop),
+    ]
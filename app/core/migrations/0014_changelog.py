@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def log_existing(apps, schema_editor):
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    db = schema_editor.connection.alias
+    # kinds as in ChangeLog.KIND_CHOICES
+    for kind, name in ((1, 'Recipe'), (2, 'Tag'), (3, 'Ingredient')):
+        objects = apps.get_model('core', name).objects.using(db) \
+            .order_by('pk').values_list('pk', 'user_id')
+        entries = [
+            ChangeLog(user_id=user_id, kind=kind, object_id=pk)
+            for pk, user_id in objects.iterator()
+        ]
+        ChangeLog.objects.using(db).bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    '''Change log for delta sync, with an entry for every existing object
+
+    So syncing from the start returns every object of the user.
+    '''
+
+    dependencies = [
+        ('core', '0013_unique_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'recipe'), (2, 'tag'), (3, 'ingredient')])),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'id'], name='core_changelog_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['kind', 'object_id'], name='core_changelog_object_idx'),
+        ),
+        migrations.RunPython(log_existing, migrations.RunPython.noop),
+    ]
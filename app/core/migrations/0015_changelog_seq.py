@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:41
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def number_existing(apps, schema_editor):
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    db = schema_editor.connection.alias
+    # ids already grow per user, so tokens handed out stay valid
+    ChangeLog.objects.using(db).update(seq=F('id'))
+    last = ChangeLog.objects.using(db).filter(user_id=OuterRef('user_id')) \
+        .order_by().values('user_id').annotate(last=Max('seq')) \
+        .values('last')
+    RecipeStats.objects.using(db) \
+        .update(change_seq=Coalesce(Subquery(last), 0))
+
+
+class Migration(migrations.Migration):
+    '''Number the change log per user, so sync tokens follow commits
+
+    Existing entries keep their id as sequence number.
+    '''
+
+    dependencies = [
+        ('core', '0014_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.PositiveBigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='changelog',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AddField(
+            model_name='recipestats',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='core_changelog_user_id_idx',
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_changelog_seq'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('user', 'seq'), name='core_changelog_user_seq_uniq'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-17 07:42
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_changelog_user_seq_uniq'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=255, validators=[core.models.validate_normalized_name]),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='name',
+            field=models.CharField(max_length=255, validators=[core.models.validate_normalized_name]),
+        ),
+    ]
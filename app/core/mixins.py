@@ -0,0 +1,30 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db.routers import (
+    is_pinned, pin_to_primary, reset_read_routing, route_reads_to_replica
+)
+
+
+class ReplicaReadMixin:
+    '''Serve safe-method requests from a read replica
+
+    Reads of a user who wrote within the REPLICA_PIN window stay on the
+    primary, so everyone reads their own writes. Every successful unsafe
+    request starts such a window for its user.
+    '''
+
+    _read_routing = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user.pk):
+            self._read_routing = route_reads_to_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._read_routing is not None:
+            reset_read_routing(self._read_routing)
+            self._read_routing = None
+        elif (request.method not in SAFE_METHODS
+              and response.status_code < 400 and request.user.pk):
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
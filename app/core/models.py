@@ -1,5 +1,11 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
@@ -40,25 +46,157 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
-class Tag(models.Model):
-    '''Recipe tag'''
-    name = models.CharField(max_length=255)
+def normalize_name(name):
+    '''Return the form of a name that duplicates of it share
+
+    Case is folded and runs of whitespace collapse to a single space, so
+    "Salt", "salt" and "Salt " all normalize to "salt".
+    '''
+    return ' '.join(name.split()).casefold()
+
+
+# casefold() may lengthen a name, e.g. "ß" folds to "ss"
+NORMALIZED_NAME_LENGTH = 255
+
+
+def validate_normalized_name(name):
+    '''Reject a name whose normalized form doesn't fit its column'''
+    if len(normalize_name(name)) > NORMALIZED_NAME_LENGTH:
+        raise ValidationError(
+            'Ensure this name has no more than %(limit)d characters once '
+            'normalized.',
+            code='normalized_max_length',
+            params={'limit': NORMALIZED_NAME_LENGTH}
+        )
+
+
+class NormalizedNameField(models.CharField):
+    '''Normalized copy of another field of the model, set on every save
+
+    ``pre_save`` derives the value, which ``save`` and ``bulk_create``
+    both call; ``bulk_update`` doesn't, see ``derived_from``.
+    '''
+
+    def __init__(self, *args, derived_from='name', **kwargs):
+        self.derived_from = derived_from
+        kwargs.setdefault('max_length', NORMALIZED_NAME_LENGTH)
+        kwargs['editable'] = False
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.derived_from != 'name':
+            kwargs['derived_from'] = self.derived_from
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = normalize_name(getattr(model_instance, self.derived_from))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class RecipeCountMixin:
+    '''Keep saves from writing back a stale ``recipe_count``
+
+    The count is changed in the database as links change, so an instance
+    loaded earlier holds an outdated copy. Updates save every other field
+    unless ``update_fields`` is given. Saving an existing instance is
+    therefore always an UPDATE: unlike a plain ``save()``, it fails with
+    ``DatabaseError`` instead of inserting the row again when it was
+    deleted meanwhile.
+    '''
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
+
+
+class Tag(RecipeCountMixin, models.Model):
+    '''Recipe tag
+
+    ``save()`` never writes ``recipe_count``, see ``RecipeCountMixin``.
+    '''
+    name = models.CharField(
+        max_length=255, validators=[validate_normalized_name]
+    )
+    normalized_name = NormalizedNameField()
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # the composite index in Meta leads with user
+        db_index=False
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # linked recipes, maintained by core.stats
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # serve the per-user list orderings and their keyset pagination
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'recipe_count', 'id'],
+                name='core_tag_user_count_idx'
+            ),
+        ]
+        # one object per name, whatever its case or spacing
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_tag_user_normalized_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
-    '''Recipe ingredient'''
-    name = models.CharField(max_length=255)
+class Ingredient(RecipeCountMixin, models.Model):
+    '''Recipe ingredient
+
+    ``save()`` never writes ``recipe_count``, see ``RecipeCountMixin``.
+    '''
+    name = models.CharField(
+        max_length=255, validators=[validate_normalized_name]
+    )
+    normalized_name = NormalizedNameField()
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # the composite index in Meta leads with user
+        db_index=False
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # linked recipes, maintained by core.stats
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # serve the per-user list orderings and their keyset pagination
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_ingr_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', 'recipe_count', 'id'],
+                name='core_ingr_user_count_idx'
+            ),
+        ]
+        # one object per name, whatever its case or spacing
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='core_ingr_user_normalized_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -69,13 +207,208 @@ class Recipe(models.Model):
     title = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # the composite index in Meta leads with user
+        db_index=False
     )
     time_minutes = models.PositiveSmallIntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
+    updated_at = models.DateTimeField(auto_now=True)
+    # title, ingredient and tag names, kept current by core.search
+    search_document = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        # serves the per-user list ordering and its keyset pagination
+        indexes = [
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+_pending_bumps = ContextVar('pending_collection_bumps', default=None)
+
+
+class CollectionVersionManager(models.Manager):
+
+    def bump(self, user_id, *names):
+        '''Increment the versions of a user's collections'''
+        pending = _pending_bumps.get()
+        if pending is not None:
+            pending.update((user_id, name) for name in names)
+            return
+
+        now = timezone.now()
+        updated = self.filter(user_id=user_id, name__in=names).update(
+            version=F('version') + 1,
+            updated_at=now
+        )
+        if updated == len(set(names)):
+            return
+
+        # first change of a collection, create its row
+        for name in names:
+            version, created = self.get_or_create(
+                user_id=user_id,
+                name=name,
+                defaults={'version': 1, 'updated_at': now}
+            )
+            if not created and version.updated_at != now:
+                self.filter(pk=version.pk).update(
+                    version=F('version') + 1,
+                    updated_at=now
+                )
+
+    @contextmanager
+    def deferred(self):
+        '''Coalesce the bumps made inside the block into one per collection
+
+        Meant for batch writes that fire a signal per object. The bumps run
+        when the block exits, so it should sit inside the transaction.
+        '''
+        if _pending_bumps.get() is not None:
+            yield
+            return
+
+        pending = set()
+        token = _pending_bumps.set(pending)
+        try:
+            yield
+        finally:
+            _pending_bumps.reset(token)
+        users = {}
+        for user_id, name in pending:
+            users.setdefault(user_id, []).append(name)
+        for user_id, names in users.items():
+            self.bump(user_id, *names)
+
+    def current(self, user_id, name):
+        '''Return the (version, updated_at) of a user's collection'''
+        try:
+            return self.values_list('version', 'updated_at') \
+                .get(user_id=user_id, name=name)
+        except self.model.DoesNotExist:
+            return (0, None)
+
+
+class CollectionVersion(models.Model):
+    '''Change counter of one of a user's collections
+
+    Bumped whenever anything that a collection's API responses include
+    changes, so comparing versions tells if a response is still current.
+    '''
+    RECIPES = 'recipes'
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+    RECIPES_AND_ATTRS = (RECIPES, TAGS, INGREDIENTS)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+    name = models.CharField(max_length=32)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_collectionversion_user_name_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class RecipeStats(models.Model):
+    '''Aggregates of a user's recipes, maintained by core.stats
+
+    Kept current incrementally on every recipe, tag, ingredient and link
+    change, so reading them is a single row lookup. Histograms hold the
+    recipe counts of the buckets in core.stats. The ``reconcile_stats``
+    command recomputes them from scratch.
+    '''
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    tag_count = models.PositiveIntegerField(default=0)
+    ingredient_count = models.PositiveIntegerField(default=0)
+    tag_link_count = models.PositiveIntegerField(default=0)
+    ingredient_link_count = models.PositiveIntegerField(default=0)
+    time_minutes_sum = models.PositiveBigIntegerField(default=0)
+    price_sum = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    time_minutes_histogram = models.JSONField(default=list)
+    price_histogram = models.JSONField(default=list)
+    # sequence number of the user's latest ChangeLog entry
+    change_seq = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.recipe_count} recipes'
+
+
+class ChangeLog(models.Model):
+    '''Latest change of a recipe, tag or ingredient, for delta sync
+
+    Written by core.changes. Each change replaces the entry of its object,
+    so the log holds one row per object: its last change, or a tombstone
+    once deleted. ``seq`` numbers the changes of a user and serves as
+    the sync token, see core.changes.
+    '''
+    RECIPE = 1
+    TAG = 2
+    INGREDIENT = 3
+    KIND_CHOICES = (
+        (RECIPE, 'recipe'),
+        (TAG, 'tag'),
+        (INGREDIENT, 'ingredient'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        # the composite index in Meta leads with user
+        db_index=False
+    )
+    seq = models.PositiveBigIntegerField()
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # finds the entry a new change of an object replaces
+            models.Index(
+                fields=['kind', 'object_id'],
+                name='core_changelog_object_idx'
+            ),
+        ]
+        constraints = [
+            # also serves the sync scan of a user's changes after a token
+            models.UniqueConstraint(
+                fields=['user', 'seq'],
+                name='core_changelog_user_seq_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        state = 'deleted' if self.deleted else 'changed'
+        return f'{self.get_kind_display()} {self.object_id} {state}'
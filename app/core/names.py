@@ -0,0 +1,153 @@
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import AutoField
+
+from core.models import CollectionVersion, normalize_name
+from core.signals import AFFECTED_COLLECTIONS, bulk_saved
+from core.stats import count_recipes
+
+
+def _insert_new(model, objs, batch_size):
+    '''Insert the objects whose names are free, return those inserted
+
+    On databases returning rows from bulk inserts this is one ``INSERT
+    ... ON CONFLICT DO NOTHING RETURNING`` per batch, which only returns
+    the rows it inserted, and ``bulk_saved`` reports them. Elsewhere each
+    object is saved in a savepoint and ``post_save`` reports it.
+    '''
+    db = router.db_for_write(model)
+    if not connections[db].features.can_return_rows_from_bulk_insert:
+        inserted = []
+        for obj in objs:
+            try:
+                with transaction.atomic(using=db):
+                    obj.save(force_insert=True, using=db)
+            except IntegrityError:
+                # a concurrent request created the name first
+                continue
+            inserted.append(obj)
+        return inserted
+
+    opts = model._meta
+    fields = [
+        field for field in opts.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    returning = (opts.pk, opts.get_field('normalized_name'))
+    by_name = {normalize_name(obj.name): obj for obj in objs}
+    inserted = []
+    for start in range(0, len(objs), batch_size):
+        rows = model._base_manager.using(db)._insert(
+            objs[start:start + batch_size], fields,
+            returning_fields=returning, using=db, ignore_conflicts=True
+        )
+        # a single skipped row comes back as None
+        for pk, normalized_name in filter(None, rows):
+            obj = by_name[normalized_name]
+            obj.pk = pk
+            obj._state.adding = False
+            obj._state.db = db
+            inserted.append(obj)
+    bulk_saved.send(sender=model, instances=inserted, created=True)
+    return inserted
+
+
+def resolve_names(model, user, names, batch_size=1000):
+    '''Return {normalized name: pk} of a user's named objects
+
+    Objects missing for any of the names are created, skipping names a
+    concurrent request creates meanwhile, so racing requests agree on a
+    single object instead of failing. Only the objects created here are
+    reported as saved. The first spelling of a name is the one stored.
+    '''
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize_name(name), name)
+    found = dict(
+        model.objects.filter(user=user, normalized_name__in=wanted)
+        .values_list('normalized_name', 'pk')
+    )
+    missing = [name for key, name in wanted.items() if key not in found]
+    if missing:
+        inserted = _insert_new(
+            model, [model(user=user, name=name) for name in missing],
+            batch_size
+        )
+        found.update((obj.normalized_name, obj.pk) for obj in inserted)
+        # created by a concurrent request, read their keys back
+        taken = [
+            key for key in map(normalize_name, missing) if key not in found
+        ]
+        if taken:
+            found.update(
+                model.objects.filter(user=user, normalized_name__in=taken)
+                .values_list('normalized_name', 'pk')
+            )
+    return found
+
+
+def find_duplicates(model, using=None):
+    '''Return {user_id: {duplicate pk: kept pk}} of a model's objects
+
+    Names are compared normalized, so this works before the
+    ``normalized_name`` column is filled. The oldest object is kept.
+    '''
+    kept = {}
+    duplicates = {}
+    objects = model.objects.using(using).order_by('pk') \
+        .values_list('pk', 'user_id', 'name')
+    for pk, user_id, name in objects.iterator():
+        key = (user_id, normalize_name(name))
+        if key in kept:
+            duplicates.setdefault(user_id, {})[pk] = kept[key]
+        else:
+            kept[key] = pk
+    return duplicates
+
+
+def merge_duplicates(model, duplicates, using=None, batch_size=500):
+    '''Move the recipe links of duplicates to the kept objects
+
+    ``duplicates`` maps duplicate to kept pks, as from
+    ``find_duplicates``. Links are rewritten with one ``bulk_update`` per
+    batch, and links the kept object already has are deleted. Then the
+    duplicates are deleted and the kept objects recounted, bumping the
+    owners' collections in the same transaction. Returns the IDs of the
+    relinked recipes.
+    '''
+    through = model._meta.get_field('recipe').through
+    target = model._meta.model_name
+    links = through.objects.using(using)
+    duplicate_ids = list(duplicates)
+    recipe_ids = set()
+    with transaction.atomic(using=using):
+        user_ids = set(
+            model.objects.using(using).filter(pk__in=duplicate_ids)
+            .values_list('user_id', flat=True)
+        )
+        for start in range(0, len(duplicate_ids), batch_size):
+            batch = duplicate_ids[start:start + batch_size]
+            kept_ids = {duplicates[pk] for pk in batch}
+            linked = set(
+                links.filter(**{f'{target}__in': kept_ids})
+                .values_list('recipe_id', f'{target}_id')
+            )
+            moved = []
+            dropped = []
+            for link in links.filter(**{f'{target}__in': batch}):
+                kept_id = duplicates[getattr(link, f'{target}_id')]
+                pair = (link.recipe_id, kept_id)
+                if pair in linked:
+                    dropped.append(link.pk)
+                else:
+                    linked.add(pair)
+                    setattr(link, f'{target}_id', kept_id)
+                    moved.append(link)
+                recipe_ids.add(link.recipe_id)
+            links.bulk_update(moved, [target], batch_size=batch_size)
+            links.filter(pk__in=dropped).delete()
+            model.objects.using(using).filter(pk__in=batch).delete()
+        count_recipes(model, {'pk__in': set(duplicates.values())}, using)
+        versions = CollectionVersion.objects.db_manager(using)
+        for user_id in user_ids:
+            versions.bump(user_id, *AFFECTED_COLLECTIONS[model])
+    return recipe_ids
@@ -0,0 +1,275 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag
+from core.signals import bulk_m2m_changed, bulk_saved, linked_recipe_ids
+
+
+# SQLite stand-in for the PostgreSQL GIN index, see migration 0009
+FTS_TABLE = 'core_recipe_fts'
+
+SEARCH_RANK = 'search_rank'
+
+# Recipes whose documents are refreshed when deferred() exits, if any
+_pending_recipe_ids = ContextVar('pending_recipe_ids', default=None)
+
+
+def build_search_documents(recipes, recipe_ids, using=None):
+    '''Return the search document of each recipe: title, ingredients, tags
+
+    ``recipes`` is the recipe model; migration 0009 has a frozen copy.
+    '''
+    parts = {
+        pk: [title]
+        for pk, title in recipes.objects.using(using)
+        .filter(pk__in=recipe_ids)
+        .order_by().values_list('pk', 'title')
+    }
+    for field_name in ('ingredients', 'tags'):
+        field = recipes._meta.get_field(field_name)
+        target = field.m2m_reverse_name()
+        links = field.remote_field.through.objects.using(using) \
+            .filter(recipe_id__in=parts) \
+            .order_by(f'{target}__name') \
+            .values_list('recipe_id', f'{target}__name')
+        for pk, name in links:
+            parts[pk].append(name)
+    return {pk: ' '.join(words) for pk, words in parts.items()}
+
+
+def refresh_search_documents(recipe_ids):
+    '''Rebuild the search documents of recipes, writing only changed ones
+
+    Runs a fixed number of queries for any number of recipes and skips
+    model signals, so it is safe to call from signal handlers. Inside
+    ``deferred`` the recipes are collected instead. A changed document
+    means changed links or names, so those recipes' ``updated_at`` is
+    stamped too, which their detail ETags follow.
+    '''
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    pending = _pending_recipe_ids.get()
+    if pending is not None:
+        pending.update(recipe_ids)
+        return
+    # read from the primary, the documents are written right after
+    documents = build_search_documents(
+        Recipe, recipe_ids, using=DEFAULT_DB_ALIAS
+    )
+    current = dict(
+        Recipe.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=documents)
+        .order_by().values_list('pk', 'search_document')
+    )
+    now = timezone.now()
+    changed = [
+        Recipe(pk=pk, search_document=document, updated_at=now)
+        for pk, document in documents.items()
+        if current[pk] != document
+    ]
+    if not changed:
+        return
+
+    Recipe.objects.bulk_update(
+        changed, ['search_document', 'updated_at'], batch_size=500
+    )
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor == 'sqlite':
+        sync_fts(connection, changed)
+
+
+@contextmanager
+def deferred():
+    '''Rebuild the search documents refreshed inside the block once
+
+    Like ``CollectionVersion.objects.deferred``, so it should sit inside
+    the transaction.
+    '''
+    if _pending_recipe_ids.get() is not None:
+        yield
+        return
+
+    pending = set()
+    token = _pending_recipe_ids.set(pending)
+    try:
+        yield
+    finally:
+        _pending_recipe_ids.reset(token)
+    refresh_search_documents(pending)
+
+
+def remove_search_documents(recipe_ids):
+    '''Drop deleted recipes from the search index'''
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor == 'sqlite' and recipe_ids:
+        sync_fts(connection, [Recipe(pk=pk) for pk in recipe_ids])
+
+
+def sync_fts(connection, recipes):
+    '''Replace the full text rows of the recipes with their documents'''
+    ids = [recipe.pk for recipe in recipes]
+    rows = [
+        (recipe.pk, recipe.search_document)
+        for recipe in recipes if recipe.search_document
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+            f'({", ".join(["%s"] * len(ids))})',
+            ids
+        )
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, search_document) '
+                f'VALUES (%s, %s)',
+                rows
+            )
+
+
+def search_terms(text):
+    '''Split search text into lowercase words'''
+    return re.findall(r'\w+', text.lower())
+
+
+def search_recipes(queryset, text):
+    '''Filter recipes matching every word of text, annotated by rank
+
+    The ``search_rank`` annotation grows with relevance. PostgreSQL
+    matches and ranks through the GIN index on the tsvector of the search
+    document, SQLite through an FTS5 table; other databases fall back to
+    unranked substring matches.
+    '''
+    terms = search_terms(text)
+    if not terms:
+        return _unranked(queryset.none())
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgresql(queryset, terms)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, terms)
+
+    for term in terms:
+        queryset = queryset.filter(search_document__icontains=term)
+    return _unranked(queryset)
+
+
+def _unranked(queryset):
+    return queryset.annotate(
+        **{SEARCH_RANK: Value(0.0, output_field=FloatField())}
+    )
+
+
+def _search_postgresql(queryset, terms):
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchRank, SearchVectorField
+    )
+
+    # must match the indexed expression exactly, see migration 0009
+    vector = Func(
+        F('search_document'),
+        template="to_tsvector('simple'::regconfig, %(expressions)s)",
+        output_field=SearchVectorField()
+    )
+    query = SearchQuery(' '.join(terms), config='simple')
+    # ts_rank is a real; as a double it survives the cursor round trip
+    rank = Cast(SearchRank(vector, query), FloatField())
+    return queryset.alias(search_vector=vector) \
+        .filter(search_vector=query) \
+        .annotate(**{SEARCH_RANK: rank})
+
+
+def _search_sqlite(queryset, terms):
+    match = ' '.join(f'"{term}"' for term in terms)
+    # bm25 is lower for better matches
+    rank = RawSQL(
+        f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid = core_recipe.id',
+        (match,),
+        output_field=FloatField()
+    )
+    matches = RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,)
+    )
+    return queryset.filter(id__in=matches).annotate(**{SEARCH_RANK: rank})
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, **kwargs):
+    '''Rebuild the search document of a saved recipe'''
+    refresh_search_documents([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_attr(sender, instance, created, **kwargs):
+    '''Rebuild the search documents of recipes with a renamed attribute'''
+    if not created:
+        refresh_search_documents(
+            linked_recipe_ids(sender, [instance])
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_attr(sender, instance, **kwargs):
+    '''Rebuild the search documents of recipes that lost an attribute'''
+    refresh_search_documents(
+        getattr(instance, '_linked_recipe_ids', ())
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    '''Drop a deleted recipe from the search index'''
+    remove_search_documents([instance.pk])
+
+
+@receiver(bulk_saved, sender=Recipe)
+@receiver(bulk_saved, sender=Tag)
+@receiver(bulk_saved, sender=Ingredient)
+def index_bulk_saved(sender, instances, created, **kwargs):
+    '''Rebuild the search documents affected by a bulk write'''
+    if sender is Recipe:
+        refresh_search_documents(
+            instance.pk for instance in instances
+        )
+    elif not created:
+        refresh_search_documents(
+            linked_recipe_ids(sender, instances)
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_link_change(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Rebuild the search documents of recipes whose links changed'''
+    if not reverse:
+        if action.startswith('post_'):
+            refresh_search_documents([instance.pk])
+    elif action == 'pre_clear':
+        # the cleared recipes can't be looked up afterwards
+        instance._linked_recipe_ids = linked_recipe_ids(
+            type(instance), [instance]
+        )
+    elif action == 'post_clear':
+        refresh_search_documents(instance._linked_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        refresh_search_documents(pk_set)
+
+
+@receiver(bulk_m2m_changed, sender=Recipe.tags.through)
+@receiver(bulk_m2m_changed, sender=Recipe.ingredients.through)
+def index_bulk_link_change(sender, instances, **kwargs):
+    '''Rebuild the search documents of recipes linked in bulk'''
+    refresh_search_documents(instance.pk for instance in instances)
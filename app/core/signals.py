@@ -0,0 +1,193 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import Signal, receiver
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+# Sent after objects were written with bulk_create/bulk_update, which
+# skip the per-object post_save. Arguments: instances, created.
+bulk_saved = Signal()
+
+# Sent after M2M links of many objects were written straight to the
+# through table, which skips m2m_changed. Sender is the through model.
+# Arguments: instances (the source side objects), replaced.
+bulk_m2m_changed = Signal()
+
+
+# Collections whose responses include an object of each model
+AFFECTED_COLLECTIONS = {
+    Recipe: (CollectionVersion.RECIPES,),
+    Tag: (CollectionVersion.TAGS, CollectionVersion.RECIPES),
+    Ingredient: (CollectionVersion.INGREDIENTS, CollectionVersion.RECIPES),
+}
+RECIPE_LINK_COLLECTIONS = {
+    Recipe.tags.through: (CollectionVersion.RECIPES, CollectionVersion.TAGS),
+    Recipe.ingredients.through: (
+        CollectionVersion.RECIPES, CollectionVersion.INGREDIENTS
+    ),
+}
+
+# Users whose deletion is in progress in this context
+_deleting_users = ContextVar('deleting_users', default=frozenset())
+
+
+def is_being_deleted(user_id):
+    '''Return whether the user is being deleted along with their objects
+
+    Cascaded deletes send post_delete for every recipe, tag and ingredient
+    before the user row goes. Handlers must not create new rows pointing
+    at that user then, or the final delete fails on the foreign key.
+    '''
+    return user_id in _deleting_users.get()
+
+
+@contextmanager
+def deferred_updates():
+    '''Run the block in a transaction, updating derived data once
+
+    The handlers below keep collection versions current, and those of
+    core.stats, core.search and core.changes the stats, recipe counts,
+    search documents and change log, for every signal. Inside the block
+    they collect their work, which runs once when the block exits,
+    before the commit. Stats flush before the change log, which may
+    create them.
+    '''
+    # those modules import this one for its signals
+    from core import changes, search, stats
+
+    with transaction.atomic(), CollectionVersion.objects.deferred(), \
+            changes.deferred(), stats.deferred(), search.deferred():
+        yield
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def mark_user_deleting(sender, instance, **kwargs):
+    '''Record that a user's cascaded delete has started'''
+    _deleting_users.set(_deleting_users.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def unmark_user_deleting(sender, instance, **kwargs):
+    '''Record that a user's cascaded delete has finished'''
+    _deleting_users.set(_deleting_users.get() - {instance.pk})
+
+
+def _bump(user_id, names):
+    if not is_being_deleted(user_id):
+        CollectionVersion.objects.bump(user_id, *names)
+
+
+def _bump_for(model, user_ids):
+    for user_id in user_ids:
+        _bump(user_id, AFFECTED_COLLECTIONS[model])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def bump_on_save(sender, instance, **kwargs):
+    '''Bump the collections that include a saved object'''
+    _bump_for(sender, [instance.user_id])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_on_delete(sender, instance, **kwargs):
+    '''Bump the collections that included a deleted object'''
+    if sender is Recipe:
+        # its links are gone too, which changes assigned tags/ingredients
+        _bump(instance.user_id, CollectionVersion.RECIPES_AND_ATTRS)
+    else:
+        _bump_for(sender, [instance.user_id])
+
+
+@receiver(bulk_saved)
+def bump_on_bulk_save(sender, instances, **kwargs):
+    '''Bump the collections that include objects saved in bulk'''
+    if sender in AFFECTED_COLLECTIONS:
+        _bump_for(sender, {instance.user_id for instance in instances})
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_on_link_change(sender, instance, action, **kwargs):
+    '''Bump the collections affected by added or removed recipe links'''
+    if action.startswith('post_'):
+        _bump(instance.user_id, RECIPE_LINK_COLLECTIONS[sender])
+
+
+@receiver(bulk_m2m_changed, sender=Recipe.tags.through)
+@receiver(bulk_m2m_changed, sender=Recipe.ingredients.through)
+def bump_on_bulk_link_change(sender, instances, **kwargs):
+    '''Bump the collections affected by recipe links written in bulk'''
+    for user_id in {instance.user_id for instance in instances}:
+        _bump(user_id, RECIPE_LINK_COLLECTIONS[sender])
+
+
+def linked_recipe_ids(model, instances):
+    '''Return the IDs of recipes linked to tags or ingredients'''
+    field_name = model._meta.model_name
+    through = Recipe._meta.get_field(f'{field_name}s').remote_field.through
+    return set(
+        through.objects.filter(**{f'{field_name}__in': instances})
+        .values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_linked_recipes(sender, instance, **kwargs):
+    '''Remember the recipes of an attribute before its links go
+
+    Read after the delete by the search, stats and change log handlers.
+    '''
+    if not is_being_deleted(instance.user_id):
+        instance._linked_recipe_ids = linked_recipe_ids(sender, [instance])
+
+
+def linked_ids(sender, instance, reverse=False, pk_set=None):
+    '''Return the IDs linked to an object, among the given ones if any'''
+    field = Recipe._meta.get_field(
+        'tags' if sender is Recipe.tags.through else 'ingredients'
+    )
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    if reverse:
+        source, target = target, source
+    links = sender.objects.filter(**{source: instance.pk})
+    if pk_set is not None:
+        links = links.filter(**{f'{target}__in': pk_set})
+    return list(links.values_list(f'{target}_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def collect_unlinked(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Find the links that remove() or clear() is about to delete
+
+    Read by ``changed_links`` after the links went.
+    '''
+    if action in ('pre_remove', 'pre_clear') and \
+            not is_being_deleted(instance.user_id):
+        # remove() may name objects that aren't linked
+        instance._unlinked_ids = linked_ids(
+            sender, instance, reverse,
+            pk_set if action == 'pre_remove' else None
+        )
+
+
+def changed_links(action, instance, pk_set):
+    '''Return the (sign, IDs) of the links an m2m action changed'''
+    if action == 'post_add':
+        return 1, pk_set
+    if action in ('post_remove', 'post_clear'):
+        return -1, getattr(instance, '_unlinked_ids', ())
+    return 0, ()
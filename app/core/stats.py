@@ -0,0 +1,458 @@
+import bisect
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+    ChangeLog, CollectionVersion, Ingredient, Recipe, RecipeStats, Tag
+)
+from core.signals import (
+    AFFECTED_COLLECTIONS, bulk_m2m_changed, bulk_saved, changed_links,
+    is_being_deleted, linked_ids
+)
+
+
+# Stats changes of each user made inside deferred(), if any
+_pending_stats = ContextVar('pending_stats', default=None)
+
+# Upper bounds of the histogram buckets, the last bucket is open ended
+TIME_MINUTES_BOUNDS = (10, 20, 30, 45, 60, 90, 120)
+PRICE_BOUNDS = (5, 10, 20, 50, 100)
+
+HISTOGRAMS = (
+    ('time_minutes', 'time_minutes_histogram', TIME_MINUTES_BOUNDS),
+    ('price', 'price_histogram', PRICE_BOUNDS),
+)
+
+# counter of each model, and of the links of each relation
+COUNTERS = {Tag: 'tag_count', Ingredient: 'ingredient_count'}
+LINK_COUNTERS = {
+    Recipe.tags.through: 'tag_link_count',
+    Recipe.ingredients.through: 'ingredient_link_count',
+}
+
+
+def _bucket(bounds, value):
+    return bisect.bisect_left(bounds, value)
+
+
+def _bucket_filters(field_name, bounds):
+    '''Return a filter selecting the values of each bucket'''
+    filters = []
+    lower = None
+    for upper in bounds + (None,):
+        condition = Q()
+        if lower is not None:
+            condition &= Q(**{f'{field_name}__gt': lower})
+        if upper is not None:
+            condition &= Q(**{f'{field_name}__lte': upper})
+        filters.append(condition)
+        lower = upper
+    return filters
+
+
+def compute_stats(recipes, tags, ingredients, user_id, using=None):
+    '''Return the stats of a user computed from their rows
+
+    The models are passed in; migrations 0010 and 0012 have frozen copies.
+    '''
+    user_recipes = recipes.objects.using(using).filter(user_id=user_id)
+    aggregates = {
+        'recipe_count': Count('id'),
+        'time_minutes_sum': Sum('time_minutes'),
+        'price_sum': Sum('price'),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        for i, condition in enumerate(_bucket_filters(field_name, bounds)):
+            aggregates[f'{histogram}_{i}'] = Count('id', filter=condition)
+    totals = user_recipes.aggregate(**aggregates)
+
+    stats = {
+        'recipe_count': totals['recipe_count'],
+        'time_minutes_sum': totals['time_minutes_sum'] or 0,
+        'price_sum': totals['price_sum'] or Decimal('0'),
+        'tag_count': tags.objects.using(using)
+        .filter(user_id=user_id).count(),
+        'ingredient_count': ingredients.objects.using(using)
+        .filter(user_id=user_id).count(),
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        stats[histogram] = [
+            totals[f'{histogram}_{i}'] for i in range(len(bounds) + 1)
+        ]
+    for field_name in ('tags', 'ingredients'):
+        through = recipes._meta.get_field(field_name).remote_field.through
+        stats[f'{field_name[:-1]}_link_count'] = through.objects \
+            .using(using).filter(recipe__user_id=user_id).count()
+    return stats
+
+
+def count_recipes(model, filters, using=None):
+    '''Recount the linked recipes of the matching tags or ingredients
+
+    A single UPDATE with a correlated count per row, which stamps the
+    rows' ``updated_at`` too; returns the number of rows updated.
+    Migrations 0011 and 0012 have frozen copies.
+    '''
+    through = model._meta.get_field('recipe').through
+    name = model._meta.model_name
+    links = through.objects.using(using).filter(**{name: OuterRef('pk')}) \
+        .order_by().values(name).annotate(count=Count('pk')).values('count')
+    return model.objects.using(using).filter(**filters).update(
+        recipe_count=Coalesce(Subquery(links), 0),
+        updated_at=timezone.now()
+    )
+
+
+def store_stats(user_id):
+    '''Recompute the stats row of a user from scratch
+
+    A new row continues the sequence of the user's change log.
+    '''
+    pending = _pending_stats.get()
+    if pending is not None:
+        pending[user_id] = None
+        return
+    stats, created = RecipeStats.objects.update_or_create(
+        user_id=user_id,
+        defaults=compute_stats(
+            Recipe, Tag, Ingredient, user_id, using=DEFAULT_DB_ALIAS
+        )
+    )
+    if created:
+        stats.change_seq = ChangeLog.objects.filter(user_id=user_id) \
+            .aggregate(last=Max('seq'))['last'] or 0
+        if stats.change_seq:
+            stats.save(update_fields=['change_seq'])
+
+
+def reconcile_stats(user_ids):
+    '''Recompute the stats and recipe counts of the users from scratch
+
+    Each user is recomputed in a transaction of its own, which bumps the
+    collections showing the recounted tags or ingredients.
+    '''
+    for user_id in user_ids:
+        with transaction.atomic():
+            store_stats(user_id)
+            for model in COUNTERS:
+                if count_recipes(
+                    model, {'user_id': user_id}, using=DEFAULT_DB_ALIAS
+                ):
+                    CollectionVersion.objects.bump(
+                        user_id, *AFFECTED_COLLECTIONS[model]
+                    )
+
+
+def _decimal(price):
+    # floats, as in Recipe(price=5.5), convert by their shortest repr
+    return price if isinstance(price, Decimal) else Decimal(str(price))
+
+
+def recipe_values(recipe):
+    '''Return the (time_minutes, price) of a recipe the stats track'''
+    return recipe.time_minutes, _decimal(recipe.price)
+
+
+def update_stats(user_id, added=(), removed=(), **counts):
+    '''Apply recipe and counter changes to a user's stats
+
+    ``added`` and ``removed`` are recipes, or their (time_minutes,
+    price) values, that entered or left the stats. ``counts`` are deltas
+    of the other counters. The row is locked while it is changed; a user
+    without stats has them computed instead, which already includes
+    the change. Inside ``deferred`` the changes are collected instead.
+    '''
+    pending = _pending_stats.get()
+    if pending is None:
+        _apply_stats(user_id, added, removed, counts)
+        return
+    if user_id in pending and pending[user_id] is None:
+        # recomputed when the block exits anyway
+        return
+    change = pending.setdefault(
+        user_id, {'added': [], 'removed': [], 'counts': Counter()}
+    )
+    # the values now, the recipes may change before the block exits
+    change['added'].extend(map(_values, added))
+    change['removed'].extend(map(_values, removed))
+    change['counts'].update(counts)
+
+
+def _values(recipe):
+    return recipe_values(recipe) if isinstance(recipe, Recipe) else recipe
+
+
+@contextmanager
+def deferred():
+    '''Apply the stats changes made inside the block once per user
+
+    Like ``CollectionVersion.objects.deferred``, so it should sit inside
+    the transaction. Recomputations from ``store_stats`` are deferred
+    too, and replace the other changes of their user.
+    '''
+    if _pending_stats.get() is not None:
+        yield
+        return
+
+    pending = {}
+    token = _pending_stats.set(pending)
+    try:
+        yield
+    finally:
+        _pending_stats.reset(token)
+    for user_id, change in pending.items():
+        if change is None:
+            store_stats(user_id)
+        else:
+            _apply_stats(
+                user_id, change['added'], change['removed'], change['counts']
+            )
+
+
+def _apply_stats(user_id, added, removed, counts):
+    with transaction.atomic():
+        stats = RecipeStats.objects.select_for_update() \
+            .filter(user_id=user_id).first()
+        if stats is None:
+            store_stats(user_id)
+            return
+
+        for sign, recipes in ((1, added), (-1, removed)):
+            for values in recipes:
+                if isinstance(values, Recipe):
+                    values = recipe_values(values)
+                time_minutes, price = values
+                stats.recipe_count += sign
+                stats.time_minutes_sum += sign * time_minutes
+                stats.price_sum += sign * _decimal(price)
+                for (field_name, histogram, bounds), value in zip(
+                        HISTOGRAMS, values):
+                    getattr(stats, histogram)[_bucket(bounds, value)] += sign
+        for name, delta in counts.items():
+            setattr(stats, name, getattr(stats, name) + delta)
+        stats.save()
+
+
+def stats_summary(user_id):
+    '''Return the dashboard figures of a user from their stored stats'''
+    stats = RecipeStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = RecipeStats(
+            **compute_stats(Recipe, Tag, Ingredient, user_id)
+        )
+    count = stats.recipe_count
+    summary = {
+        'recipe_count': count,
+        'tag_count': stats.tag_count,
+        'ingredient_count': stats.ingredient_count,
+        'tag_usage': stats.tag_link_count,
+        'ingredient_usage': stats.ingredient_link_count,
+    }
+    for field_name, histogram, bounds in HISTOGRAMS:
+        total = getattr(stats, f'{field_name}_sum')
+        counts = getattr(stats, histogram)
+        summary[field_name] = {
+            'sum': total,
+            'average': round(total / count, 2) if count else None,
+            'histogram': [
+                {'max': bound, 'count': bucket_count}
+                for bound, bucket_count in zip(bounds + (None,), counts)
+            ],
+        }
+    return summary
+
+
+# the recipe counts of each link model
+LINKED_MODELS = {
+    Recipe.tags.through: Tag,
+    Recipe.ingredients.through: Ingredient,
+}
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_stats_values(sender, instance, raw, **kwargs):
+    '''Remember the tracked values of a recipe before it changes'''
+    if not raw and not instance._state.adding:
+        instance._stats_values = Recipe.objects.filter(pk=instance.pk) \
+            .values_list('time_minutes', 'price').first()
+
+
+@receiver(post_save, sender=Recipe)
+def stats_saved_recipe(sender, instance, created, raw, **kwargs):
+    '''Count a new recipe, or the changed values of a saved one'''
+    if raw or is_being_deleted(instance.user_id):
+        return
+    if created:
+        update_stats(instance.user_id, added=[instance])
+        return
+    previous = getattr(instance, '_stats_values', None)
+    current = recipe_values(instance)
+    if previous is not None and previous != current:
+        update_stats(
+            instance.user_id, added=[current], removed=[previous]
+        )
+    instance._stats_values = current
+
+
+def _change_recipe_counts(model, pks, delta):
+    if pks:
+        # stamped, recipe details render the counts of their attributes
+        model.objects.filter(pk__in=pks).update(
+            recipe_count=F('recipe_count') + delta,
+            updated_at=timezone.now()
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_recipe_links(sender, instance, **kwargs):
+    '''Find the links of a recipe before they are deleted with it'''
+    if not is_being_deleted(instance.user_id):
+        instance._linked_ids = {
+            through: linked_ids(through, instance)
+            for through in LINKED_MODELS
+        }
+
+
+@receiver(post_delete, sender=Recipe)
+def stats_deleted_recipe(sender, instance, **kwargs):
+    '''Take a deleted recipe and its links out of the stats and counts'''
+    if is_being_deleted(instance.user_id):
+        return
+    links = getattr(instance, '_linked_ids', {})
+    update_stats(
+        instance.user_id,
+        removed=[instance],
+        **{LINK_COUNTERS[through]: -len(ids)
+           for through, ids in links.items()}
+    )
+    for through, ids in links.items():
+        _change_recipe_counts(LINKED_MODELS[through], ids, -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def stats_created_attr(sender, instance, created, raw, **kwargs):
+    '''Count a new tag or ingredient'''
+    if created and not raw and not is_being_deleted(instance.user_id):
+        update_stats(
+            instance.user_id, **{COUNTERS[sender]: 1}
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def stats_deleted_attr(sender, instance, **kwargs):
+    '''Take a deleted tag or ingredient and its links out of the stats'''
+    if is_being_deleted(instance.user_id):
+        return
+    through = Recipe._meta.get_field(
+        f'{sender._meta.model_name}s'
+    ).remote_field.through
+    # collected before the links went, see collect_linked_recipes
+    links = len(getattr(instance, '_linked_recipe_ids', ()))
+    update_stats(instance.user_id, **{
+        COUNTERS[sender]: -1,
+        LINK_COUNTERS[through]: -links,
+    })
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def stats_link_change(sender, instance, action, pk_set, **kwargs):
+    '''Count added and removed recipe links'''
+    sign, ids = changed_links(action, instance, pk_set)
+    if ids and not is_being_deleted(instance.user_id):
+        update_stats(
+            instance.user_id, **{LINK_COUNTERS[sender]: sign * len(ids)}
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_link_change(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Keep the recipe counts of relinked tags or ingredients current'''
+    sign, ids = changed_links(action, instance, pk_set)
+    if not ids or is_being_deleted(instance.user_id):
+        return
+    model = LINKED_MODELS[sender]
+    if reverse:
+        _change_recipe_counts(model, [instance.pk], sign * len(ids))
+    else:
+        _change_recipe_counts(model, ids, sign)
+
+
+@receiver(bulk_saved, sender=Recipe)
+@receiver(bulk_saved, sender=Tag)
+@receiver(bulk_saved, sender=Ingredient)
+def stats_bulk_saved(sender, instances, created, **kwargs):
+    '''Apply objects written in bulk to the stats of their users'''
+    users = {}
+    for instance in instances:
+        users.setdefault(instance.user_id, []).append(instance)
+    for user_id, user_instances in users.items():
+        if is_being_deleted(user_id):
+            continue
+        if sender is not Recipe:
+            if created:
+                update_stats(
+                    user_id, **{COUNTERS[sender]: len(user_instances)}
+                )
+        elif created:
+            update_stats(user_id, added=user_instances)
+        else:
+            # the values before a bulk update are unknown
+            store_stats(user_id)
+
+
+@receiver(bulk_m2m_changed, sender=Recipe.tags.through)
+@receiver(bulk_m2m_changed, sender=Recipe.ingredients.through)
+def stats_bulk_link_change(sender, instances, replaced, **kwargs):
+    '''Apply recipe links written in bulk to the stats'''
+    counter = LINK_COUNTERS[sender]
+    users = {}
+    for instance in instances:
+        users.setdefault(instance.user_id, []).append(instance.pk)
+    for user_id, recipe_ids in users.items():
+        if is_being_deleted(user_id):
+            continue
+        if replaced:
+            # the replaced links are gone, recount the user's links
+            links = sender.objects.filter(recipe__user_id=user_id).count()
+            RecipeStats.objects.filter(user_id=user_id) \
+                .update(**{counter: links})
+        else:
+            # links of recipes written in bulk are all new
+            links = sender.objects.filter(recipe_id__in=recipe_ids).count()
+            update_stats(user_id, **{counter: links})
+
+
+@receiver(bulk_m2m_changed, sender=Recipe.tags.through)
+@receiver(bulk_m2m_changed, sender=Recipe.ingredients.through)
+def count_bulk_link_change(sender, instances, replaced, **kwargs):
+    '''Recount the recipes of tags or ingredients linked in bulk'''
+    model = LINKED_MODELS[sender]
+    user_ids = {
+        instance.user_id for instance in instances
+        if not is_being_deleted(instance.user_id)
+    }
+    if not user_ids:
+        return
+    if replaced:
+        # the replaced links are gone, so recount every object of the users
+        count_recipes(model, {'user_id__in': user_ids})
+    else:
+        linked = sender.objects.filter(
+            recipe_id__in=[instance.pk for instance in instances]
+        ).values(f'{model._meta.model_name}_id')
+        count_recipes(model, {'pk__in': linked})
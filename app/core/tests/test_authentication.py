@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication
+
+
+@override_settings(TOKEN_AUTH_CACHE={'BACKEND': 'local', 'TIMEOUT': 60})
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_lookup_skips_database(self):
+        '''Test that a repeated token lookup runs no queries'''
+        user, token = self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            cached_user, cached_token = \
+                self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token, token)
+
+    def test_cached_user_is_a_copy(self):
+        '''Test that changes to a returned user don't leak into the cache'''
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        user.name = 'Changed'
+
+        cached_user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(cached_user.name, '')
+
+    def test_invalid_token(self):
+        '''Test that unknown tokens are rejected'''
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+    def test_token_delete_invalidates(self):
+        '''Test that a deleted token is rejected immediately'''
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_deactivation_invalidates(self):
+        '''Test that a deactivated user is rejected immediately'''
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_user_delete_invalidates(self):
+        '''Test that the token of a deleted user is rejected immediately'''
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_eviction_waits_for_commit(self):
+        '''Test that a change evicts the cached token once it commits'''
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+            self.assertTrue(user.is_active)
+
+        for callback in callbacks:
+            callback()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    @override_settings(WORKER_PROCESSES=4)
+    def test_local_cache_unused_by_several_workers(self):
+        '''Test that evictions can't miss the cache of another worker'''
+        self.auth.authenticate_credentials(self.token.key)
+
+        # another worker deletes the token, this one sees no signal
+        Token.objects.filter(pk=self.token.pk).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
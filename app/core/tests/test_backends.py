@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase, override_settings
+
+from core.hashers import PasswordHashTimeout, verify_password
+
+
+# fast hashers keep the tests quick, only their order matters here
+MD5_FIRST = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+    'django.contrib.auth.hashers.SHA1PasswordHasher',
+]
+SHA1_FIRST = list(reversed(MD5_FIRST))
+
+
+@override_settings(PASSWORD_HASHERS=MD5_FIRST)
+class PooledModelBackendTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+
+    def test_authenticate_success(self):
+        '''Test that valid credentials return the user'''
+        user = authenticate(username='test@gmail.com', password='testpassword')
+
+        self.assertEqual(user, self.user)
+
+    def test_authenticate_wrong_password(self):
+        '''Test that an invalid password is rejected'''
+        user = authenticate(username='test@gmail.com', password='wrong')
+
+        self.assertIsNone(user)
+
+    def test_authenticate_unknown_user(self):
+        '''Test that an unknown user is rejected after hashing once'''
+        with patch('core.backends.hash_password') as hash_password:
+            user = authenticate(username='none@gmail.com', password='x')
+
+        self.assertIsNone(user)
+        hash_password.assert_called_once_with('x')
+
+    def test_authenticate_inactive_user(self):
+        '''Test that inactive users are rejected'''
+        self.user.is_active = False
+        self.user.save()
+
+        user = authenticate(username='test@gmail.com', password='testpassword')
+
+        self.assertIsNone(user)
+
+    def test_rehash_on_login(self):
+        '''Test that a login upgrades a hash made with an older hasher'''
+        self.assertTrue(self.user.password.startswith('md5$'))
+
+        with self.settings(PASSWORD_HASHERS=SHA1_FIRST):
+            authenticate(username='test@gmail.com', password='testpassword')
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('sha1$'))
+        self.assertTrue(self.user.check_password('testpassword'))
+
+    def test_no_rehash_when_current(self):
+        '''Test that an up to date hash is left alone'''
+        password = self.user.password
+
+        authenticate(username='test@gmail.com', password='testpassword')
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, password)
+
+    def test_verify_password(self):
+        '''Test verifying a password in the hash pool'''
+        self.assertEqual(
+            verify_password('testpassword', self.user.password),
+            (True, False)
+        )
+        self.assertEqual(
+            verify_password('wrong', self.user.password),
+            (False, False)
+        )
+
+    @patch('core.backends.verify_password', side_effect=PasswordHashTimeout)
+    def test_token_throttled_when_pool_busy(self, verify):
+        '''Test that logins back off when no hash worker is free'''
+        res = self.client.post('/api/user/token/', {
+            'email': 'test@gmail.com',
+            'password': 'testpassword',
+        })
+
+        self.assertEqual(res.status_code, 429)
@@ -0,0 +1,138 @@
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.benchmark import compare_results, run_benchmark, seed_dataset
+from core.models import Recipe, RecipeStats, Tag
+
+
+def figures(**overrides):
+    '''Return benchmark figures of one endpoint'''
+    result = {
+        'requests_per_second': 100.0,
+        'p50_ms': 5.0,
+        'p95_ms': 10.0,
+        'p99_ms': 20.0,
+        'mean_queries': 4.0,
+        'errors': 0,
+        'peak_alloc_kib': 50.0,
+    }
+    result.update(overrides)
+    return result
+
+
+class SeedDatasetTests(TestCase):
+
+    def recipes(self):
+        return [
+            (recipe.title, recipe.price, recipe.tags.count())
+            for recipe in Recipe.objects.order_by('id')
+        ]
+
+    def test_seed_dataset(self):
+        '''Test seeding users with recipes, tags and tokens'''
+        users = seed_dataset(users=2, recipes=3, tags=4, ingredients=5)
+
+        self.assertEqual(len(users), 2)
+        self.assertEqual(Recipe.objects.count(), 6)
+        self.assertEqual(Tag.objects.filter(user=users[1]).count(), 4)
+        self.assertTrue(users[0].auth_token.key)
+        recipe = Recipe.objects.first()
+        self.assertTrue(recipe.search_document.startswith(recipe.title))
+
+    def test_seed_updates_derived_data_once(self):
+        '''Test that seeding defers counts, stats and the search index'''
+        with CaptureQueriesContext(connection) as queries:
+            users = seed_dataset(users=2, recipes=3, tags=4, ingredients=5)
+
+        self.assertEqual(sum(
+            query['sql'].startswith('UPDATE "core_recipe" SET')
+            for query in queries.captured_queries
+        ), 1)
+        for tag in Tag.objects.annotate(linked=Count('recipe')):
+            self.assertEqual(tag.recipe_count, tag.linked)
+        for user in users:
+            stats = RecipeStats.objects.get(user=user)
+            self.assertEqual(stats.recipe_count, 3)
+
+    def test_seed_reproducible(self):
+        '''Test that the same seed replaces the data with the same data'''
+        seed_dataset(users=2, recipes=3, tags=4, ingredients=5, seed=7)
+        first = self.recipes()
+
+        seed_dataset(users=2, recipes=3, tags=4, ingredients=5, seed=7)
+
+        self.assertEqual(self.recipes(), first)
+
+
+class RunBenchmarkTests(TestCase):
+
+    def test_run_benchmark(self):
+        '''Test that every endpoint is driven without errors'''
+        seed_dataset(users=2, recipes=3, tags=4, ingredients=5)
+
+        results = run_benchmark(requests=3, allocation_samples=1)
+
+        self.assertEqual(
+            list(results), ['recipes', 'tags', 'ingredients', 'token', 'me']
+        )
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['requests_per_second'], 0)
+            self.assertGreater(result['peak_alloc_kib'], 0)
+        self.assertGreater(results['recipes']['mean_queries'], 0)
+
+    def test_baseline_round_trip(self):
+        '''Test saving a baseline and comparing a later run with it'''
+        call_command(
+            'seed_recipes', users=1, recipes=2, tags=2, ingredients=2,
+            stdout=io.StringIO()
+        )
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(os.remove, path)
+        stdout = io.StringIO()
+
+        call_command(
+            'benchmark_api', requests=2, save_baseline=path, stdout=stdout
+        )
+        call_command(
+            'benchmark_api', requests=2, compare=path, tolerance=100,
+            stdout=stdout
+        )
+
+        self.assertIn('No regressions', stdout.getvalue())
+
+    def test_requires_seeded_users(self):
+        '''Test that the benchmark refuses to run without a dataset'''
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', requests=1)
+
+
+class CompareResultsTests(SimpleTestCase):
+
+    def test_within_tolerance(self):
+        '''Test that small changes are not regressions'''
+        baseline = {'recipes': figures()}
+        results = {'recipes': figures(requests_per_second=90, p95_ms=11)}
+
+        self.assertEqual(compare_results(results, baseline), [])
+
+    def test_regressions_reported(self):
+        '''Test that slower, heavier or failing endpoints are reported'''
+        baseline = {'recipes': figures(), 'tags': figures()}
+        results = {
+            'recipes': figures(requests_per_second=50, p95_ms=30),
+            'tags': figures(mean_queries=5, errors=1),
+        }
+
+        regressions = compare_results(results, baseline)
+
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(regressions[0].startswith('recipes:'))
@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.cache import LocalLRUCache, SharedCache, build_cache
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+
+    def test_get_and_set(self):
+        '''Test that cached values are returned and counted as hits'''
+        cache = LocalLRUCache()
+        cache.set('key', 'value')
+
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_evicted(self):
+        '''Test that the least recently used entry is evicted first'''
+        cache = LocalLRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        '''Test that entries are dropped once their timeout passes'''
+        monotonic.return_value = 100
+        cache = LocalLRUCache(timeout=10)
+        cache.set('key', 'value')
+
+        monotonic.return_value = 109
+        self.assertEqual(cache.get('key'), 'value')
+        monotonic.return_value = 110
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_delete(self):
+        '''Test removing entries'''
+        cache = LocalLRUCache()
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.set('c', 3)
+
+        cache.delete('a')
+        cache.delete_many(['b', 'missing'])
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+
+class SharedCacheTests(TestCase):
+
+    def test_get_and_set(self):
+        '''Test that values round trip through the Django cache'''
+        cache = build_cache({'BACKEND': 'shared'}, key_prefix='test:')
+        cache.set('key', 'value')
+
+        self.assertIsInstance(cache, SharedCache)
+        self.assertEqual(cache.get('key'), 'value')
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    })
+    def test_process_local_alias_refused(self):
+        '''Test that a cache local to the process can't be the shared one'''
+        with self.assertRaises(ImproperlyConfigured):
+            build_cache({'BACKEND': 'shared'})
@@ -1,22 +1,147 @@
+import io
+import os
+import tempfile
 from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Recipe, RecipeStats, Tag
+
+
+CHECK_CONNECTION = 'core.management.commands.wait_for_db.check_connection'
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         '''Test waiting for db when db is available'''
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True  # let mock object return true
-            call_command('wait_for_db')  # wait_for_db is
-            self.assertEqual(gi.call_count, 1)
+        with patch(CHECK_CONNECTION) as cc:
+            call_command('wait_for_db')
+            self.assertEqual(cc.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         '''Test waiting for db'''
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch(CHECK_CONNECTION) as cc:
+            cc.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cc.call_count, 6)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        '''Test giving up once the timeout passed'''
+        with patch(CHECK_CONNECTION) as cc:
+            cc.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+
+class ImportRecipesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+
+    def write_file(self, suffix, content):
+        '''Write a temporary import file and return its path'''
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, delete=False) as import_file:
+            import_file.write(content)
+        self.addCleanup(os.remove, import_file.name)
+        return import_file.name
+
+    def test_import_recipes(self):
+        '''Test importing a CSV file in batches'''
+        rows = ''.join(f'Recipe {i},10,5.00,Quick\n' for i in range(5))
+        path = self.write_file(
+            '.csv', 'title,time_minutes,price,tags\n' + rows
+        )
+        stdout = io.StringIO()
+
+        call_command(
+            'import_recipes', path, user='test@gmail.com', batch_size=2,
+            stdout=stdout
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertIn('rows/sec', stdout.getvalue())
+        self.assertIn('Imported 5 recipes', stdout.getvalue())
+
+    def test_import_recipes_unknown_user(self):
+        '''Test that the user must exist'''
+        path = self.write_file('.ndjson', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='nobody@gmail.com')
+
+
+class ReconcileStatsCommandTests(TestCase):
+
+    def test_reconcile_stats(self):
+        '''Test recomputing the stats of every user'''
+        user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        Recipe.objects.create(
+            user=user, title='Curry', time_minutes=25, price=5
+        )
+        RecipeStats.objects.update(recipe_count=7)
+        stdout = io.StringIO()
+
+        call_command('reconcile_stats', stdout=stdout)
+
+        self.assertEqual(RecipeStats.objects.get(user=user).recipe_count, 1)
+        self.assertIn('1 users', stdout.getvalue())
+
+    def test_reconcile_stats_unknown_user(self):
+        '''Test that the given user must exist'''
+        with self.assertRaises(CommandError):
+            call_command('reconcile_stats', user='nobody@gmail.com')
+
+
+class DedupeNamesCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        copy = Tag.objects.create(user=self.user, name='Vegan copy')
+        Tag.objects.filter(pk=copy.pk).update(name='VEGAN')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        self.recipe.tags.add(copy)
+
+    def test_dedupe_names(self):
+        '''Test merging duplicates and recounting their stats'''
+        stdout = io.StringIO()
+
+        call_command('dedupe_names', stdout=stdout)
+
+        self.assertEqual(list(Tag.objects.all()), [self.tag])
+        self.assertEqual(list(self.recipe.tags.all()), [self.tag])
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        self.assertEqual(RecipeStats.objects.get().tag_count, 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.search_document, 'Curry Vegan')
+        self.assertIn('Merged 1 duplicate tags', stdout.getvalue())
+
+    def test_dedupe_names_dry_run(self):
+        '''Test that a dry run only reports the duplicates'''
+        stdout = io.StringIO()
+
+        call_command('dedupe_names', dry_run=True, stdout=stdout)
+
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertIn('1 duplicate tags of 1 users', stdout.getvalue())
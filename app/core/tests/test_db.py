@@ -0,0 +1,192 @@
+import os
+import tempfile
+import threading
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import check_connection
+from core.db.mixins import HealthCheckMixin, PooledConnectionMixin
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_released_connection_reused(self):
+        '''Test that a released connection is handed out again'''
+        pool = ConnectionPool(max_size=2)
+        conn = pool.acquire(Mock)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(Mock), conn)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_full_pool_times_out(self):
+        '''Test that a checkout gives up when every connection is in use'''
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(Mock)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(Mock)
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        '''Test that a waiting checkout receives the next release'''
+        pool = ConnectionPool(max_size=1, timeout=5)
+        conn = pool.acquire(Mock)
+        threading.Timer(0.05, pool.release, [conn]).start()
+
+        self.assertIs(pool.acquire(Mock), conn)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        '''Test that a connection which failed to open takes no slot'''
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+
+        with self.assertRaises(OperationalError):
+            pool.acquire(Mock(side_effect=OperationalError))
+        pool.acquire(Mock)
+
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_unhealthy_idle_connection_replaced(self):
+        '''Test that idle connections failing the check are discarded'''
+        pool = ConnectionPool(
+            max_size=1, check=Mock(return_value=False), check_after=0
+        )
+        conn = pool.acquire(Mock)
+        pool.release(conn)
+
+        self.assertIsNot(pool.acquire(Mock), conn)
+        conn.close.assert_called_once_with()
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_recent_connection_not_checked(self):
+        '''Test that recently used connections skip the check'''
+        check = Mock(return_value=False)
+        pool = ConnectionPool(check=check, check_after=60)
+        pool.release(pool.acquire(Mock))
+
+        pool.acquire(Mock)
+
+        check.assert_not_called()
+
+
+class TestDatabaseWrapper(HealthCheckMixin, PooledConnectionMixin,
+                          sqlite.DatabaseWrapper):
+    '''SQLite stand-in for core.db.postgresql'''
+
+
+class DatabaseWrapperTests(SimpleTestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def wrapper(self, **settings):
+        '''Return a database wrapper on a scratch database'''
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': self.path,
+            **settings,
+        }
+        wrapper = TestDatabaseWrapper(settings_dict, alias=self.id())
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pooled_connection_returned_and_reused(self):
+        '''Test that closing hands the connection back to the pool'''
+        wrapper = self.wrapper(CONN_MAX_AGE=0, POOL={'MAX_SIZE': 1})
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+
+        wrapper.close()
+        self.assertEqual(wrapper.connection_pool.stats()['idle'], 1)
+        wrapper.ensure_connection()
+
+        self.assertIs(wrapper.connection, raw)
+        self.addCleanup(wrapper.connection_pool.close_idle)
+
+    def test_pooled_transaction_rolled_back(self):
+        '''Test that open transactions don't leak into the next checkout'''
+        wrapper = self.wrapper(CONN_MAX_AGE=0, POOL={'MAX_SIZE': 1})
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE pooled (id integer)')
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO pooled VALUES (1)')
+
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM pooled')
+            self.assertEqual(cursor.fetchone(), (0,))
+        self.addCleanup(wrapper.connection_pool.close_idle)
+
+    def test_health_check_replaces_dropped_connection(self):
+        '''Test that a dead persistent connection is reopened'''
+        wrapper = self.wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+
+        # a new request starts
+        wrapper.close_if_unusable_or_obsolete()
+        with patch.object(wrapper, 'is_usable', return_value=False) as iu:
+            wrapper.cursor().close()
+            wrapper.cursor().close()
+
+        self.assertEqual(iu.call_count, 1)
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_health_check_disabled(self):
+        '''Test that connections aren't checked without the setting'''
+        wrapper = self.wrapper(CONN_MAX_AGE=None)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(wrapper, 'is_usable') as iu:
+            wrapper.cursor().close()
+
+        iu.assert_not_called()
+
+
+class CheckConnectionTests(TestCase):
+
+    def test_reachable(self):
+        '''Test that a reachable database passes the check'''
+        check_connection()
+
+    def test_unreachable(self):
+        '''Test that connection failures are raised'''
+        with patch.object(
+            connection, 'cursor', side_effect=OperationalError
+        ), patch.object(connection, 'close') as close:
+            with self.assertRaises(OperationalError):
+                check_connection()
+
+        close.assert_called_once_with()
+
+
+class PoolStatsApiTests(TestCase):
+
+    def test_counters_listed(self):
+        '''Test that staff users can read the pool counters'''
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser(
+            'admin@gmail.com',
+            'testpassword'
+        ))
+
+        res = client.get(reverse('core:pools'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import names
+from core.models import (
+    CollectionVersion, Ingredient, Recipe, RecipeStats, Tag, normalize_name
+)
+from core.names import find_duplicates, merge_duplicates, resolve_names
+
+
+class NamesTests(TestCase):
+    '''Test normalized tag and ingredient names'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+
+    def duplicate(self, model, name, spelling):
+        '''Create a duplicate of a name, as stored before the constraint'''
+        obj = model.objects.create(user=self.user, name=f'{name} copy')
+        model.objects.filter(pk=obj.pk).update(name=spelling)
+        return obj
+
+    def test_normalize_name(self):
+        '''Test that case and spacing are ignored'''
+        self.assertEqual(normalize_name('  Sea   SALT '), 'sea salt')
+
+    def test_saved_normalized(self):
+        '''Test that saves store the normalized name'''
+        tag = Tag.objects.create(user=self.user, name='Plant Based')
+        tag.name = 'Plant  BASED'
+        tag.save()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.normalized_name, 'plant based')
+
+    def test_resolve_names(self):
+        '''Test that existing names resolve and missing ones are created'''
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        found = resolve_names(
+            Ingredient, self.user, ['salt', 'Pepper', 'pepper ']
+        )
+
+        pepper = Ingredient.objects.get(name='Pepper')
+        self.assertEqual(found, {'salt': salt.pk, 'pepper': pepper.pk})
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertEqual(RecipeStats.objects.get().ingredient_count, 2)
+
+    def test_taken_names_not_reported(self):
+        '''Test that names created meanwhile aren't counted as created'''
+        insert_new = names._insert_new
+
+        def racing_insert(model, objs, batch_size):
+            # a concurrent request creates Salt after the lookup
+            Ingredient.objects.create(user=self.user, name='SALT')
+            return insert_new(model, objs, batch_size)
+
+        with patch('core.names._insert_new', racing_insert):
+            found = resolve_names(Ingredient, self.user, ['salt', 'Pepper'])
+
+        self.assertEqual(
+            found,
+            dict(Ingredient.objects.values_list('normalized_name', 'pk'))
+        )
+        self.assertEqual(RecipeStats.objects.get().ingredient_count, 2)
+
+    def test_merge_duplicates(self):
+        '''Test that links move to the oldest object of a name'''
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        copy = self.duplicate(Ingredient, 'Salt', 'salt ')
+        soup = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        stew = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=5, price=1
+        )
+        soup.ingredients.add(salt, copy)
+        stew.ingredients.add(copy)
+
+        found = find_duplicates(Ingredient)
+        self.assertEqual(found, {self.user.pk: {copy.pk: salt.pk}})
+        recipe_ids = merge_duplicates(Ingredient, found[self.user.pk])
+
+        self.assertEqual(recipe_ids, {soup.pk, stew.pk})
+        self.assertEqual(list(Ingredient.objects.all()), [salt])
+        self.assertEqual(list(soup.ingredients.all()), [salt])
+        self.assertEqual(list(stew.ingredients.all()), [salt])
+
+    def test_merge_duplicates_recounts(self):
+        '''Test that merging recounts the kept object and bumps versions'''
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        copy = self.duplicate(Ingredient, 'Salt', 'salt ')
+        soup = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1
+        )
+        soup.ingredients.add(copy)
+        version = CollectionVersion.objects.current(
+            self.user.pk, CollectionVersion.INGREDIENTS
+        )[0]
+
+        merge_duplicates(Ingredient, {copy.pk: salt.pk})
+
+        salt.refresh_from_db()
+        self.assertEqual(salt.recipe_count, 1)
+        self.assertGreater(CollectionVersion.objects.current(
+            self.user.pk, CollectionVersion.INGREDIENTS
+        )[0], version)
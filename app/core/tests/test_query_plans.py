@@ -0,0 +1,148 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Ingredient, Recipe, Tag
+from core.search import search_recipes
+from recipe import views
+from recipe.pagination import KeysetPagination
+
+
+def list_queryset(viewset_class, user):
+    '''Return the queryset a viewset runs for the list action'''
+    request = Request(APIRequestFactory().get('/'))
+    request.user = user
+    view = viewset_class(request=request, action='list', kwargs={})
+    return view.get_queryset()
+
+
+@skipUnless(connection.vendor in ('postgresql', 'sqlite'),
+            'query plans are only checked on PostgreSQL and SQLite')
+class ListQueryPlanTests(TestCase):
+    '''Test that per-user list queries scan an index without sorting'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        for i in range(20):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+
+    def explain(self, queryset):
+        '''Return the query plan of the queryset'''
+        if connection.vendor == 'postgresql':
+            # tiny test tables would otherwise always be scanned sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertIndexOrdered(self, queryset, index_name):
+        '''Assert the plan uses the index and has no sort step'''
+        plan = self.explain(queryset)
+
+        self.assertIn(index_name, plan)
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Sort', plan)
+        else:
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def seek(self, queryset, ordering):
+        '''Return the queryset filtered past its first row'''
+        paginator = KeysetPagination()
+        position = paginator._get_position_from_instance(
+            queryset.first(), ordering
+        )
+        return queryset.filter(paginator._seek_filter(ordering, position))
+
+    def test_tag_list_plan(self):
+        '''Test the tag list query plan'''
+        queryset = list_queryset(views.TagViewSet, self.user)
+
+        self.assertIndexOrdered(queryset, 'core_tag_user_name_idx')
+        self.assertIndexOrdered(
+            self.seek(queryset, views.TagViewSet.ordering),
+            'core_tag_user_name_idx'
+        )
+
+    def test_ingredient_list_plan(self):
+        '''Test the ingredient list query plan'''
+        queryset = list_queryset(views.IngredientViewSet, self.user)
+
+        self.assertIndexOrdered(queryset, 'core_ingr_user_name_idx')
+        self.assertIndexOrdered(
+            self.seek(queryset, views.IngredientViewSet.ordering),
+            'core_ingr_user_name_idx'
+        )
+
+    def test_recipe_list_plan(self):
+        '''Test the recipe list query plan'''
+        queryset = list_queryset(views.RecipeViewSet, self.user)
+
+        self.assertIndexOrdered(queryset, 'core_recipe_user_title_idx')
+        self.assertIndexOrdered(
+            self.seek(queryset, views.RecipeViewSet.ordering),
+            'core_recipe_user_title_idx'
+        )
+
+    def test_recipe_search_plan(self):
+        '''Test that searches go through the full text index'''
+        queryset = search_recipes(
+            Recipe.objects.filter(user=self.user), 'recipe'
+        )
+
+        plan = self.explain(queryset)
+
+        if connection.vendor == 'postgresql':
+            self.assertIn('core_recipe_search_idx', plan)
+        else:
+            self.assertIn('VIRTUAL TABLE INDEX', plan)
+
+    def test_tag_filter_plan(self):
+        '''Test that filtering by tag uses the covering link index'''
+        tag = Tag.objects.filter(user=self.user).first()
+        queryset = Recipe.objects.filter(
+            pk__in=Recipe.tags.through.objects.filter(tag=tag)
+            .values('recipe_id')
+        )
+
+        plan = self.explain(queryset)
+
+        self.assertIn('core_recipe_tags_tag_recipe_idx', plan)
+
+
+class LinkIndexTests(TestCase):
+    '''Test the indexes of the recipe link tables'''
+
+    def test_no_single_column_target_indexes(self):
+        '''Test that the covering indexes replace the target indexes'''
+        for through, column, covering in (
+            (Recipe.tags.through, 'tag_id',
+             'core_recipe_tags_tag_recipe_idx'),
+            (Recipe.ingredients.through, 'ingredient_id',
+             'core_recipe_ingr_ingr_recipe_idx'),
+        ):
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(
+                    cursor, through._meta.db_table
+                )
+            with self.subTest(table=through._meta.db_table):
+                self.assertEqual(
+                    constraints[covering]['columns'], [column, 'recipe_id']
+                )
+                self.assertNotIn([column], [
+                    constraint['columns']
+                    for constraint in constraints.values()
+                    if constraint['index']
+                ])
@@ -0,0 +1,82 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_matches_json_renderer(self):
+        '''Test that the output decodes to the same data as DRF's'''
+        data = {
+            'id': 1,
+            'title': 'Crème brûlée',
+            'price': '5.00',
+            'tags': [{'id': 1, 'name': 'Dessert'}],
+            'link': None,
+        }
+
+        content = ORJSONRenderer().render(data)
+
+        self.assertIsInstance(content, bytes)
+        self.assertEqual(
+            json.loads(content),
+            json.loads(JSONRenderer().render(data))
+        )
+
+    def test_decimal_rendered_as_number(self):
+        '''Test that uncoerced decimals are rendered as JSON numbers'''
+        content = ORJSONRenderer().render({'price': Decimal('5.25')})
+
+        self.assertEqual(content, b'{"price":5.25}')
+
+    def test_django_types(self):
+        '''Test that lazy strings, datetimes and sets are rendered'''
+        content = ORJSONRenderer().render({
+            'detail': gettext_lazy('Not found.'),
+            'at': datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc),
+            'ids': {1},
+        })
+
+        self.assertEqual(json.loads(content), {
+            'detail': 'Not found.',
+            'at': '2021-01-01T00:00:00Z',
+            'ids': [1],
+        })
+
+    def test_indent_requested(self):
+        '''Test that an indent in the accepted media type is honoured'''
+        content = ORJSONRenderer().render(
+            {'id': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(content, b'{\n  "id": 1\n}')
+
+    def test_none_renders_empty(self):
+        '''Test that no data renders an empty body'''
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def test_parse(self):
+        '''Test that a JSON body is parsed'''
+        stream = io.BytesIO(b'{"title": "Soup", "tags": [1, 2]}')
+
+        self.assertEqual(
+            ORJSONParser().parse(stream),
+            {'title': 'Soup', 'tags': [1, 2]}
+        )
+
+    def test_malformed_body(self):
+        '''Test that a malformed body raises a parse error'''
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"title": '))
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import reset_named_cache
+from core.db.routers import (
+    ReplicaRouter, is_pinned, pins_shared, replica_reads
+)
+from core.models import Recipe
+
+
+REPLICA = 'replica'
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def test_reads_routed_inside_block(self):
+        '''Test that only reads inside replica_reads go to a replica'''
+        router = ReplicaRouter()
+
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Recipe), REPLICA)
+            self.assertIsNone(router.db_for_write(Recipe))
+        self.assertIsNone(router.db_for_read(Recipe))
+
+    def test_cache_entries_read_from_primary(self):
+        '''Test that database cache reads never see a lagging replica'''
+        entry = caches['default'].cache_model_class
+
+        with replica_reads():
+            self.assertIsNone(ReplicaRouter().db_for_read(entry))
+
+    def test_replica_rows_written_to_primary(self):
+        '''Test that rows read from a replica are saved on the primary'''
+        recipe = Recipe()
+        recipe._state.db = REPLICA
+
+        self.assertEqual(
+            ReplicaRouter().db_for_write(Recipe, instance=recipe), 'default'
+        )
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        '''Test that reads stay on the primary without replicas'''
+        with replica_reads():
+            self.assertIsNone(ReplicaRouter().db_for_read(Recipe))
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class LaggingReplicaTests(TestCase):
+    '''Test read routing against a replica that never catches up
+
+    An empty in-memory SQLite database stands in for the replica, so
+    reads served by it miss every row written to the primary.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        # added here, the test runner never sets up or checks the alias
+        connections.settings[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+        call_command('migrate', database=REPLICA, verbosity=0)
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA]._close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        reset_named_cache('REPLICA_PIN')
+        reset_named_cache('RESPONSE_CACHE')
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self):
+        '''Create a recipe through the API'''
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Soup',
+            'time_minutes': 10,
+            'price': '5.00',
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_reads_served_by_replica(self):
+        '''Test that list requests read from the replica'''
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_read_your_writes(self):
+        '''Test that a user's reads after a write go to the primary'''
+        self.create_recipe()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(REPLICA_PIN={'TIMEOUT': 0})
+    def test_pin_expires(self):
+        '''Test that reads return to the replica after the pin window'''
+        self.create_recipe()
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_pin_per_user(self):
+        '''Test that one user's write doesn't pin anyone else'''
+        self.create_recipe()
+        other_user = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpassword2'
+        )
+
+        self.assertTrue(is_pinned(self.user.pk))
+        self.assertFalse(is_pinned(other_user.pk))
+
+    def test_failed_write_not_pinned(self):
+        '''Test that rejected writes don't pin the user'''
+        res = self.client.post(RECIPES_URL, {'title': 'Soup'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(is_pinned(self.user.pk))
+
+    def test_profile_update_pins_user(self):
+        '''Test that updating the profile pins the user to the primary'''
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_pinned(self.user.pk))
+
+    @override_settings(WORKER_PROCESSES=4)
+    def test_local_pins_several_workers(self):
+        '''Test that reads stay on the primary when pins aren't shared'''
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    @override_settings(
+        WORKER_PROCESSES=4, REPLICA_PIN={'BACKEND': 'shared'},
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }}
+    )
+    def test_process_local_shared_pins_refused(self):
+        '''Test that pins in a cache of one process aren't taken as shared'''
+        with self.assertRaises(ImproperlyConfigured):
+            pins_shared()
+
+    @override_settings(
+        WORKER_PROCESSES=4, REPLICA_PIN={'BACKEND': 'shared'}
+    )
+    def test_shared_pins_several_workers(self):
+        '''Test that shared pins let several workers read from replicas'''
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=5
+        )
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core import search
+from core.models import Ingredient, Recipe, Tag
+
+
+class SearchDocumentTests(TestCase):
+    '''Test that recipe search documents are kept current'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Stew',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def document(self):
+        '''Return the stored search document of the recipe'''
+        self.recipe.refresh_from_db()
+        return self.recipe.search_document
+
+    def fts_rows(self):
+        '''Return the full text rows of the recipe'''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT search_document FROM {search.FTS_TABLE} '
+                f'WHERE rowid = %s',
+                [self.recipe.pk]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_document_contains_names(self):
+        '''Test that the document holds the title, ingredients and tags'''
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Beef')
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+
+        self.assertEqual(self.document(), 'Stew Beef Hot')
+
+    def test_reverse_link_changes(self):
+        '''Test that links changed from the tag side are reflected'''
+        tag = Tag.objects.create(user=self.user, name='Hot')
+        tag.recipe_set.add(self.recipe)
+        self.assertEqual(self.document(), 'Stew Hot')
+
+        tag.recipe_set.clear()
+        self.assertEqual(self.document(), 'Stew')
+
+    def test_deleted_tag_removed(self):
+        '''Test that deleting a tag removes it from its recipes'''
+        tag = Tag.objects.create(user=self.user, name='Hot')
+        self.recipe.tags.add(tag)
+
+        tag.delete()
+
+        self.assertEqual(self.document(), 'Stew')
+
+    def test_unchanged_document_not_written(self):
+        '''Test that saves leaving the document alone skip the update'''
+        # the title, ingredient links, tag links and current documents
+        with self.assertNumQueries(4):
+            search.refresh_search_documents([self.recipe.pk])
+
+    def test_fts_table_follows_recipes(self):
+        '''Test that the SQLite full text table tracks the documents'''
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.recipe.title = 'Goulash'
+        self.recipe.save()
+        self.assertEqual(self.fts_rows(), ['Goulash'])
+
+        self.recipe.delete()
+        self.recipe.pk = self.recipe.id
+        self.assertEqual(self.fts_rows(), [])
+
+    def test_user_delete(self):
+        '''Test that cascaded deletes don't rebuild documents'''
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,239 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import stats
+from core.benchmark import seed_dataset
+from core.models import (
+    CollectionVersion, Ingredient, Recipe, RecipeStats, Tag
+)
+from recipe.imports import RecipeImporter
+
+
+def stored_stats(user):
+    '''Return the stored stats of a user as a dict'''
+    row = RecipeStats.objects.get(user=user)
+    return {name: getattr(row, name) for name in stats.compute_stats(
+        Recipe, Tag, Ingredient, user.pk
+    )}
+
+
+class RecipeStatsTests(TestCase):
+    '''Test that the stored stats stay equal to recomputed ones'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertStatsCurrent(self, user=None):
+        user = user or self.user
+        self.assertEqual(
+            stored_stats(user),
+            stats.compute_stats(Recipe, Tag, Ingredient, user.pk)
+        )
+
+    def test_model_changes(self):
+        '''Test saves, deletes and link changes from either side'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5.5
+        )
+        other = Recipe.objects.create(
+            user=self.user, title='Cake', time_minutes=150, price=Decimal(40)
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        ingredient.recipe_set.add(other)
+        self.assertStatsCurrent()
+        self.assertEqual(stored_stats(self.user)['ingredient_link_count'], 2)
+
+        recipe.time_minutes = 95
+        recipe.save()
+        recipe.tags.remove(tag, Tag.objects.create(user=self.user, name='X'))
+        other.ingredients.clear()
+        self.assertStatsCurrent()
+
+        recipe.tags.add(tag)
+        tag.delete()
+        recipe.delete()
+        self.assertStatsCurrent()
+        self.assertEqual(stored_stats(self.user)['recipe_count'], 1)
+
+    def test_histograms(self):
+        '''Test that recipes count in the bucket of their values'''
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=10, price=5
+        )
+        Recipe.objects.create(
+            user=self.user, title='Roast', time_minutes=121, price=100.01
+        )
+
+        row = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(row.time_minutes_histogram, [1, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(row.price_histogram, [1, 0, 0, 0, 0, 1])
+
+    def test_bulk_changes(self):
+        '''Test imports, bulk updates and bulk link replacement'''
+        RecipeImporter(self.user, batch_size=2).run([
+            {'title': f'Recipe {i}', 'time_minutes': 10 * i, 'price': i,
+             'tags': ['Quick'], 'ingredients': ['Egg', f'Spice {i}']}
+            for i in range(1, 6)
+        ])
+        self.assertStatsCurrent()
+
+        recipes = list(Recipe.objects.filter(user=self.user)[:2])
+        tag = Tag.objects.create(user=self.user, name='Slow')
+        res = self.client.patch(reverse('recipe:recipe-bulk'), [
+            {'id': recipes[0].id, 'time_minutes': 200, 'tags': [tag.id]},
+            {'id': recipes[1].id, 'tags': []},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertStatsCurrent()
+
+    def test_seeded_users(self):
+        '''Test stats of a seeded dataset and of its replacement'''
+        users = seed_dataset(users=2, recipes=5, tags=3, ingredients=4)
+        users = seed_dataset(users=2, recipes=5, tags=3, ingredients=4)
+
+        for user in users:
+            self.assertStatsCurrent(user)
+        self.assertEqual(stored_stats(users[0])['recipe_count'], 5)
+
+    def test_user_delete(self):
+        '''Test that deleting a user deletes their stats'''
+        Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+
+        self.user.delete()
+
+        self.assertFalse(RecipeStats.objects.exists())
+
+    def test_missing_row_recomputed(self):
+        '''Test that a change of a user without stats computes them'''
+        Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        RecipeStats.objects.all().delete()
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertStatsCurrent()
+
+    def test_reconcile_stats(self):
+        '''Test that drifted stats are recomputed'''
+        Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        RecipeStats.objects.update(recipe_count=7, price_sum=0)
+
+        stats.reconcile_stats([self.user.pk])
+
+        self.assertStatsCurrent()
+
+    def test_reconcile_stats_bumps_versions(self):
+        '''Test that recounting bumps the collections showing the counts'''
+        Tag.objects.create(user=self.user, name='Vegan')
+        before = {
+            name: CollectionVersion.objects.current(self.user.pk, name)[0]
+            for name in CollectionVersion.RECIPES_AND_ATTRS
+        }
+
+        stats.reconcile_stats([self.user.pk])
+
+        for name, version in before.items():
+            with self.subTest(collection=name):
+                after = CollectionVersion.objects.current(self.user.pk, name)
+                # the user has no ingredients to recount
+                if name == CollectionVersion.INGREDIENTS:
+                    self.assertEqual(after[0], version)
+                else:
+                    self.assertGreater(after[0], version)
+
+
+class RecipeCountTests(TestCase):
+    '''Test that stored recipe counts of tags and ingredients stay current'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self, model):
+        '''Return the stored recipe count of every object by name'''
+        return dict(model.objects.values_list('name', 'recipe_count'))
+
+    def assertCountsCurrent(self):
+        for model in (Tag, Ingredient):
+            stored = self.counts(model)
+            stats.count_recipes(model, {})
+            self.assertEqual(stored, self.counts(model))
+
+    def test_link_changes(self):
+        '''Test links changed from either side, and deletes'''
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        curry = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        cake = Recipe.objects.create(
+            user=self.user, title='Cake', time_minutes=50, price=8
+        )
+        curry.tags.add(vegan, quick)
+        vegan.recipe_set.add(cake)
+        self.assertEqual(self.counts(Tag), {'Vegan': 2, 'Quick': 1})
+
+        curry.tags.remove(quick, quick)
+        vegan.recipe_set.remove(curry)
+        self.assertEqual(self.counts(Tag), {'Vegan': 1, 'Quick': 0})
+
+        curry.tags.add(quick, vegan)
+        vegan.recipe_set.clear()
+        curry.delete()
+        self.assertEqual(self.counts(Tag), {'Vegan': 0, 'Quick': 0})
+        self.assertCountsCurrent()
+
+    def test_save_keeps_count(self):
+        '''Test that saving an earlier loaded object keeps the count'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        recipe.tags.add(tag)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        self.assertEqual(self.counts(Tag), {'Vegetarian': 1})
+
+    def test_bulk_changes(self):
+        '''Test imports and bulk link replacement'''
+        RecipeImporter(self.user, batch_size=2).run([
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': 1,
+             'tags': ['Quick'], 'ingredients': ['Egg', f'Spice {i}']}
+            for i in range(3)
+        ])
+        self.assertEqual(self.counts(Tag), {'Quick': 3})
+
+        recipe = Recipe.objects.first()
+        tag = Tag.objects.create(user=self.user, name='Slow')
+        res = self.client.patch(reverse('recipe:recipe-bulk'), [
+            {'id': recipe.id, 'tags': [tag.id]},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(Tag), {'Quick': 2, 'Slow': 1})
+        self.assertCountsCurrent()
@@ -0,0 +1,65 @@
+import os
+import time
+from unittest import skipUnless
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from core.throttling import (
+    LocalTokenBuckets, RecipeReadThrottle, reset_buckets
+)
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+class ThrottleBenchmark(SimpleTestCase):
+    '''Measure the time a throttle check adds to a request
+
+    Times ``RecipeReadThrottle.allow_request`` with the in-process buckets
+    over many users, and the bare bucket update. Run with
+    ``RUN_BENCHMARKS=1 python manage.py test core``.
+    '''
+
+    CHECKS = 200000
+    USERS = 1000
+
+    def setUp(self):
+        reset_buckets()
+        self.addCleanup(reset_buckets)
+
+    def test_throttle_overhead(self):
+        '''Report microseconds per throttle check'''
+        class User(AnonymousUser):
+            is_authenticated = True
+
+        requests = []
+        for pk in range(self.USERS):
+            user = User()
+            user.pk = pk
+            request = APIView().initialize_request(
+                APIRequestFactory().get('/api/recipe/recipes/')
+            )
+            force_authenticate(request, user)
+            request.user = user
+            requests.append(request)
+        throttle = RecipeReadThrottle()
+        view = APIView()
+
+        start = time.perf_counter()
+        for i in range(self.CHECKS):
+            throttle.allow_request(requests[i % self.USERS], view)
+        per_check = (time.perf_counter() - start) / self.CHECKS * 1e6
+
+        buckets = LocalTokenBuckets()
+        start = time.perf_counter()
+        for i in range(self.CHECKS):
+            buckets.consume(i % self.USERS, 1200, 20)
+        per_bucket = (time.perf_counter() - start) / self.CHECKS * 1e6
+
+        print(
+            f'\nthrottle check: {per_check:.2f} us, '
+            f'bucket update: {per_bucket:.2f} us'
+        )
+        self.assertLess(per_check, 10)
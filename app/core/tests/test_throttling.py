@@ -0,0 +1,183 @@
+import sys
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import (
+    LocalTokenBuckets, SharedTokenBuckets, parse_rate
+)
+
+
+TOKEN_URL = reverse('user:token')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def throttle_rates(**rates):
+    '''Return REST_FRAMEWORK settings with the given throttle rates'''
+    defaults = dict.fromkeys(
+        ('token', 'user_create', 'recipe_read', 'recipe_write')
+    )
+    defaults.update(rates)
+    return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': defaults}
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_parse_rate(self):
+        '''Test that rates give the bucket capacity and refill speed'''
+        self.assertEqual(parse_rate('10/s'), (10, 10))
+        self.assertEqual(parse_rate('120/min'), (120, 2))
+        self.assertEqual(parse_rate('36/hour'), (36, 0.01))
+
+    @patch('core.throttling.time.monotonic')
+    def test_local_bucket_refills(self, monotonic):
+        '''Test that a drained bucket refills at its rate'''
+        monotonic.return_value = 100
+        buckets = LocalTokenBuckets()
+
+        waits = [buckets.consume('key', 2, 0.5) for _ in range(3)]
+        self.assertEqual(waits, [0, 0, 2])
+
+        monotonic.return_value = 102
+        self.assertEqual(buckets.consume('key', 2, 0.5), 0)
+        self.assertGreater(buckets.consume('key', 2, 0.5), 0)
+        self.assertEqual(buckets.consume('other', 2, 0.5), 0)
+
+    def test_local_buckets_pruned(self):
+        '''Test that the least recently used buckets are dropped'''
+        buckets = LocalTokenBuckets(max_keys=2)
+        buckets.consume('a', 1, 0.001)
+        buckets.consume('b', 1, 0.001)
+        buckets.consume('a', 1, 0.001)
+        buckets.consume('c', 1, 0.001)
+
+        # 'a' is still drained, 'b' was forgotten and starts full again
+        self.assertGreater(buckets.consume('a', 1, 0.001), 0)
+        self.assertEqual(buckets.consume('b', 1, 0.001), 0)
+
+    def test_local_bucket_concurrent(self):
+        '''Test that concurrent requests can't overdraw a bucket'''
+        buckets = LocalTokenBuckets()
+        capacity = 10
+        thread_count = 8
+        start = threading.Barrier(thread_count)
+        allowed = []
+
+        def consume():
+            start.wait()
+            allowed.append(sum(
+                buckets.consume('key', capacity, 0.001) == 0
+                for _ in range(2000)
+            ))
+
+        threads = [
+            threading.Thread(target=consume) for _ in range(thread_count)
+        ]
+        # switch threads as often as possible to provoke races
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+
+        self.assertLessEqual(sum(allowed), capacity + thread_count)
+
+
+class SharedTokenBucketTests(TestCase):
+
+    def test_shared_buckets(self):
+        '''Test that shared buckets live in the Django cache'''
+        caches['default'].clear()
+        buckets = SharedTokenBuckets()
+
+        self.assertEqual(buckets.consume('key', 1, 0.001), 0)
+        self.assertGreater(
+            SharedTokenBuckets().consume('key', 1, 0.001), 0
+        )
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    })
+    def test_process_local_cache_refused(self):
+        '''Test that buckets per process can't pass for shared ones'''
+        with self.assertRaises(ImproperlyConfigured):
+            SharedTokenBuckets()
+
+
+class ThrottleApiTests(TestCase):
+    '''Test the throttles of the API endpoints'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+
+    @override_settings(REST_FRAMEWORK=throttle_rates(token='2/min'))
+    def test_token_creation_throttled(self):
+        '''Test that token requests are limited per client address'''
+        payload = {'email': 'test@gmail.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    @override_settings(REST_FRAMEWORK=throttle_rates(recipe_read='2/min'))
+    def test_recipe_reads_throttled_per_user(self):
+        '''Test that each user has a read budget of their own'''
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK=throttle_rates(
+        recipe_read='1/min', recipe_write='5/min'
+    ))
+    def test_recipe_writes_use_their_own_scope(self):
+        '''Test that writes don't draw from the read budget'''
+        self.client.force_authenticate(self.user)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Soup', 'time_minutes': 5, 'price': '1.00',
+            'tags': [], 'ingredients': [],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(REST_FRAMEWORK=throttle_rates())
+    def test_rate_none_disables_throttle(self):
+        '''Test that scopes without a rate are not throttled'''
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.middleware import RequestTimingMiddleware
+from core.models import Recipe
+from core.timing import Histogram, RequestTimer, reset_timing_stats
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TIMINGS_URL = reverse('core:timings')
+RECIPES_VIEW = 'recipe.views.RecipeViewSet.list'
+
+
+class RequestTimerTests(SimpleTestCase):
+
+    @patch('core.timing.time.perf_counter')
+    def test_nested_phases_count_once(self, perf_counter):
+        '''Test that a phase timed inside itself is not counted twice'''
+        timer = RequestTimer()
+        perf_counter.side_effect = [1.0, 3.0]
+        timer.start('serialize')
+        timer.start('serialize')
+        timer.stop('serialize')
+        timer.stop('serialize')
+
+        self.assertEqual(timer.times['serialize'], 2.0)
+
+    def test_histogram_percentiles(self):
+        '''Test that percentiles give the bounds of their buckets'''
+        histogram = Histogram()
+        for value in [0.5] * 90 + [30] * 9 + [9000]:
+            histogram.add(value)
+
+        self.assertEqual(histogram.percentile(0.5), 1)
+        self.assertEqual(histogram.percentile(0.95), 50)
+        self.assertIsNone(histogram.percentile(1))
+        self.assertEqual(histogram.stats(100)['buckets']['inf'], 1)
+
+    def test_disabled_middleware_not_used(self):
+        '''Test that the middleware drops out of the stack when disabled'''
+        with override_settings(REQUEST_TIMING={'ENABLED': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestTimingMiddleware(lambda request: None)
+
+
+@override_settings(REQUEST_TIMING={
+    'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True
+})
+class RequestTimingApiTests(TestCase):
+    '''Test the timings of sampled API requests'''
+
+    def setUp(self):
+        reset_timing_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_superuser(
+            'admin@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1.00
+        )
+
+    def test_server_timing_header(self):
+        '''Test that sampled responses report their phase timings'''
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+
+        phases = [
+            part.split(';')[0] for part in res['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(phases, ['db', 'serialize', 'render', 'total'])
+        self.assertIn('desc="4 queries"', res['Server-Timing'])
+
+    # every request renders, none is served from the response cache
+    @override_settings(RESPONSE_CACHE={'MAX_SIZE': 0})
+    def test_timings_aggregated_per_view(self):
+        '''Test that the metrics endpoint lists histograms per action'''
+        for _ in range(3):
+            self.client.get(RECIPES_URL)
+
+        res = self.client.get(TIMINGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = res.data[RECIPES_VIEW]
+        self.assertEqual(timings['samples'], 3)
+        self.assertEqual(timings['mean_queries'], 4)
+        self.assertEqual(sum(timings['total']['buckets'].values()), 3)
+        self.assertGreater(timings['serialize']['mean_ms'], 0)
+        self.assertGreater(timings['render']['mean_ms'], 0)
+
+    @override_settings(REQUEST_TIMING={'ENABLED': True, 'SAMPLE_RATE': 0})
+    def test_unsampled_requests_not_timed(self):
+        '''Test that requests outside the sample are left alone'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertNotIn(RECIPES_VIEW, client.get(TIMINGS_URL).data)
+
+    def test_staff_required(self):
+        '''Test that regular users can't read the timings'''
+        user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(TIMINGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,240 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.cache import check_shared_alias
+
+
+class LocalTokenBuckets:
+    '''Token buckets of every throttled client, held in this process
+
+    A bucket is a (tokens, timestamp) tuple, read and replaced under one
+    lock, so concurrent requests of a client never take the same token.
+    The critical section is a few dict operations. Buckets are kept in
+    least recently used order and the oldest are dropped beyond
+    ``max_keys``.
+    '''
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        '''Take a token, return 0 or the seconds until one is available
+
+        ``key`` is any hashable identifying the bucket, here a
+        (scope, client) tuple.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._prune()
+        return wait
+
+    def _prune(self):
+        # the oldest buckets have refilled the longest, dropping them
+        # only forgets clients that went quiet
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def clear(self):
+        '''Refill every bucket'''
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedTokenBuckets:
+    '''Token buckets in a Django cache alias shared by every worker
+
+    Like DRF's own throttles it reads and writes the bucket without a
+    lock, so concurrent requests of one client may overshoot slightly.
+    Aliases local to a process are refused, see ``check_shared_alias``.
+    '''
+
+    def __init__(self, alias='default'):
+        check_shared_alias(alias)
+        self.alias = alias
+
+    def consume(self, key, capacity, rate):
+        '''Take a token, return 0 or the seconds until one is available'''
+        cache = caches[self.alias]
+        key = 'throttle:' + ':'.join(map(str, key))
+        now = time.time()
+        tokens, stamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(now - stamp, 0) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        # a bucket left alone that long is full again, let it expire
+        cache.set(key, (tokens, now), int(capacity / rate) + 1)
+        return wait
+
+    def clear(self):
+        '''Not supported, entries expire once their bucket refilled'''
+
+
+def build_buckets(config):
+    '''Return token buckets configured by a settings dict
+
+    ``BACKEND`` is ``local`` (the default) for ``LocalTokenBuckets``
+    holding at most ``MAX_KEYS`` clients, or ``shared`` for
+    ``SharedTokenBuckets`` on the Django cache ``ALIAS``.
+    '''
+    backend = config.get('BACKEND', 'local')
+    if backend == 'local':
+        return LocalTokenBuckets(max_keys=config.get('MAX_KEYS', 100000))
+    if backend == 'shared':
+        return SharedTokenBuckets(alias=config.get('ALIAS', 'default'))
+    raise ImproperlyConfigured(f'Unknown throttle backend {backend!r}')
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+    '''Return the process wide token buckets, see THROTTLE_BUCKETS'''
+    global _buckets
+    buckets = _buckets
+    if buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = build_buckets(
+                    getattr(settings, 'THROTTLE_BUCKETS', {})
+                )
+            buckets = _buckets
+    return buckets
+
+
+def reset_buckets():
+    '''Drop the token buckets so they are rebuilt from the settings'''
+    global _buckets
+    with _buckets_lock:
+        _buckets = None
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    '''Return the (capacity, tokens per second) of a DRF style rate
+
+    ``'100/min'`` allows bursts of 100 requests, refilled at 100 a minute.
+    '''
+    num, period = rate.split('/')
+    seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), int(num) / seconds
+
+
+class TokenBucketThrottle(BaseThrottle):
+    '''Throttle clients with a token bucket per scope and client
+
+    The rate of ``scope`` comes from ``DEFAULT_THROTTLE_RATES``, looked up
+    on each request so overridden settings apply; a rate of None turns
+    the throttle off. Only requests with a method in ``methods`` count.
+    '''
+
+    scope = None
+    methods = None
+    _wait = 0.0
+
+    def get_cache_key(self, request, view):
+        '''Return the key of the client's bucket, None to skip it'''
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'No default throttle rate set for {self.scope!r} scope'
+            )
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        capacity, per_second = parse_rate(rate)
+        self._wait = get_buckets().consume(
+            (self.scope, key), capacity, per_second
+        )
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    '''Token bucket per client IP address'''
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    '''Token bucket per user, or per IP address for anonymous requests'''
+
+    def get_cache_key(self, request, view):
+        user = request.user
+        if user.is_authenticated:
+            # an integer, it can't clash with an address
+            return user.pk
+        return self.get_ident(request)
+
+
+class TokenCreateThrottle(AnonTokenBucketThrottle):
+    '''Throttle obtaining auth tokens, which checks passwords'''
+
+    scope = 'token'
+
+
+class UserCreateThrottle(AnonTokenBucketThrottle):
+    '''Throttle signing up'''
+
+    scope = 'user_create'
+
+
+class RecipeReadThrottle(UserTokenBucketThrottle):
+    '''Throttle reads of the recipe API'''
+
+    scope = 'recipe_read'
+    methods = frozenset(SAFE_METHODS)
+
+
+class RecipeWriteThrottle(UserTokenBucketThrottle):
+    '''Throttle writes to the recipe API'''
+
+    scope = 'recipe_write'
+    methods = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+@receiver(setting_changed)
+def reset_changed_buckets(setting, **kwargs):
+    '''Rebuild the token buckets when their settings are overridden'''
+    if setting in ('THROTTLE_BUCKETS', 'REST_FRAMEWORK'):
+        reset_buckets()
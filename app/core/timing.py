@@ -0,0 +1,203 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+
+# Timer of the sampled request being handled in this context, if any
+_current_timer = ContextVar('request_timer', default=None)
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKET_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+PHASES = ('db', 'serialize', 'render', 'total')
+
+
+class RequestTimer:
+    '''Time spent in each phase of one request, in seconds
+
+    ``db`` is the time in database queries, ``serialize`` the time in
+    serializer ``data`` and ``render`` the time rendering the response.
+    Nested timings of a phase only count once.
+    '''
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self._depth = dict.fromkeys(PHASES, 0)
+        self._started = {}
+
+    def start(self, phase):
+        '''Start timing a phase, unless it is already being timed'''
+        self._depth[phase] += 1
+        if self._depth[phase] == 1:
+            self._started[phase] = time.perf_counter()
+
+    def stop(self, phase):
+        '''Stop timing a phase started with ``start``'''
+        self._depth[phase] -= 1
+        if self._depth[phase] == 0:
+            self.times[phase] += \
+                time.perf_counter() - self._started.pop(phase)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        '''Time a database query, see ``connection.execute_wrapper``'''
+        self.queries += 1
+        self.start('db')
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stop('db')
+
+    def server_timing(self):
+        '''Return the timings as a ``Server-Timing`` header value'''
+        return ', '.join(
+            f'{phase};dur={seconds * 1000:.2f}'
+            + (f';desc="{self.queries} queries"' if phase == 'db' else '')
+            for phase, seconds in self.times.items()
+        )
+
+
+def time_query(execute, sql, params, many, context):
+    '''Time a query for the current timer, if any
+
+    A ``connection.execute_wrapper`` installed by ``install_query_timer``.
+    '''
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    '''Time the queries of sampled requests on a connection
+
+    The wrapper stays installed and looks the timer up on every query, so
+    queries are timed in whichever thread runs the view: ``sync_to_async``
+    copies the request's context into its threads. Connections belong to
+    a thread, so this also receives ``connection_created``.
+    '''
+    if time_query not in connection.execute_wrappers:
+        # outermost, the execute_wrapper() blocks of others pop the last
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def current_timer():
+    '''Return the timer of the sampled request being handled, if any'''
+    return _current_timer.get()
+
+
+def activate_timer(timer):
+    '''Make the timer current, return a token for ``deactivate_timer``'''
+    return _current_timer.set(timer)
+
+
+def deactivate_timer(token):
+    '''Restore the timer that was current before ``activate_timer``'''
+    _current_timer.reset(token)
+
+
+class TimedSerializerMixin:
+    '''Count the time spent building serializer ``data`` as serialization
+
+    Costs one context variable lookup when the request isn't sampled.
+    '''
+
+    @property
+    def data(self):
+        timer = _current_timer.get()
+        if timer is None:
+            return super().data
+        timer.start('serialize')
+        try:
+            return super().data
+        finally:
+            timer.stop('serialize')
+
+
+class Histogram:
+    '''Counts of values in the ``BUCKET_BOUNDS`` buckets, with their sum'''
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.total += value
+
+    def percentile(self, fraction):
+        '''Return the upper bound of the bucket holding the percentile'''
+        rank = fraction * sum(self.counts)
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS + (None,), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def stats(self, samples):
+        return {
+            'mean_ms': round(self.total / samples, 3) if samples else 0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': {
+                f'le_{bound}' if bound else 'inf': count
+                for bound, count in zip(BUCKET_BOUNDS + (None,), self.counts)
+            },
+        }
+
+
+class ViewTimings:
+    '''Aggregated timings of the sampled requests of one view'''
+
+    def __init__(self):
+        self.samples = 0
+        self.queries = 0
+        self.histograms = {phase: Histogram() for phase in PHASES}
+
+    def add(self, timer):
+        self.samples += 1
+        self.queries += timer.queries
+        for phase, seconds in timer.times.items():
+            self.histograms[phase].add(seconds * 1000)
+
+    def stats(self):
+        return {
+            'samples': self.samples,
+            'mean_queries': round(self.queries / self.samples, 2),
+            **{
+                phase: histogram.stats(self.samples)
+                for phase, histogram in self.histograms.items()
+            },
+        }
+
+
+_view_timings = {}
+_view_timings_lock = threading.Lock()
+
+
+def record_timer(timer):
+    '''Add the timings of a finished request to its view's histograms'''
+    with _view_timings_lock:
+        timings = _view_timings.get(timer.view)
+        if timings is None:
+            timings = _view_timings[timer.view] = ViewTimings()
+        timings.add(timer)
+
+
+def timing_stats():
+    '''Return the aggregated timings of every view sampled so far'''
+    with _view_timings_lock:
+        return {
+            view: timings.stats()
+            for view, timings in sorted(_view_timings.items())
+        }
+
+
+def reset_timing_stats():
+    '''Forget every recorded timing'''
+    with _view_timings_lock:
+        _view_timings.clear()
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from core import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('caches/', views.CacheStatsView.as_view(), name='caches'),
+    path('pools/', views.PoolStatsView.as_view(), name='pools'),
+    path('timings/', views.TimingStatsView.as_view(), name='timings'),
+]
@@ -0,0 +1,38 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.cache import named_cache_stats
+from core.db.pool import pool_stats
+from core.timing import timing_stats
+
+
+class CacheStatsView(APIView):
+    '''Report hit, miss and eviction counters of the in-process caches'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        '''Return the counters of this worker process'''
+        return Response(named_cache_stats())
+
+
+class PoolStatsView(APIView):
+    '''Report checkout, wait and timeout counters of the DB pools'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        '''Return the counters of this worker process'''
+        return Response(pool_stats())
+
+
+class TimingStatsView(APIView):
+    '''Report the request timing histograms of the sampled views'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        '''Return the histograms of this worker process'''
+        return Response(timing_stats())
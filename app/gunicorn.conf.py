@@ -0,0 +1,29 @@
+'''Production server configuration
+
+Serves the ASGI application with uvicorn workers; run ``gunicorn`` from
+this directory. Each worker holds many slow client connections on its
+event loop while recipe API reads run in its thread pool, see
+recipe.async_views.
+'''
+import multiprocessing
+import os
+
+# read by the workers' settings, which load after this file
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
+
+wsgi_app = 'app.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(
+    os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+)
+# settings pick per worker or shared caches from the worker count
+os.environ['WEB_CONCURRENCY'] = str(workers)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+
+# recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
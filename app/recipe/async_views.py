@@ -0,0 +1,77 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from core.timing import current_timer
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Router url names served by async views when ASYNC_READ_VIEWS is set
+ASYNC_READ_ROUTES = (
+    'recipe-list',
+    'recipe-detail',
+    'tag-list',
+    'ingredient-list',
+)
+
+
+def _as_request(view):
+    '''Run a sync view with the connection handling of a request'''
+
+    def run(request, *args, **kwargs):
+        # pool threads never see request_started/request_finished, so
+        # drop broken or expired connections here instead
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            # render here rather than back on the event loop's sync thread
+            if hasattr(response, 'render'):
+                timer = current_timer()
+                if timer is not None:
+                    timer.start('render')
+                try:
+                    response.render()
+                finally:
+                    if timer is not None:
+                        timer.stop('render')
+            return response
+        finally:
+            close_old_connections()
+
+    return run
+
+
+def async_view(view):
+    '''Return an async view running a sync DRF view off the event loop
+
+    Under ASGI, Django runs every sync view on one shared thread, so slow
+    reads queue behind each other. Safe methods of the returned view run
+    in the event loop's thread pool instead, each pool thread holding its
+    own database connection; writes keep the shared thread.
+    '''
+    read = sync_to_async(_as_request(view), thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    async def wrapped(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    # keeps csrf_exempt and the viewset attributes DRF sets on the view
+    return functools.update_wrapper(wrapped, view)
+
+
+def async_read_urls(patterns, names=ASYNC_READ_ROUTES):
+    '''Return patterns with the named routes served by async views'''
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name
+        ) if pattern.name in names else pattern
+        for pattern in patterns
+    ]
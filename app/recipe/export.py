@@ -0,0 +1,97 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Recipe
+
+
+EXPORT_FIELDS = ('id', 'title', 'time_minutes', 'price', 'link')
+
+
+def _linked(field_name, recipe_ids, using):
+    '''Return the tags or ingredients of each recipe as id/name dicts'''
+    field = Recipe._meta.get_field(field_name)
+    target = field.m2m_reverse_name()
+    links = field.remote_field.through.objects.using(using) \
+        .filter(recipe_id__in=recipe_ids) \
+        .order_by(f'{target}__name', target) \
+        .values_list('recipe_id', target, f'{target}__name')
+
+    linked = defaultdict(list)
+    for recipe_id, pk, name in links:
+        linked[recipe_id].append({'id': pk, 'name': name})
+    return linked
+
+
+def iter_recipes(queryset, chunk_size=500):
+    '''Yield recipes as dicts in ID order, with tags and ingredients
+
+    Recipes are read through a server-side cursor where the database has
+    them, and links are fetched once per chunk of ``chunk_size`` recipes,
+    so memory use is bounded by the chunk size, not the recipe count.
+    '''
+    rows = queryset.order_by('id').values(*EXPORT_FIELDS) \
+        .iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row['id'] for row in chunk]
+        ingredients = _linked('ingredients', ids, queryset.db)
+        tags = _linked('tags', ids, queryset.db)
+        for row in chunk:
+            row['ingredients'] = ingredients[row['id']]
+            row['tags'] = tags[row['id']]
+            yield row
+
+
+def ndjson_lines(recipes):
+    '''Yield one JSON document per recipe'''
+    for recipe in recipes:
+        yield json.dumps(recipe, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    '''File-like object returning what is written, for csv.writer'''
+
+    def write(self, value):
+        return value
+
+
+def join_names(names):
+    '''Join names with semicolons, quoting those holding ``;`` or ``"``
+
+    The result is itself a CSV record with a ``;`` delimiter, so
+    ``parse_csv`` in ``recipe.imports`` splits it back into the names.
+    '''
+    return '; '.join(
+        '"{}"'.format(name.replace('"', '""'))
+        if ';' in name or '"' in name else name
+        for name in names
+    )
+
+
+def csv_lines(recipes):
+    '''Yield a CSV header, then one row per recipe
+
+    Tag and ingredient names are joined with ``join_names``.
+    '''
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS + ('ingredients', 'tags'))
+    for recipe in recipes:
+        yield writer.writerow(
+            [recipe[field] for field in EXPORT_FIELDS] + [
+                join_names(item['name'] for item in recipe['ingredients']),
+                join_names(item['name'] for item in recipe['tags']),
+            ]
+        )
+
+
+# export_format: (line generator, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson', 'ndjson'),
+    'csv': (csv_lines, 'text/csv', 'csv'),
+}
@@ -0,0 +1,224 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.db import connection
+
+from core.models import Ingredient, Recipe, Tag, normalize_name
+from core.names import resolve_names
+from core.signals import bulk_m2m_changed, bulk_saved, deferred_updates
+from recipe.serializers import RecipeImportSerializer
+
+
+def parse_ndjson(lines):
+    '''Yield the JSON document of each non-blank line
+
+    Malformed lines are yielded as their ``ValueError``, so the importer
+    can report them with the other invalid rows.
+    '''
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def _split_names(value):
+    '''Split a cell of semicolon separated, optionally quoted names'''
+    if not value:
+        return []
+    record = next(csv.reader([value], delimiter=';', skipinitialspace=True))
+    return [name.strip() for name in record if name.strip()]
+
+
+def parse_csv(lines):
+    '''Yield a dict per CSV row, keyed by the header row
+
+    Tag and ingredient names are separated by semicolons, as in exports;
+    names holding one are quoted. Rows whose names don't parse are
+    yielded as a ``ValueError``, like malformed NDJSON lines.
+    '''
+    for row in csv.DictReader(lines):
+        try:
+            for field_name in ('ingredients', 'tags'):
+                if field_name in row:
+                    row[field_name] = _split_names(row[field_name])
+        except csv.Error as exc:
+            yield ValueError(exc)
+        else:
+            yield row
+
+
+# import_format: row parser
+IMPORT_FORMATS = {
+    'ndjson': parse_ndjson,
+    'csv': parse_csv,
+}
+
+
+def _create_all(model, instances, batch_size):
+    '''Insert the instances, setting their primary keys'''
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(instances, batch_size=batch_size)
+        bulk_saved.send(sender=model, instances=instances, created=True)
+    else:
+        # the backend can't report the new primary keys of a batch; each
+        # save sends post_save, which stands in for bulk_saved
+        for instance in instances:
+            instance.save(force_insert=True)
+
+
+class RecipeImporter:
+    '''Create a user's recipes from parsed rows in large batches
+
+    Each batch of valid rows costs a fixed number of queries: its missing
+    tags and ingredients, its recipes and its links are inserted with one
+    ``bulk_create`` each, inside a transaction of its own. Names resolve
+    through a per-user map of normalized names loaded once, so existing
+    tags and ingredients are reused instead of duplicated. Invalid rows
+    are skipped and reported by their 1-based row number.
+    '''
+
+    max_errors = 100
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self._started = None
+        self._names = {}
+
+    def _name_map(self, model):
+        '''Return the user's tag or ingredient pks by normalized name'''
+        if model not in self._names:
+            self._names[model] = dict(
+                model.objects.filter(user=self.user)
+                .values_list('normalized_name', 'id')
+            )
+        return self._names[model]
+
+    def _resolve(self, model, rows, field_name):
+        '''Create the missing named objects of the rows, return the map'''
+        names = self._name_map(model)
+        missing = [
+            name for attrs in rows for name in attrs.get(field_name, ())
+            if normalize_name(name) not in names
+        ]
+        if missing:
+            names.update(
+                resolve_names(model, self.user, missing, self.batch_size)
+            )
+        return names
+
+    def _validate(self, number, row):
+        '''Return the validated attributes of a row, or None'''
+        if isinstance(row, ValueError):
+            errors = {'non_field_errors': [f'Malformed row: {row}']}
+        else:
+            serializer = RecipeImportSerializer(data=row)
+            if serializer.is_valid():
+                return serializer.validated_data
+            errors = serializer.errors
+
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'errors': errors})
+        return None
+
+    def _write(self, rows):
+        '''Insert a batch of validated rows and their links'''
+        links = {
+            'ingredients': self._resolve(Ingredient, rows, 'ingredients'),
+            'tags': self._resolve(Tag, rows, 'tags'),
+        }
+        recipes = [
+            Recipe(
+                user=self.user,
+                **{name: value for name, value in attrs.items()
+                   if name not in links}
+            )
+            for attrs in rows
+        ]
+        _create_all(Recipe, recipes, self.batch_size)
+
+        for field_name, names in links.items():
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            linked = [
+                (recipe, dict.fromkeys(
+                    normalize_name(name) for name in attrs[field_name]
+                ))
+                for recipe, attrs in zip(recipes, rows)
+                if attrs.get(field_name)
+            ]
+            if not linked:
+                continue
+            through.objects.bulk_create([
+                through(**{source: recipe, f'{target}_id': names[name]})
+                for recipe, item_names in linked
+                for name in item_names
+            ], batch_size=self.batch_size)
+            bulk_m2m_changed.send(
+                sender=through,
+                instances=[recipe for recipe, _ in linked],
+                replaced=False
+            )
+        self.created += len(recipes)
+
+    def batches(self, rows):
+        '''Import the rows batch by batch, yielding after each batch'''
+        if self._started is None:
+            self._started = time.monotonic()
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            valid = []
+            for row in batch:
+                self.rows += 1
+                attrs = self._validate(self.rows, row)
+                if attrs is not None:
+                    valid.append(attrs)
+            if valid:
+                with deferred_updates():
+                    self._write(valid)
+            yield self
+
+    def run(self, rows):
+        '''Import all rows, return the report'''
+        for _ in self.batches(rows):
+            pass
+        return self.report()
+
+    @property
+    def seconds(self):
+        '''Return the time spent importing so far'''
+        if self._started is None:
+            return 0.0
+        return time.monotonic() - self._started
+
+    @property
+    def rows_per_second(self):
+        '''Return the import throughput so far'''
+        seconds = self.seconds
+        return self.rows / seconds if seconds else 0.0
+
+    def report(self):
+        '''Return the counts, throughput and first errors of the import'''
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+        }
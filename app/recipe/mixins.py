@@ -0,0 +1,310 @@
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
+
+from core.cache import named_cache
+from core.models import CollectionVersion
+from core.signals import deferred_updates
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+class BulkModelMixin:
+    '''Create, update and delete many user owned objects in one request
+
+    All three operations are exposed on the ``bulk/`` route of the viewset
+    and run inside a single transaction, so a batch is applied completely
+    or not at all. Responses hold one result per submitted item, in the
+    order they were submitted.
+    '''
+
+    bulk_max_items = 1000
+
+    def _check_bulk_payload(self, data):
+        '''Validate the size and shape of a bulk request body'''
+        if not isinstance(data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list.']})
+        if len(data) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                f'At most {self.bulk_max_items} items per request.'
+            ]})
+
+    def _bulk_ids(self, items):
+        '''Return the integer IDs of the items, rejecting malformed ones'''
+        ids = []
+        errors = []
+        for item in items:
+            item_id = item.get('id') if isinstance(item, dict) else item
+            if isinstance(item_id, int) and not isinstance(item_id, bool):
+                ids.append(item_id)
+                errors.append({})
+            else:
+                errors.append({'id': ['A valid integer is required.']})
+        if any(errors):
+            raise ValidationError(errors)
+        return ids
+
+    def _bulk_results(self, instances):
+        '''Serialize the saved instances in their submitted order'''
+        ids = [instance.pk for instance in instances]
+        fetched = self.get_queryset().filter(pk__in=ids).in_bulk()
+        serializer = self.get_serializer(
+            [fetched[pk] for pk in ids], many=True
+        )
+        return serializer.data
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        '''Create a list of objects'''
+        self._check_bulk_payload(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with deferred_updates():
+            self.perform_bulk_create(serializer)
+        return Response(
+            self._bulk_results(serializer.instance),
+            status=status.HTTP_201_CREATED
+        )
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        '''Partially update a list of objects identified by their id'''
+        self._check_bulk_payload(request.data)
+        ids = self._bulk_ids(request.data)
+        found = self.get_queryset().filter(pk__in=ids).in_bulk()
+        errors = []
+        for i, pk in enumerate(ids):
+            if pk not in found:
+                errors.append({'id': ['Not found.']})
+            elif pk in ids[:i]:
+                # the items would overwrite each other
+                errors.append({'id': ['Duplicate id in this request.']})
+            else:
+                errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+
+        serializer = self.get_serializer(
+            [found[pk] for pk in ids],
+            data=request.data,
+            many=True,
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with deferred_updates():
+            self.perform_bulk_update(serializer)
+        return Response(self._bulk_results(serializer.instance))
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        '''Delete a list of objects given by their ids'''
+        self._check_bulk_payload(request.data)
+        ids = self._bulk_ids(request.data)
+        queryset = self.get_queryset().filter(pk__in=ids)
+        with deferred_updates():
+            found = set(queryset.values_list('pk', flat=True))
+            self.perform_bulk_destroy(queryset)
+        return Response([
+            {'id': pk, 'status': 'deleted' if pk in found else 'not_found'}
+            for pk in ids
+        ])
+
+    def perform_bulk_create(self, serializer):
+        '''Create the objects for the authenticated user'''
+        serializer.save(user=self.request.user)
+
+    def perform_bulk_update(self, serializer):
+        '''Save the updated objects'''
+        serializer.save()
+
+    def perform_bulk_destroy(self, queryset):
+        '''Delete the selected objects'''
+        queryset.delete()
+
+
+class FieldSelectionMixin:
+    '''Let reads choose their fields with ``?fields=`` and ``?expand=``
+
+    Both take comma separated field names of the serializer; ``expand``
+    accepts the relations listed in its ``Meta.expandable`` and renders
+    them as objects. Unknown names are rejected. ``sparse_queryset``
+    loads only the columns that the response and the ordering need.
+    '''
+
+    def _field_names(self, param, allowed):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = tuple(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValidationError({
+                param: f'Unknown fields: {", ".join(unknown)}'
+            })
+        return names
+
+    def get_sparse_fieldset(self):
+        '''Return the requested (fields, expand), fields None for all'''
+        if self.request.method not in SAFE_METHODS:
+            return None, ()
+        meta = self.get_serializer_class().Meta
+        fields = self._field_names('fields', meta.fields)
+        expand = self._field_names(
+            'expand', getattr(meta, 'expandable', {})
+        ) or ()
+        if fields is not None:
+            expand = tuple(name for name in expand if name in fields)
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_fieldset()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def sparse_queryset(self, queryset):
+        '''Defer the columns that no requested field needs'''
+        fields, _ = self.get_sparse_fieldset()
+        if fields is None:
+            return queryset
+        model = queryset.model
+        columns = {field.name for field in model._meta.concrete_fields}
+        # keyset pagination reads the ordering values off the last row
+        ordering = [name.lstrip('-') for name in self.ordering]
+        return queryset.only(model._meta.pk.name, *(
+            name for name in dict.fromkeys([*fields, *ordering])
+            if name in columns
+        ))
+
+
+class ConditionalGetMixin:
+    '''Serve list and retrieve with validators from the data they render
+
+    Responses carry a strong ``ETag`` and ``Last-Modified``. Lists derive
+    them from the version of the user's ``collection``, a detail from
+    the ``updated_at`` of its object, see ``object_updated_at``. A
+    request whose ``If-None-Match`` still matches is answered with 304
+    Not Modified after a single lookup, without querying the collection
+    or running the serializers.
+    '''
+
+    collection = None
+
+    def object_updated_at(self, queryset):
+        '''Return when the object of a detail response last changed'''
+        return queryset.values_list('updated_at', flat=True).first()
+
+    def _detail_updated_at(self):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        queryset = self.filter_queryset(self.get_queryset()) \
+            .prefetch_related(None)
+        try:
+            return self.object_updated_at(
+                queryset.filter(**{self.lookup_field: lookup})
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            # a malformed lookup, the handler answers 404
+            return None
+
+    def get_validators(self, request):
+        '''Return the (etag, last_modified) of the request's response
+
+        Both are None for a detail whose object doesn't exist.
+        '''
+        if self.action == 'retrieve':
+            version, updated_at = 0, self._detail_updated_at()
+            if updated_at is None:
+                return None, None
+        else:
+            version, updated_at = CollectionVersion.objects.current(
+                request.user.pk, self.collection
+            )
+        # the response also depends on the URL and the negotiated format
+        fingerprint = ':'.join([
+            str(request.user.pk),
+            self.collection,
+            str(version),
+            updated_at.isoformat() if updated_at else '',
+            request.get_full_path(),
+            request.accepted_media_type or '',
+        ])
+        etag = '"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+        last_modified = timegm(updated_at.utctimetuple()) \
+            if updated_at else None
+        return etag, last_modified
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = None
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+        if response is None:
+            response = self.build_response(
+                request, etag, handler, *args, **kwargs
+            )
+        if etag is not None and response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        # responses are per user, make shared caches revalidate them
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def build_response(self, request, etag, handler, *args, **kwargs):
+        '''Return the full response for a request that isn't a 304'''
+        return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
+
+
+class ResponseCacheMixin(ConditionalGetMixin):
+    '''Serve repeated list and retrieve requests from rendered JSON
+
+    The ETag already identifies a response by user, version, URL and
+    media type. The cache key adds the scheme and host, which the
+    absolute pagination links depend on. A change to a collection bumps
+    its version, which makes its cached lists unreachable; a change to an
+    object does the same to its cached details only. Stale entries then
+    age out of the cache.
+    '''
+
+    def build_response(self, request, etag, handler, *args, **kwargs):
+        if etag is None or request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        cache = named_cache('RESPONSE_CACHE', key_prefix='response:')
+        key = f'{request.scheme}://{request.get_host()}:{etag}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, (rendered.content, rendered['Content-Type'])
+                )
+            )
+        return response
@@ -0,0 +1,191 @@
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetPagination(CursorPagination):
+    '''Cursor pagination seeking on the full (composite) ordering
+
+    DRF's cursor pagination only stores the first ordering field and falls
+    back to an offset for ties. Here the cursor stores the value of every
+    ordering field of the boundary row, so each page is a single index seek
+    that costs the same regardless of how deep into the list it is.
+    '''
+
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        '''Return the ordering declared on the view'''
+        ordering = getattr(view, 'ordering', None)
+        assert ordering, (
+            'Using keyset pagination, but no ordering attribute was declared '
+            'on the view.'
+        )
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def decode_cursor(self, request):
+        '''Decode the cursor and its JSON encoded position'''
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        '''Encode the cursor, serializing its position as JSON'''
+        if cursor.position is not None:
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, \
+                self.cursor.position
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(_reverse_field(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if current_position is not None:
+            current_position = self._clean_position(
+                queryset.model, current_position
+            )
+            queryset = queryset.filter(
+                self._seek_filter(ordering, current_position)
+            )
+
+        # Always fetch an extra row to find out if another page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        self.current_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        else:
+            position = self.current_position
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        if self.page:
+            position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+        else:
+            position = self.current_position
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        '''Return the values of every ordering field for the instance'''
+        position = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if isinstance(instance, dict):
+                position.append(instance[name])
+            else:
+                position.append(getattr(instance, name))
+        return position
+
+    def _clean_position(self, model, position):
+        '''Convert the cursor position to the types of its fields
+
+        A tampered cursor, or one from another ordering, is a 404 like any
+        other invalid cursor. Annotations, as the search rank, are numbers.
+        '''
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            if value is None or isinstance(value, (bool, dict, list)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                value = model._meta.get_field(field.lstrip('-')) \
+                    .to_python(value)
+            except FieldDoesNotExist:
+                if not isinstance(value, (int, float)):
+                    raise NotFound(self.invalid_cursor_message)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def _seek_filter(self, ordering, position):
+        '''Return a filter selecting rows strictly after the position
+
+        For an ordering (a, b) this is ``a > x OR (a = x AND b > y)``,
+        with the comparisons flipped for descending fields. The redundant
+        ``a >= x`` bound lets the database start the index scan at the
+        cursor instead of filtering from the first row.
+        '''
+        names = [field.lstrip('-') for field in ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt'
+                   for field in ordering]
+
+        clauses = []
+        for i, name in enumerate(names):
+            clause = {names[j]: position[j] for j in range(i)}
+            clause[f'{name}__{lookups[i]}'] = position[i]
+            clauses.append(Q(**clause))
+
+        bound = Q(**{f'{names[0]}__{lookups[0]}e': position[0]})
+        return bound & reduce(operator.or_, clauses)
+
+
+def _reverse_field(field):
+    '''Return the ordering field with its direction flipped'''
+    if field.startswith('-'):
+        return field[1:]
+    return '-' + field
@@ -1,34 +1,265 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
-from core.models import Ingredient, Recipe, Tag
+from core.models import (
+    Ingredient, Recipe, Tag, validate_normalized_name
+)
+from core.signals import bulk_m2m_changed, bulk_saved
+from core.timing import TimedSerializerMixin
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class BulkListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    '''List serializer writing all items with batched queries
+
+    Rows are inserted with a single ``bulk_create`` and updated with a
+    single ``bulk_update``; many-to-many links of every item are written
+    to the through tables in one batch per relation.
+    '''
+
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        '''Validate the items, looking up all their related IDs at once'''
+        fields = [
+            field for field in self.child.fields.values()
+            if isinstance(field, BatchedManyRelatedField)
+            and not field.read_only
+        ]
+        items = data if isinstance(data, list) else []
+        for field in fields:
+            field.preload(
+                item[field.field_name] for item in items
+                if isinstance(item, dict) and field.field_name in item
+            )
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.preload(())
+
+    def _split_relations(self, validated_data):
+        '''Pop the many-to-many values out of each item's attributes'''
+        model = self.child.Meta.model
+        names = [field.name for field in model._meta.many_to_many]
+        relations = []
+        for attrs in validated_data:
+            relations.append({
+                name: attrs.pop(name) for name in names if name in attrs
+            })
+        return relations
+
+    def _set_relations(self, instances, relations, replace=False):
+        '''Write the many-to-many links of every instance in bulk'''
+        model = self.child.Meta.model
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            changed = [
+                (instance, items[field.name])
+                for instance, items in zip(instances, relations)
+                if field.name in items
+            ]
+            if not changed:
+                continue
+
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [instance.pk for instance, _ in changed]
+                }).delete()
+            through.objects.bulk_create([
+                through(**{source: instance, target: related})
+                for instance, related_items in changed
+                for related in related_items
+            ], batch_size=self.batch_size, ignore_conflicts=True)
+            bulk_m2m_changed.send(
+                sender=through,
+                instances=[instance for instance, _ in changed],
+                replaced=replace
+            )
+
+    def create(self, validated_data):
+        '''Create every item and its relations with batched inserts'''
+        model = self.child.Meta.model
+        relations = self._split_relations(validated_data)
+        instances = [model(**attrs) for attrs in validated_data]
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(instances, batch_size=self.batch_size)
+            bulk_saved.send(sender=model, instances=instances, created=True)
+        else:
+            # the backend can't report the new primary keys of a batch; each
+            # save sends post_save, which stands in for bulk_saved
+            for instance in instances:
+                instance.save(force_insert=True)
+
+        self._set_relations(instances, relations)
+        return instances
+
+    def update(self, instances, validated_data):
+        '''Update every item in place and save them with one bulk update'''
+        model = self.child.Meta.model
+        relations = self._split_relations(validated_data)
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+
+        if fields:
+            # bulk_update skips pre_save, so stamp auto_now fields and
+            # derive the fields of changed ones here
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False) or \
+                        getattr(field, 'derived_from', None) in fields:
+                    for instance in instances:
+                        field.pre_save(instance, add=False)
+                    fields.add(field.name)
+            model.objects.bulk_update(
+                instances, fields, batch_size=self.batch_size
+            )
+            bulk_saved.send(sender=model, instances=instances, created=False)
+        self._set_relations(instances, relations, replace=True)
+        return instances
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    '''Many related field looking up all submitted primary keys at once
+
+    Every ID is fetched by a single ``pk__in`` query instead of one query
+    each, and every invalid or missing ID is reported in one error.
+    Objects are returned in the submitted order. ``BulkListSerializer``
+    preloads the IDs of all its items, so a batch runs one query too.
+    '''
+
+    _preloaded = None
+
+    def _to_pks(self, data):
+        '''Return the primary keys in data and the errors of the others'''
+        child = self.child_relation
+        pk_field = child.get_queryset().model._meta.pk
+        pks = []
+        errors = []
+        for item in data:
+            try:
+                if child.pk_field is not None:
+                    item = child.pk_field.to_internal_value(item)
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(pk_field.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                errors.append(child.error_messages['incorrect_type'].format(
+                    data_type=type(item).__name__
+                ))
+        return pks, errors
+
+    def preload(self, values):
+        '''Look up the IDs of several values at once, () to stop'''
+        pks = set()
+        for data in values:
+            if isinstance(data, (list, tuple)):
+                pks.update(self._to_pks(data)[0])
+        self._preloaded = (
+            pks, self.child_relation.get_queryset().in_bulk(pks)
+        ) if pks else None
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks, errors = self._to_pks(data)
+        if self._preloaded is not None and self._preloaded[0] >= set(pks):
+            found = self._preloaded[1]
+        else:
+            found = child.get_queryset().in_bulk(set(pks)) if pks else {}
+        errors.extend(
+            child.error_messages['does_not_exist'].format(pk_value=pk)
+            for pk in dict.fromkeys(pks) if pk not in found
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [found[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    '''Primary key of an object owned by the requesting user
+
+    With ``many=True`` the keys are validated in a single query.
+    '''
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+class SparseFieldsMixin:
+    '''Serializer rendering only requested fields and expanded relations
+
+    ``fields`` limits the output to the given field names. ``expand``
+    renders the named relations as objects instead of primary keys, with
+    the serializer class given for them in ``Meta.expandable``.
+    '''
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable', {})
+        for name in expand:
+            self.fields[name] = expandable[name](many=True, read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class IngredientSerializer(TimedSerializerMixin,
+                           SparseFieldsMixin,
+                           serializers.ModelSerializer):
     '''Serializer for the ingredient object'''
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = BulkListSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin,
+                    SparseFieldsMixin,
+                    serializers.ModelSerializer):
     '''Serializer for the tag object'''
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = BulkListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin,
+                       SparseFieldsMixin,
+                       serializers.ModelSerializer):
     '''Serializer for the recipe object'''
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -45,6 +276,11 @@ class RecipeSerializer(serializers.ModelSerializer):
             'link'
         )
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+        expandable = {
+            'ingredients': IngredientSerializer,
+            'tags': TagSerializer,
+        }
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -52,3 +288,44 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+
+
+class AttrNameField(serializers.CharField):
+    '''Name of a tag or ingredient, given as is or as {"name": ...}'''
+
+    def run_validation(self, data=serializers.empty):
+        if isinstance(data, dict):
+            data = data.get('name')
+        return super().run_validation(data)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    '''Serializer validating one imported recipe
+
+    Tags and ingredients are referenced by name, so rows validate without
+    queries; the importer resolves the names in bulk.
+    '''
+
+    ingredients = serializers.ListField(
+        child=AttrNameField(
+            max_length=255, validators=[validate_normalized_name]
+        ),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=AttrNameField(
+            max_length=255, validators=[validate_normalized_name]
+        ),
+        required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'title',
+            'ingredients',
+            'tags',
+            'time_minutes',
+            'price',
+            'link'
+        )
@@ -0,0 +1,60 @@
+from django.db.models import Prefetch
+
+from core.changes import changes_since
+from core.models import ChangeLog, Ingredient, Recipe, Tag
+from recipe import serializers
+
+
+# response key, change log kind, model, serializer, rendered fields
+SYNC_KINDS = (
+    ('recipes', ChangeLog.RECIPE, Recipe, serializers.RecipeSerializer,
+     None),
+    # recipe_count changes with every link, clients count the recipes
+    ('tags', ChangeLog.TAG, Tag, serializers.TagSerializer, ('id', 'name')),
+    ('ingredients', ChangeLog.INGREDIENT, Ingredient,
+     serializers.IngredientSerializer, ('id', 'name')),
+)
+
+
+def _changed_objects(model, user, ids):
+    '''Return the objects of the IDs that still exist, in ID order'''
+    queryset = model.objects.filter(user=user, pk__in=ids).order_by('pk')
+    if model is Recipe:
+        # the serializer only renders related primary keys
+        queryset = queryset.prefetch_related(*(
+            Prefetch(field_name, queryset=related.objects.only('id'))
+            for field_name, related in (('ingredients', Ingredient),
+                                        ('tags', Tag))
+        ))
+    return list(queryset)
+
+
+def build_sync(user, token, limit):
+    '''Return the user's objects changed or deleted after the token
+
+    Reads at most ``limit`` change log entries and then the changed
+    objects of each kind with a query each, so the cost follows the
+    number of changes rather than the size of the account. The returned
+    token is the one to sync from next; ``has_more`` tells to do so
+    right away.
+    '''
+    entries, has_more = changes_since(user.pk, token, limit)
+    payload = {
+        'token': entries[-1][0] if entries else token,
+        'has_more': has_more,
+    }
+    for name, kind, model, serializer_class, fields in SYNC_KINDS:
+        changed = [pk for _, entry_kind, pk, deleted in entries
+                   if entry_kind == kind and not deleted]
+        deleted = [pk for _, entry_kind, pk, deleted in entries
+                   if entry_kind == kind and deleted]
+        objects = _changed_objects(model, user, changed) if changed else []
+        # deleted after the entries were read, their tombstone follows
+        deleted += sorted(set(changed) - {obj.pk for obj in objects})
+        payload[name] = {
+            'changed': serializer_class(
+                objects, many=True, fields=fields
+            ).data,
+            'deleted': deleted,
+        }
+    return payload
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import include, path, resolve
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag
+from recipe.async_views import async_read_urls
+from recipe.urls import router
+from recipe.views import RecipeViewSet
+
+
+urlpatterns = [
+    path('api/recipe/', include((async_read_urls(router.urls), 'recipe'))),
+]
+
+RECIPES_URL = '/api/recipe/recipes/'
+TAGS_URL = '/api/recipe/tags/'
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadViewTests(TransactionTestCase):
+    '''Test the async read path of the recipe API'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.auth = {'authorization': f'Token {token.key}'}
+
+    def test_read_routes_are_async(self):
+        '''Test that only the read heavy routes are async views'''
+        self.assertTrue(
+            asyncio.iscoroutinefunction(resolve(RECIPES_URL).func)
+        )
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(TAGS_URL).func))
+        self.assertFalse(asyncio.iscoroutinefunction(
+            resolve('/api/recipe/tags/bulk/').func
+        ))
+
+    async def test_list_recipes(self):
+        '''Test listing recipes through the async view'''
+        res = await self.client.get(RECIPES_URL, **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['results'], [])
+
+    def test_list_tags(self):
+        '''Test that reads see rows committed by other connections'''
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = asyncio.run(self.client.get(TAGS_URL, **self.auth))
+
+        self.assertEqual(res.json()['results'][0]['name'], 'Vegan')
+
+    def test_create_recipe(self):
+        '''Test that writes still work on the async routes'''
+        res = asyncio.run(self.client.post(
+            RECIPES_URL,
+            {
+                'title': 'Soup',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [],
+                'ingredients': [],
+            },
+            content_type='application/json',
+            **self.auth
+        ))
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(Recipe.objects.filter(title='Soup').exists())
+
+    async def get_slow_recipes(self, count):
+        '''Get the recipes concurrently from a slow view, time it'''
+        list_recipes = RecipeViewSet.list
+
+        def slow_list(*args, **kwargs):
+            time.sleep(0.3)
+            return list_recipes(*args, **kwargs)
+
+        with patch.object(RecipeViewSet, 'list', slow_list):
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(
+                self.client.get(RECIPES_URL, **self.auth)
+                for _ in range(count)
+            ))
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(
+            [res.status_code for res in responses], [200] * count
+        )
+        return responses, elapsed
+
+    async def test_reads_run_concurrently(self):
+        '''Test that slow reads don't queue behind each other'''
+        responses, elapsed = await self.get_slow_recipes(3)
+
+        self.assertLess(elapsed, 0.6)
+
+    @override_settings(REQUEST_TIMING={
+        'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True
+    })
+    async def test_timed_reads_run_concurrently(self):
+        '''Test that timed reads stay concurrent and time their queries'''
+        responses, elapsed = await self.get_slow_recipes(3)
+
+        self.assertLess(elapsed, 0.6)
+        for res in responses:
+            db, serialize, render, total = res['Server-Timing'].split(', ')
+            self.assertNotIn('desc="0 queries"', db)
+            self.assertNotEqual(db.split(';')[1], 'dur=0.00')
@@ -0,0 +1,252 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+def sample_recipe(user, **params):
+    '''Create and return a sample recipe'''
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicBulkApiTests(TestCase):
+    '''Test unauthenticated access of the bulk endpoints'''
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        '''Test that authentication is required'''
+        res = self.client.post(TAGS_BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(TestCase):
+    '''Test the bulk create, update and delete endpoints'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_ingredients(self):
+        '''Test creating many ingredients in one request'''
+        payload = [{'name': f'Ingredient {i}'} for i in range(50)]
+
+        res = self.client.post(INGREDIENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['name'] for item in res.data],
+            [item['name'] for item in payload]
+        )
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 50
+        )
+
+    def test_bulk_create_invalid_item(self):
+        '''Test that one invalid item rejects the batch with item errors'''
+        payload = [{'name': 'Vegan'}, {'name': ''}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_recipes_with_relations(self):
+        '''Test creating recipes and their tag and ingredient links'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(10)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 10)
+        for item in res.data:
+            self.assertEqual(item['tags'], [tag.id])
+            self.assertEqual(item['ingredients'], [ingredient.id])
+        self.assertEqual(tag.recipe_set.count(), 10)
+        self.assertEqual(ingredient.recipe_set.count(), 10)
+
+    def test_bulk_create_taken_names(self):
+        '''Test that names taken in any case or spacing are rejected'''
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(
+            TAGS_BULK_URL, [{'name': 'Dessert'}, {'name': 'vegan '}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_bulk_names_taken_within_batch(self):
+        '''Test that items sharing a name are reported after the first'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.patch(TAGS_BULK_URL, [
+            {'id': tag.id, 'name': 'Sweet'},
+            {'id': other.id, 'name': 'sweet'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_create_recipes_query_count(self):
+        '''Test that related IDs of every item are looked up at once'''
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}').id
+                for i in range(3)]
+
+        def create(count):
+            payload = [
+                {'title': f'Recipe {i}', 'time_minutes': 10,
+                 'price': '5.00', 'tags': tags, 'ingredients': []}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    RECIPES_BULK_URL, payload, format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            # SQLite saves new rows one by one, count the reads only
+            return sum(
+                query['sql'].startswith('SELECT "core_tag"')
+                for query in queries.captured_queries
+            )
+
+        self.assertEqual(create(1), create(20))
+
+    def test_bulk_rename_normalizes(self):
+        '''Test that renames update the normalized names'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.patch(
+            TAGS_BULK_URL, [{'id': tag.id, 'name': 'Plant  Based'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual(tag.normalized_name, 'plant based')
+
+    def test_bulk_update_recipes(self):
+        '''Test updating fields and replacing links of many recipes'''
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        recipe1 = sample_recipe(self.user, title='Curry')
+        recipe2 = sample_recipe(self.user, title='Cake')
+        recipe1.tags.add(tag1)
+        payload = [
+            {'id': recipe1.id, 'tags': [tag2.id]},
+            {'id': recipe2.id, 'title': 'Chocolate cake', 'time_minutes': 45},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(list(recipe1.tags.all()), [tag2])
+        self.assertEqual(recipe1.title, 'Curry')
+        self.assertEqual(recipe2.title, 'Chocolate cake')
+        self.assertEqual(recipe2.time_minutes, 45)
+        self.assertEqual(res.data[1]['title'], 'Chocolate cake')
+
+    def test_bulk_update_unknown_id(self):
+        '''Test that updating objects of other users is rejected'''
+        other_user = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpassword2'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other_tag = Tag.objects.create(user=other_user, name='Other')
+        payload = [
+            {'id': tag.id, 'name': 'Vegetarian'},
+            {'id': other_tag.id, 'name': 'Stolen'},
+        ]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        other_tag.refresh_from_db()
+        self.assertEqual(other_tag.name, 'Other')
+
+    def test_bulk_update_duplicate_ids(self):
+        '''Test that an ID given twice is rejected at its repeat'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.patch(TAGS_BULK_URL, [
+            {'id': tag.id, 'name': 'Sweet'},
+            {'id': tag.id, 'name': 'Savoury'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_delete(self):
+        '''Test deleting many objects with a result per item'''
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.delete(
+            TAGS_BULK_URL, [tag1.id, tag2.id, 999], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': tag1.id, 'status': 'deleted'},
+            {'id': tag2.id, 'status': 'deleted'},
+            {'id': 999, 'status': 'not_found'},
+        ])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_payload_must_be_list(self):
+        '''Test that a non-list payload is rejected'''
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def recipe_detail_url(recipe_id):
+    '''Return recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    '''Create and return a sample recipe'''
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    '''Test ETag and Last-Modified handling of the recipe API'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_etag(self, url):
+        '''Return the ETag of a fresh response'''
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res['ETag']
+
+    def test_list_has_validators(self):
+        '''Test that list responses carry an ETag and Last-Modified'''
+        sample_recipe(self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_unchanged_list_not_modified(self):
+        '''Test that a matching If-None-Match returns 304 cheaply'''
+        sample_recipe(self.user)
+        etag = self.get_etag(RECIPES_URL)
+
+        # only the collection version is looked up
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_etag_depends_on_query(self):
+        '''Test that different pages and filters get different ETags'''
+        sample_recipe(self.user)
+
+        self.assertNotEqual(
+            self.get_etag(RECIPES_URL),
+            self.get_etag(f'{RECIPES_URL}?page_size=1')
+        )
+
+    def test_change_invalidates_etag(self):
+        '''Test that creating, updating and deleting change the ETag'''
+        recipe = sample_recipe(self.user)
+        etags = [self.get_etag(RECIPES_URL)]
+
+        recipe.title = 'Changed'
+        recipe.save()
+        etags.append(self.get_etag(RECIPES_URL))
+
+        sample_recipe(self.user)
+        etags.append(self.get_etag(RECIPES_URL))
+
+        recipe.delete()
+        etags.append(self.get_etag(RECIPES_URL))
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_link_change_invalidates_etags(self):
+        '''Test that adding a tag to a recipe changes both lists'''
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe_etag = self.get_etag(recipe_detail_url(recipe.id))
+        tag_etag = self.get_etag(f'{TAGS_URL}?assigned_only=1')
+
+        recipe.tags.add(tag)
+
+        self.assertNotEqual(
+            recipe_etag, self.get_etag(recipe_detail_url(recipe.id))
+        )
+        self.assertNotEqual(
+            tag_etag, self.get_etag(f'{TAGS_URL}?assigned_only=1')
+        )
+
+    def test_attribute_rename_invalidates_recipe_etag(self):
+        '''Test that renaming an ingredient changes nested recipe details'''
+        recipe = sample_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        etag = self.get_etag(recipe_detail_url(recipe.id))
+
+        ingredient.name = 'Sea salt'
+        ingredient.save()
+
+        res = self.client.get(
+            recipe_detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['ingredients'][0]['name'], 'Sea salt')
+
+    def test_bulk_create_invalidates_etag(self):
+        '''Test that bulk writes change the ETag'''
+        etag = self.get_etag(TAGS_URL)
+
+        self.client.post(TAGS_BULK_URL, [{'name': 'Vegan'}], format='json')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_etag_per_user(self):
+        '''Test that users never share ETags'''
+        etag = self.get_etag(TAGS_URL)
+        other_user = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpassword2'
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_user_delete_with_recipes(self):
+        '''Test that cascaded deletes don't recreate version rows'''
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.exists())
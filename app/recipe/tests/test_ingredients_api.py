@@ -1,11 +1,14 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
 
 from recipe.serializers import IngredientSerializer
 
@@ -47,7 +50,7 @@ class PrivateIngredientsApiTest(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         '''Test that ingredients are returned for the authenticated user'''
@@ -71,8 +74,8 @@ class PrivateIngredientsApiTest(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         '''Test that ingredients are created successfully'''
@@ -88,6 +91,27 @@ class PrivateIngredientsApiTest(TestCase):
 
         self.assertTrue(ingredient_exists)
 
+    def test_create_ingredient_existing_name(self):
+        '''Test that creating a name again returns the existing object'''
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(INGREDIENTS_URL, {'name': '  SALT '})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], ingredient.id)
+        self.assertEqual(res.data['name'], 'Salt')
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_create_ingredient_name_taken_concurrently(self):
+        '''Test that losing a create race returns the winner's object'''
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        with patch.object(QuerySet, 'first', return_value=None):
+            res = self.client.post(INGREDIENTS_URL, {'name': 'salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], ingredient.id)
+
     def test_create_ingredient_invalid(self):
         '''Test creating a new ingredient with invalid payload fails'''
         payload = {'name': ''}
@@ -95,3 +119,44 @@ class PrivateIngredientsApiTest(TestCase):
         res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_ingredients_assigned_to_recipes(self):
+        '''Test filtering ingredients by those assigned to recipes'''
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Eggs')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Ham')
+        recipe = Recipe.objects.create(
+            title='Coriander eggs on toast',
+            time_minutes=10,
+            price=5.00,
+            user=self.user
+        )
+        recipe.ingredients.add(ingredient1)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        names = [item['name'] for item in res.data['results']]
+        self.assertIn(ingredient1.name, names)
+        self.assertNotIn(ingredient2.name, names)
+
+    def test_retrieve_ingredients_assigned_unique(self):
+        '''Test filtering ingredients by assigned returns unique items'''
+        ingredient = Ingredient.objects.create(user=self.user, name='Eggs')
+        Ingredient.objects.create(user=self.user, name='Ham')
+        recipe1 = Recipe.objects.create(
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00,
+            user=self.user
+        )
+        recipe2 = Recipe.objects.create(
+            title='Porridge',
+            time_minutes=3,
+            price=2.00,
+            user=self.user
+        )
+        recipe1.ingredients.add(ingredient)
+        recipe2.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,146 @@
+import json
+from base64 import b64encode
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def cursor_at(position):
+    '''Return a cursor holding the given position, as a client could'''
+    querystring = urlencode({'p': json.dumps(position)})
+    return b64encode(querystring.encode('ascii')).decode('ascii')
+
+
+def sample_recipe(user, title='Sample Recipe'):
+    '''Create and return a sample recipe'''
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class KeysetPaginationTests(TestCase):
+    '''Test keyset pagination of the recipe API list endpoints'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, direction='next'):
+        '''Follow the pagination links and return every page'''
+        pages = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            url = res.data[direction]
+        return pages
+
+    def test_page_size_limits_results(self):
+        '''Test that a page holds at most page_size results'''
+        for i in range(5):
+            sample_recipe(self.user, title=f'Recipe {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_walk_pages_with_duplicate_titles(self):
+        '''Test that rows sharing a title are neither skipped nor repeated'''
+        recipes = [sample_recipe(self.user, title='Same') for i in range(7)]
+        recipes += [sample_recipe(self.user, title='Other') for i in range(3)]
+
+        pages = self.walk(f'{RECIPES_URL}?page_size=3')
+        ids = [item['id'] for page in pages for item in page['results']]
+
+        expected = Recipe.objects.filter(user=self.user) \
+            .order_by('-title', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+        self.assertEqual(len(pages), 4)
+
+    def test_walk_back_with_previous_links(self):
+        '''Test that previous links return the same pages in reverse'''
+        recipe = sample_recipe(self.user)
+        for i in range(8):
+            tag = Tag.objects.create(user=self.user, name=f'Tag {i}')
+            if i % 3 == 0:
+                recipe.tags.add(tag)
+
+        # the recipe counts tie, so pages split on the id as well
+        forward = self.walk(
+            f'{TAGS_URL}?page_size=3&ordering=-recipe_count'
+        )
+        backward = self.walk(forward[-1]['previous'], direction='previous')
+
+        self.assertEqual(
+            [page['results'] for page in forward[:-1]],
+            [page['results'] for page in reversed(backward)]
+        )
+
+    def test_deep_page_query_count(self):
+        '''Test that a later page costs the same queries as the first'''
+        for i in range(10):
+            sample_recipe(self.user, title=f'Recipe {i}')
+        first = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(len(first.data['results']), 2)
+
+        url = first.data['next']
+        for i in range(3):
+            url = self.client.get(url).data['next']
+
+        # the collection version, the recipe page and the two prefetches
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        '''Test that a malformed cursor returns not found'''
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        '''Test that positions of the wrong types return not found'''
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        for position in (['x', 'abc'], [None, 5], ['x', [1]]):
+            with self.subTest(position=position):
+                res = self.client.get(
+                    TAGS_URL, {'cursor': cursor_at(position)}
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_of_other_ordering(self):
+        '''Test that a cursor reused with another ordering is rejected'''
+        for name in ('Vegan', 'Dessert'):
+            Tag.objects.create(user=self.user, name=name)
+        res = self.client.get(TAGS_URL, {'ordering': 'name', 'page_size': 1})
+        cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+
+        res = self.client.get(
+            TAGS_URL, {'ordering': 'recipe_count', 'cursor': cursor}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
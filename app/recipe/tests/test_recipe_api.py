@@ -3,7 +3,7 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import Ingredient, Recipe, Tag
 
@@ -79,7 +79,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         '''Test that recipes are returned for the authenticated user'''
@@ -100,8 +100,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         '''Test viewing a recipe detail'''
@@ -179,3 +179,144 @@ class PrivateRecipeApiTest(TestCase):
         self.assertEqual(ingredients.count(), 2)
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
+
+    def test_related_ids_validated_in_order(self):
+        '''Test that related IDs validate to objects in submitted order'''
+        tags = [sample_tag(self.user, name=f'Tag {i}') for i in range(3)]
+        payload = {
+            'title': 'Ordered Recipe title',
+            'tags': [tags[2].id, tags[0].id, tags[1].id],
+            'ingredients': [],
+            'time_minutes': 30,
+            'price': 5.00
+        }
+        request = APIRequestFactory().post(RECIPES_URL)
+        request.user = self.user
+
+        serializer = RecipeSerializer(
+            data=payload, context={'request': request}
+        )
+
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(
+            serializer.validated_data['tags'], [tags[2], tags[0], tags[1]]
+        )
+
+    def test_create_recipe_with_other_users_tag(self):
+        '''Test that tags of other users can't be assigned'''
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        tag = sample_tag(user=other_user)
+        payload = {
+            'title': 'Recipe title',
+            'tags': [tag.id],
+            'time_minutes': 30,
+            'price': 5.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_reports_all_invalid_ids(self):
+        '''Test that every missing or malformed ID is reported at once'''
+        tag = sample_tag(user=self.user)
+        payload = {
+            'title': 'Recipe title',
+            'tags': [tag.id, 9998, 'abc', 9999],
+            'time_minutes': 30,
+            'price': 5.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertIn('9998', ' '.join(res.data['tags']))
+        self.assertIn('9999', ' '.join(res.data['tags']))
+
+    def test_filter_recipes_by_tags(self):
+        '''Test returning recipes with any of the specified tags'''
+        recipe1 = sample_recipe(user=self.user, title='Thai vegetable curry')
+        recipe2 = sample_recipe(user=self.user, title='Aubergine with tahini')
+        recipe3 = sample_recipe(user=self.user, title='Fish and chips')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Vegetarian')
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(recipe1.id, ids)
+        self.assertIn(recipe2.id, ids)
+        self.assertNotIn(recipe3.id, ids)
+
+    def test_filter_recipes_by_all_tags(self):
+        '''Test returning recipes that have every specified tag'''
+        recipe1 = sample_recipe(user=self.user, title='Vegan curry')
+        recipe2 = sample_recipe(user=self.user, title='Vegetarian curry')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Curry')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_by_ingredients(self):
+        '''Test returning recipes with specific ingredients'''
+        recipe1 = sample_recipe(user=self.user, title='Posh beans on toast')
+        recipe2 = sample_recipe(user=self.user, title='Chicken cacciatore')
+        recipe3 = sample_recipe(user=self.user, title='Steak and mushrooms')
+        ingredient1 = sample_ingredient(user=self.user, name='Feta cheese')
+        ingredient2 = sample_ingredient(user=self.user, name='Chicken')
+        recipe1.ingredients.add(ingredient1)
+        recipe2.ingredients.add(ingredient2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'ingredients': f'{ingredient1.id},{ingredient2.id}'}
+        )
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertIn(recipe1.id, ids)
+        self.assertIn(recipe2.id, ids)
+        self.assertNotIn(recipe3.id, ids)
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        '''Test combining tag and ingredient filters in a single query'''
+        recipe1 = sample_recipe(user=self.user, title='Vegan chilli')
+        recipe2 = sample_recipe(user=self.user, title='Vegan salad')
+        tag = sample_tag(user=self.user, name='Vegan')
+        ingredient = sample_ingredient(user=self.user, name='Chilli')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2.tags.add(tag)
+
+        # the collection version, the filtered page and the two prefetches
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                RECIPES_URL,
+                {'tags': str(tag.id), 'ingredients': str(ingredient.id)}
+            )
+
+        ids = [item['id'] for item in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_params(self):
+        '''Test that malformed filter parameters are rejected'''
+        res = self.client.get(RECIPES_URL, {'tags': '1,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,207 @@
+import asyncio
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.handlers import StreamingASGIHandler
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_recipe(user, title='Sample Recipe'):
+    '''Create and return a sample recipe'''
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class RecipeExportApiTests(TestCase):
+    '''Test streaming exports of a user's recipes'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        '''Return the decoded body of a successful export'''
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode()
+
+    def export_ndjson(self, **params):
+        '''Return the recipes of an NDJSON export'''
+        lines = self.export(**params).splitlines()
+        return [json.loads(line) for line in lines]
+
+    def test_export_ndjson(self):
+        '''Test that recipes are streamed as JSON lines in ID order'''
+        recipe = sample_recipe(self.user, 'Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice')
+        )
+        other = sample_recipe(self.user, 'Soup')
+
+        recipes = self.export_ndjson()
+
+        self.assertEqual([r['id'] for r in recipes], [recipe.id, other.id])
+        self.assertEqual(recipes[0]['title'], 'Curry')
+        self.assertEqual(recipes[0]['price'], '5.00')
+        self.assertEqual(
+            [tag['name'] for tag in recipes[0]['tags']], ['Spicy']
+        )
+        self.assertEqual(
+            [item['name'] for item in recipes[0]['ingredients']], ['Rice']
+        )
+        self.assertEqual(recipes[1]['tags'], [])
+
+    def test_export_csv(self):
+        '''Test that recipes are streamed as CSV rows'''
+        recipe = sample_recipe(self.user, 'Curry, Thai style')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Spicy'),
+            Tag.objects.create(user=self.user, name='Asian'),
+        )
+
+        rows = list(csv.DictReader(
+            io.StringIO(self.export(export_format='csv'))
+        ))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry, Thai style')
+        self.assertEqual(rows[0]['tags'], 'Asian; Spicy')
+        self.assertEqual(rows[0]['ingredients'], '')
+
+    def test_export_csv_quotes_separators(self):
+        '''Test that names holding semicolons or quotes are quoted'''
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Salt; pepper'),
+            Tag.objects.create(user=self.user, name='The "best"'),
+            Tag.objects.create(user=self.user, name='Vegan'),
+        )
+
+        rows = list(csv.DictReader(
+            io.StringIO(self.export(export_format='csv'))
+        ))
+
+        self.assertEqual(
+            rows[0]['tags'], '"Salt; pepper"; "The ""best"""; Vegan'
+        )
+
+    def test_resume_after_id(self):
+        '''Test that an export resumes after the given recipe ID'''
+        recipes = [sample_recipe(self.user) for i in range(3)]
+
+        exported = self.export_ndjson(after=recipes[0].id)
+
+        self.assertEqual(
+            [r['id'] for r in exported], [r.id for r in recipes[1:]]
+        )
+
+    def test_other_users_excluded(self):
+        '''Test that only the user's own recipes are exported'''
+        other_user = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpassword2'
+        )
+        sample_recipe(other_user)
+
+        self.assertEqual(self.export_ndjson(), [])
+
+    def test_links_fetched_per_chunk(self):
+        '''Test that tags and ingredients cost two queries per chunk'''
+        for i in range(5):
+            recipe = sample_recipe(self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            res = self.client.get(EXPORT_URL)
+            # the recipe cursor, then three chunks of links
+            with self.assertNumQueries(7):
+                lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+    def test_invalid_parameters(self):
+        '''Test that unknown formats and malformed IDs are rejected'''
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(EXPORT_URL, {'after': 'last'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeExportAsgiTests(TransactionTestCase):
+    '''Test exports served by the production ASGI handler'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def get_export(self):
+        '''Return the status and body of an export served over ASGI'''
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': EXPORT_URL,
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token.key}'.encode()),
+            ],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        await StreamingASGIHandler()(scope, receive, send)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return messages[0]['status'], body, messages[-1]
+
+    def test_export_over_asgi(self):
+        '''Test that exports read their rows off the event loop'''
+        for i in range(5):
+            recipe = sample_recipe(self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            status_code, body, last = asyncio.run(self.get_export())
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertFalse(last.get('more_body', False))
+        recipes = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(recipes), 5)
+        self.assertEqual(recipes[4]['tags'][0]['name'], 'T4')
@@ -0,0 +1,226 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson(*rows):
+    '''Return the rows as an NDJSON body'''
+    return ''.join(json.dumps(row) + '\n' for row in rows)
+
+
+class PublicRecipeImportApiTests(TestCase):
+    '''Test unauthenticated recipe import access'''
+
+    def test_auth_required(self):
+        '''Test that authentication is required'''
+        res = APIClient().post(
+            IMPORT_URL, '', content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipeImportApiTests(TestCase):
+    '''Test batched recipe imports'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, body, import_format='ndjson'):
+        '''Post an import body and return the response'''
+        return self.client.post(
+            f'{IMPORT_URL}?import_format={import_format}',
+            body,
+            content_type='text/plain'
+        )
+
+    def test_import_ndjson(self):
+        '''Test importing recipes with tags and ingredients by name'''
+        res = self.upload(ndjson(
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'tags': ['Spicy', 'Dinner'], 'ingredients': ['Rice']},
+            {'title': 'Porridge', 'time_minutes': 5, 'price': '1.00',
+             'tags': ['Breakfast']},
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['rows'], 2)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 0)
+        self.assertIn('rows_per_second', res.data)
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Spicy']
+        )
+        self.assertEqual(
+            list(curry.ingredients.values_list('name', flat=True)), ['Rice']
+        )
+
+    def test_existing_names_reused(self):
+        '''Test that names resolve to the user's existing objects'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        Ingredient.objects.create(user=other_user, name='Tofu')
+
+        self.upload(ndjson(
+            {'title': 'Stir fry', 'time_minutes': 15, 'price': '6.00',
+             'tags': ['Vegan'], 'ingredients': ['Tofu']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': '4.00',
+             'tags': ['Vegan', ' vegan'], 'ingredients': ['tofu']},
+        ))
+
+        self.assertEqual(Tag.objects.filter(user=self.user).get(), tag)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name='Tofu').count(), 1
+        )
+        self.assertEqual(tag.recipe_set.count(), 2)
+
+    def test_import_csv(self):
+        '''Test importing CSV rows with semicolon separated names'''
+        res = self.upload(
+            'title,time_minutes,price,link,ingredients,tags\n'
+            '"Curry, Thai style",30,7.50,,Rice; Coconut milk,Spicy\n',
+            import_format='csv'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Curry, Thai style')
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Coconut milk', 'Rice']
+        )
+
+    def test_import_csv_quoted_names(self):
+        '''Test that quoted names keep their semicolons'''
+        res = self.upload(
+            'title,time_minutes,price,link,ingredients,tags\n'
+            'Stew,30,7.50,,"""Salt; pepper""; Beef",Dinner\n'
+            'Soup,30,7.50,,"Salt\npepper",Dinner\n',
+            import_format='csv'
+        )
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(
+            [error['row'] for error in res.data['errors']], [2]
+        )
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Beef', 'Salt; pepper']
+        )
+
+    def test_invalid_rows_reported(self):
+        '''Test that invalid rows are skipped and listed by number'''
+        res = self.upload(
+            ndjson({'title': 'Good', 'time_minutes': 5, 'price': '1.00'}) +
+            '{not json\n' +
+            ndjson({'title': 'No price', 'time_minutes': 5})
+        )
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual(
+            [error['row'] for error in res.data['errors']], [2, 3]
+        )
+        self.assertIn('price', res.data['errors'][1]['errors'])
+
+    def test_normalized_name_too_long(self):
+        '''Test that names too long once case folded fail their row'''
+        res = self.upload(ndjson(
+            {'title': 'Strudel', 'time_minutes': 60, 'price': '3.00',
+             'tags': ['ß' * 200]},
+        ))
+
+        self.assertEqual(res.data['failed'], 1)
+        self.assertIn('tags', res.data['errors'][0]['errors'])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_invalid_format(self):
+        '''Test that unknown import formats are rejected'''
+        res = self.upload('', import_format='xml')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batches_update_versions_and_search(self):
+        '''Test that imported recipes bump versions and are searchable'''
+        self.upload(ndjson(
+            {'title': 'Lentil soup', 'time_minutes': 40, 'price': '3.00',
+             'tags': ['Winter']},
+        ))
+
+        version, _ = CollectionVersion.objects.current(
+            self.user.pk, CollectionVersion.RECIPES
+        )
+        self.assertGreater(version, 0)
+        res = self.client.get(
+            reverse('recipe:recipe-list'), {'search': 'winter'}
+        )
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_export_round_trip(self):
+        '''Test that an export imports back into equal recipes'''
+        self.upload(ndjson(
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'tags': ['Spicy'], 'ingredients': ['Rice']},
+        ))
+        # every pass doubles the recipes
+        for export_format, created in (('ndjson', 1), ('csv', 2)):
+            res = self.client.get(EXPORT_URL, {'export_format': export_format})
+            body = b''.join(res.streaming_content).decode()
+
+            res = self.upload(body, import_format=export_format)
+
+            self.assertEqual(res.data['created'], created)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(
+                list(recipe.tags.values_list('name', flat=True)), ['Spicy']
+            )
+
+    def test_csv_round_trip_separator_names(self):
+        '''Test that names holding semicolons survive a CSV round trip'''
+        names = ['Salt; pepper', 'The "best"; really', 'Vegan']
+        self.upload(ndjson(
+            {'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+             'tags': names, 'ingredients': ['Rice; basmati']},
+        ))
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+        body = b''.join(res.streaming_content).decode()
+
+        res = self.upload(body, import_format='csv')
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user)
+                   .values_list('name', flat=True)),
+            names
+        )
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(
+                sorted(recipe.tags.values_list('name', flat=True)), names
+            )
+            self.assertEqual(
+                list(recipe.ingredients.values_list('name', flat=True)),
+                ['Rice; basmati']
+            )
@@ -0,0 +1,213 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def recipe_detail_url(recipe_id):
+    '''Return recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipes(user, count):
+    '''Create recipes, each with two tags and two ingredients'''
+    recipes = []
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(
+            Tag.objects.create(user=user, name=f'Tag {i}a'),
+            Tag.objects.create(user=user, name=f'Tag {i}b'),
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=user, name=f'Ingredient {i}a'),
+            Ingredient.objects.create(user=user, name=f'Ingredient {i}b'),
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class RecipeQueryCountTests(TestCase):
+    '''Test that recipe endpoints run a fixed number of queries'''
+
+    # the collection version for the ETag, the recipes, and one each for
+    # the prefetched ingredients and tags
+    LIST_QUERIES = 4
+    RETRIEVE_QUERIES = 4
+    # validation, the writes, and one flush of stats, search, the change
+    # log and the collection versions; pinned so that a new signal
+    # handler shows up here
+    CREATE_QUERIES = 33
+    PARTIAL_UPDATE_QUERIES = 30
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_count_single_recipe(self):
+        '''Test listing a single recipe'''
+        sample_recipes(self.user, 1)
+
+        with self.assertNumQueries(self.LIST_QUERIES):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_query_count_independent_of_size(self):
+        '''Test that listing many recipes costs the same as listing one'''
+        sample_recipes(self.user, 25)
+
+        with self.assertNumQueries(self.LIST_QUERIES):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 25)
+        for item in res.data['results']:
+            self.assertEqual(len(item['tags']), 2)
+            self.assertEqual(len(item['ingredients']), 2)
+
+    def test_retrieve_query_count(self):
+        '''Test retrieving a recipe with nested tags and ingredients'''
+        recipe = sample_recipes(self.user, 3)[0]
+
+        with self.assertNumQueries(self.RETRIEVE_QUERIES):
+            res = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data['tags']),
+            ['Tag 0a', 'Tag 0b']
+        )
+        self.assertEqual(len(res.data['ingredients']), 2)
+
+    def count_write_queries(self, method, url, related_count):
+        '''Return the queries of a write linking that many tags/ingredients'''
+        # names are unique per user, and this runs twice per test
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}/{related_count}')
+            .id for i in range(related_count)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                user=self.user, name=f'Item {i}/{related_count}'
+            ).id for i in range(related_count)
+        ]
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': tags,
+            'ingredients': ingredients,
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = getattr(self.client, method)(url, payload, format='json')
+
+        self.assertLess(res.status_code, 300)
+        self.assertEqual(sorted(res.data['tags']), tags)
+        return len(queries)
+
+    def test_create_query_count_independent_of_related(self):
+        '''Test that tags and ingredients are validated in bulk'''
+        few = self.count_write_queries('post', RECIPES_URL, 1)
+        many = self.count_write_queries('post', RECIPES_URL, 40)
+
+        self.assertEqual(few, many)
+
+    def test_update_query_count_independent_of_related(self):
+        '''Test that replacing many links costs the same as one'''
+        def url():
+            recipe = Recipe.objects.create(
+                user=self.user, title='Soup', time_minutes=5, price=1
+            )
+            return recipe_detail_url(recipe.id)
+
+        few = self.count_write_queries('put', url(), 1)
+        many = self.count_write_queries('put', url(), 40)
+
+        self.assertEqual(few, many)
+
+    def test_write_updates_derived_data_once(self):
+        '''Test that a write rebuilds stats, search and the log once'''
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}').id
+                for i in range(2)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Item {i}').id
+            for i in range(2)
+        ]
+        derived = {
+            'stats': 'UPDATE "core_recipestats" SET "recipe_count"',
+            'search': 'UPDATE "core_recipe" SET "search_document"',
+            'log': 'INSERT INTO "core_changelog"',
+            'versions': 'UPDATE "core_collectionversion"',
+        }
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': tags,
+            'ingredients': ingredients,
+        }
+
+        for method in ('post', 'patch'):
+            with CaptureQueriesContext(connection) as queries:
+                if method == 'post':
+                    res = self.client.post(RECIPES_URL, payload)
+                    url = recipe_detail_url(res.data['id'])
+                else:
+                    res = self.client.patch(url, {
+                        'time_minutes': 45, 'tags': tags[:1]
+                    })
+
+            self.assertLess(res.status_code, 300)
+            for name, prefix in derived.items():
+                with self.subTest(method=method, derived=name):
+                    self.assertEqual(sum(
+                        query['sql'].startswith(prefix)
+                        for query in queries.captured_queries
+                    ), 1)
+
+    def test_write_query_count(self):
+        '''Test the queries of one recipe create and partial update'''
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}').id
+                for i in range(2)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Item {i}').id
+            for i in range(2)
+        ]
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': tags,
+            'ingredients': ingredients,
+        }
+
+        with self.assertNumQueries(self.CREATE_QUERIES):
+            res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(self.PARTIAL_UPDATE_QUERIES):
+            res = self.client.patch(recipe_detail_url(res.data['id']), {
+                'time_minutes': 45, 'tags': tags[:1]
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title='Sample Recipe', tags=(), ingredients=()):
+    '''Create and return a sample recipe with named tags and ingredients'''
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+    for name in tags:
+        recipe.tags.add(Tag.objects.create(user=user, name=name))
+    for name in ingredients:
+        recipe.ingredients.add(Ingredient.objects.create(user=user, name=name))
+    return recipe
+
+
+class RecipeSearchApiTests(TestCase):
+    '''Test the search parameter of the recipe list'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        '''Return the IDs of the recipes matching the search text'''
+        res = self.client.get(RECIPES_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data['results']]
+
+    def test_search_title_ingredients_and_tags(self):
+        '''Test that titles, ingredient and tag names are searched'''
+        curry = sample_recipe(
+            self.user, 'Thai curry', tags=['Spicy'], ingredients=['Coconut']
+        )
+        sample_recipe(self.user, 'Porridge', ingredients=['Oats'])
+
+        self.assertEqual(self.search('curry'), [curry.id])
+        self.assertEqual(self.search('coconut'), [curry.id])
+        self.assertEqual(self.search('SPICY'), [curry.id])
+
+    def test_every_word_must_match(self):
+        '''Test that results match all of the search words'''
+        curry = sample_recipe(self.user, 'Thai curry', tags=['Spicy'])
+        sample_recipe(self.user, 'Green curry')
+
+        self.assertEqual(self.search('spicy curry'), [curry.id])
+
+    def test_best_matches_first(self):
+        '''Test that results are ordered by relevance'''
+        weak = sample_recipe(
+            self.user, 'Soup with a long title about many other things'
+        )
+        strong = sample_recipe(self.user, 'Soup', tags=['Soup'])
+
+        self.assertEqual(self.search('soup'), [strong.id, weak.id])
+
+    def test_other_users_excluded(self):
+        '''Test that only the user's own recipes are searched'''
+        other_user = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpassword2'
+        )
+        sample_recipe(other_user, 'Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_follows_changes(self):
+        '''Test that renamed tags and removed ingredients are reflected'''
+        recipe = sample_recipe(
+            self.user, 'Stew', tags=['Winter'], ingredients=['Beef']
+        )
+        tag = Tag.objects.get(name='Winter')
+        tag.name = 'Autumn'
+        tag.save()
+        recipe.ingredients.clear()
+
+        self.assertEqual(self.search('autumn'), [recipe.id])
+        self.assertEqual(self.search('winter'), [])
+        self.assertEqual(self.search('beef'), [])
+
+    def test_paginate_ranked_results(self):
+        '''Test that equally ranked results are paged without gaps'''
+        recipes = [sample_recipe(self.user, 'Pie') for i in range(5)]
+
+        ids = []
+        url = f'{RECIPES_URL}?search=pie&page_size=2'
+        while url:
+            res = self.client.get(url)
+            ids += [recipe['id'] for recipe in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, sorted((r.id for r in recipes), reverse=True))
+
+    def test_search_syntax_ignored(self):
+        '''Test that query syntax characters are treated as separators'''
+        recipe = sample_recipe(self.user, 'Fish and chips')
+
+        self.assertEqual(self.search('"fish" (chips*'), [recipe.id])
+        self.assertEqual(self.search('!!!'), [])
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeStats, Tag
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+class RecipeStatsApiTests(TestCase):
+    '''Test the recipe stats endpoint'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        '''Test that authentication is required'''
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats(self):
+        '''Test the counts, sums, averages and histograms'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+        Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=60, price=12.5
+        )
+        recipe.tags.add(tag)
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        Recipe.objects.create(
+            user=other_user, title='Cake', time_minutes=5, price=1
+        )
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['tag_count'], 1)
+        self.assertEqual(res.data['tag_usage'], 1)
+        self.assertEqual(res.data['time_minutes']['sum'], 85)
+        self.assertEqual(res.data['time_minutes']['average'], 42.5)
+        self.assertEqual(str(res.data['price']['average']), '8.75')
+        histogram = res.data['time_minutes']['histogram']
+        self.assertEqual(
+            [bucket['count'] for bucket in histogram],
+            [0, 0, 1, 0, 1, 0, 0, 0]
+        )
+        self.assertEqual(res.data['price']['histogram'][-1], {
+            'max': None, 'count': 0
+        })
+
+    def test_stats_single_query(self):
+        '''Test that stats are read from one stored row'''
+        Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=25, price=5
+        )
+
+        with self.assertNumQueries(1):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+
+    def test_stats_without_row(self):
+        '''Test that a user without stored stats gets computed ones'''
+        RecipeStats.objects.all().delete()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 0)
+        self.assertIsNone(res.data['price']['average'])
@@ -0,0 +1,64 @@
+import os
+import time
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe
+from core.renderers import ORJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+class RenderBenchmark(TestCase):
+    '''Measure rendering throughput of a 10k recipe list
+
+    Compares DRF's stdlib based ``JSONRenderer`` with ``ORJSONRenderer``
+    on the serialized data of one list response. Run with
+    ``RUN_BENCHMARKS=1 python manage.py test recipe``.
+    '''
+
+    RECIPES = 10000
+    ROUNDS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            'bench@gmail.com',
+            'benchpassword'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=i % 120,
+                price=f'{i % 100}.50',
+                link=f'https://example.com/recipes/{i}'
+            )
+            for i in range(cls.RECIPES)
+        )
+
+    def measure(self, renderer, data):
+        '''Return rendered bytes per second and the rendered size'''
+        start = time.perf_counter()
+        for _ in range(self.ROUNDS):
+            content = renderer.render(data, 'application/json', {})
+        elapsed = time.perf_counter() - start
+        return len(content) * self.ROUNDS / elapsed, len(content)
+
+    def test_bytes_per_second(self):
+        '''Report rendering throughput of both renderers'''
+        queryset = Recipe.objects.prefetch_related('tags', 'ingredients')
+        data = RecipeSerializer(queryset, many=True).data
+
+        before, size = self.measure(JSONRenderer(), data)
+        after, _ = self.measure(ORJSONRenderer(), data)
+
+        print(
+            f'\nrendering {self.RECIPES} recipes ({size} bytes): '
+            f'{before / 1e6:.1f} MB/s with JSONRenderer, '
+            f'{after / 1e6:.1f} MB/s with ORJSONRenderer'
+        )
@@ -0,0 +1,200 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import named_cache, reset_named_cache
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def recipe_detail_url(recipe_id):
+    '''Return recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    '''Create and return a sample recipe'''
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RESPONSE_CACHE={'BACKEND': 'local', 'MAX_SIZE': 100})
+class ResponseCacheTests(TestCase):
+    '''Test caching of rendered recipe API responses'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        reset_named_cache('RESPONSE_CACHE')
+        self.cache = named_cache('RESPONSE_CACHE', key_prefix='response:')
+
+    def test_repeated_list_served_from_cache(self):
+        '''Test that a repeated list request skips queries and serializers'''
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        first = self.client.get(RECIPES_URL)
+
+        # only the collection version is looked up
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_detail_served_from_cache(self):
+        '''Test that a repeated detail request is served from the cache'''
+        recipe = sample_recipe(self.user)
+        url = recipe_detail_url(recipe.id)
+        first = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+
+        self.assertEqual(second.content, first.content)
+
+    def test_change_invalidates_cached_response(self):
+        '''Test that a model change is visible on the next request'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'Vegetarian')
+
+    def test_link_change_invalidates_cached_detail(self):
+        '''Test that m2m changes are visible on the next request'''
+        recipe = sample_recipe(self.user)
+        url = recipe_detail_url(recipe.id)
+        self.client.get(url)
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        res = self.client.get(url)
+
+        self.assertEqual(len(json.loads(res.content)['tags']), 1)
+
+    def test_other_recipe_change_keeps_cached_detail(self):
+        '''Test that details are invalidated per recipe'''
+        recipe = sample_recipe(self.user)
+        other = sample_recipe(self.user, title='Other')
+        url = recipe_detail_url(recipe.id)
+        first = self.client.get(url)
+
+        other.title = 'Changed'
+        other.save()
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_attr_change_invalidates_cached_detail(self):
+        '''Test that renamed or relinked tags refresh the recipe detail'''
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        url = recipe_detail_url(recipe.id)
+        self.client.get(url)
+
+        # another recipe changes the rendered count of the tag
+        sample_recipe(self.user, title='Other').tags.add(tag)
+        res = self.client.get(url)
+        self.assertEqual(json.loads(res.content)['tags'][0]['recipe_count'], 2)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(url)
+        self.assertEqual(
+            json.loads(res.content)['tags'][0]['name'], 'Vegetarian'
+        )
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cached_per_host_and_scheme(self):
+        '''Test that absolute links follow the host and scheme asked for'''
+        for i in range(3):
+            sample_recipe(self.user, title=f'Recipe {i}')
+        url = f'{RECIPES_URL}?page_size=1'
+        self.client.get(url)
+
+        res = self.client.get(url, HTTP_HOST='api.example.com')
+        secure = self.client.get(url, secure=True)
+
+        self.assertTrue(json.loads(res.content)['next'].startswith(
+            'http://api.example.com/'
+        ))
+        self.assertTrue(json.loads(secure.content)['next'].startswith(
+            'https://testserver/'
+        ))
+        self.assertEqual(self.cache.stats()['hits'], 0)
+
+    def test_browsable_api_not_cached(self):
+        '''Test that only JSON renders are cached'''
+        self.client.get(TAGS_URL, HTTP_ACCEPT='text/html')
+
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_errors_not_cached(self):
+        '''Test that error responses are not cached'''
+        self.client.get(recipe_detail_url(999))
+
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+
+class CacheStatsApiTests(TestCase):
+    '''Test the cache counters endpoint'''
+
+    URL = reverse('core:caches')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_staff_required(self):
+        '''Test that regular users can't read the counters'''
+        user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(self.URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_counters_listed(self):
+        '''Test that staff users see the counters of each cache'''
+        admin = get_user_model().objects.create_superuser(
+            'admin@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(admin)
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(self.URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('RESPONSE_CACHE', res.data)
+        self.assertIn('evictions', res.data['RESPONSE_CACHE'])
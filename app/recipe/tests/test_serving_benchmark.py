@@ -0,0 +1,106 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient, Client, TransactionTestCase, override_settings
+)
+from django.urls import include, path
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe
+from recipe.async_views import async_read_urls
+from recipe.urls import router
+
+
+urlpatterns = [
+    path('api/recipe/', include((router.urls, 'recipe'))),
+    path('api/async/', include((async_read_urls(router.urls), 'async'))),
+]
+
+
+def p99(latencies):
+    '''Return the 99th percentile of the latencies'''
+    latencies = sorted(latencies)
+    return latencies[int(0.99 * (len(latencies) - 1))]
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+# an empty response cache makes every request render the recipe list
+@override_settings(ROOT_URLCONF=__name__, RESPONSE_CACHE={'MAX_SIZE': 0})
+class ServingBenchmark(TransactionTestCase):
+    '''Compare the WSGI path with the async read path under load
+
+    Sends the same recipe list requests through the WSGI handler from a
+    thread pool and through the ASGI handler from concurrent tasks, and
+    reports requests per second and p99 latency for both. Run with
+    ``RUN_BENCHMARKS=1 python manage.py test recipe``.
+    '''
+
+    RECIPES = 200
+    REQUESTS = 400
+    CONCURRENCY = 16
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            'bench@gmail.com',
+            'benchpassword'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(self.RECIPES)
+        )
+        self.token = Token.objects.create(user=user).key
+
+    def wsgi_load(self, url):
+        '''Return latencies and elapsed time of the WSGI path'''
+        def fetch(_):
+            start = time.perf_counter()
+            res = Client().get(url, HTTP_AUTHORIZATION=f'Token {self.token}')
+            self.assertEqual(res.status_code, 200)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.CONCURRENCY) as pool:
+            latencies = list(pool.map(fetch, range(self.REQUESTS)))
+        return latencies, time.perf_counter() - start
+
+    async def asgi_load(self, url):
+        '''Return latencies and elapsed time of the async read path'''
+        client = AsyncClient()
+        slots = asyncio.Semaphore(self.CONCURRENCY)
+
+        async def fetch():
+            async with slots:
+                start = time.perf_counter()
+                res = await client.get(
+                    url, authorization=f'Token {self.token}'
+                )
+                self.assertEqual(res.status_code, 200)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *(fetch() for _ in range(self.REQUESTS))
+        )
+        return latencies, time.perf_counter() - start
+
+    def test_requests_per_second(self):
+        '''Report throughput and p99 latency of both serving paths'''
+        query = f'?page_size={self.RECIPES}'
+        wsgi, wsgi_elapsed = self.wsgi_load(f'/api/recipe/recipes/{query}')
+        asgi, asgi_elapsed = asyncio.run(
+            self.asgi_load(f'/api/async/recipes/{query}')
+        )
+
+        print(
+            f'\n{self.REQUESTS} requests, concurrency {self.CONCURRENCY}: '
+            f'WSGI {self.REQUESTS / wsgi_elapsed:.0f} req/s '
+            f'p99 {p99(wsgi) * 1000:.1f} ms, '
+            f'ASGI {self.REQUESTS / asgi_elapsed:.0f} req/s '
+            f'p99 {p99(asgi) * 1000:.1f} ms'
+        )
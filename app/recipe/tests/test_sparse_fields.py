@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def recipe_detail_url(recipe_id):
+    '''Return recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsApiTests(TestCase):
+    '''Test selecting and expanding fields with query params'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Tofu'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Stir fry',
+            time_minutes=15,
+            price=6.00,
+            link='https://example.com/stir-fry'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_fields_trim_output_and_columns(self):
+        '''Test that only the requested fields are rendered and loaded'''
+        # the collection version and the recipes, nothing prefetched
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Stir fry'}]
+        )
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"link"', queries[1]['sql'])
+
+    def test_unrequested_relation_not_prefetched(self):
+        '''Test that only requested relations are prefetched'''
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        self.assertEqual(
+            res.data['results'], [{'title': 'Stir fry', 'tags': [self.tag.id]}]
+        )
+
+    def test_expand_tags(self):
+        '''Test that expanded relations render as objects'''
+        res = self.client.get(RECIPES_URL, {'expand': 'tags'})
+
+        item = res.data['results'][0]
+        self.assertEqual(item['tags'], [
+            {'id': self.tag.id, 'name': 'Vegan', 'recipe_count': 1}
+        ])
+        self.assertEqual(item['ingredients'], [self.ingredient.id])
+        self.assertEqual(item['link'], 'https://example.com/stir-fry')
+
+    def test_expand_with_fields(self):
+        '''Test expanding a relation within a sparse fieldset'''
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id,ingredients', 'expand': 'ingredients'}
+        )
+
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'ingredients': [
+                {'id': self.ingredient.id, 'name': 'Tofu', 'recipe_count': 1}
+            ],
+        }])
+
+    def test_retrieve_fields(self):
+        '''Test selecting fields of a recipe detail'''
+        res = self.client.get(
+            recipe_detail_url(self.recipe.id), {'fields': 'title,tags'}
+        )
+
+        self.assertEqual(res.data, {
+            'title': 'Stir fry',
+            'tags': [
+                {'id': self.tag.id, 'name': 'Vegan', 'recipe_count': 1}
+            ],
+        })
+
+    def test_paginates_with_sparse_fields(self):
+        '''Test that pages seek correctly without the ordering fields'''
+        Recipe.objects.create(
+            user=self.user, title='Another', time_minutes=5, price=1.00
+        )
+
+        res = self.client.get(RECIPES_URL, {'fields': 'id', 'page_size': 1})
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(list(res.data['results'][0]), ['id'])
+
+    def test_attr_fields(self):
+        '''Test selecting fields of tags'''
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.data['results'], [{'name': 'Vegan'}])
+
+    def test_unknown_fields_rejected(self):
+        '''Test that unknown field names are rejected'''
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_render_all_fields(self):
+        '''Test that the field params don't apply to writes'''
+        res = self.client.post(
+            f'{RECIPES_URL}?fields=id',
+            {'title': 'Soup', 'time_minutes': 5, 'price': '1.00',
+             'tags': [], 'ingredients': []},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', res.data)
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLog, Ingredient, Recipe, Tag
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def sample_recipe(user, title='Curry'):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+class SyncApiTests(TestCase):
+    '''Test the delta sync endpoint'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_auth_required(self):
+        '''Test that authentication is required'''
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync(self):
+        '''Test that syncing without a token returns every object'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        sample_recipe(other_user)
+
+        data = self.sync()
+
+        self.assertFalse(data['has_more'])
+        self.assertEqual(
+            [item['id'] for item in data['recipes']['changed']], [recipe.id]
+        )
+        self.assertEqual(data['recipes']['changed'][0]['tags'], [tag.id])
+        self.assertEqual(
+            data['tags']['changed'], [{'id': tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(data['ingredients'], {'changed': [], 'deleted': []})
+
+    def test_changes_since_token(self):
+        '''Test that only changes after the token are returned'''
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        curry = sample_recipe(self.user)
+        stew = sample_recipe(self.user, title='Stew')
+        stew.ingredients.add(salt)
+        token = self.sync()['token']
+
+        salt_id = salt.id
+        tag.recipe_set.add(curry)
+        salt.delete()
+        Recipe.objects.filter(pk=curry.pk).delete()
+        data = self.sync(token)
+
+        self.assertEqual(
+            [item['id'] for item in data['recipes']['changed']], [stew.id]
+        )
+        self.assertEqual(data['recipes']['changed'][0]['ingredients'], [])
+        self.assertEqual(data['recipes']['deleted'], [curry.id])
+        self.assertEqual(data['ingredients']['deleted'], [salt_id])
+        self.assertEqual(data['tags'], {'changed': [], 'deleted': []})
+        self.assertEqual(self.sync(data['token'])['recipes']['changed'], [])
+
+    def test_pages(self):
+        '''Test that page_size bounds the changes of a response'''
+        recipes = [sample_recipe(self.user, f'Recipe {i}') for i in range(5)]
+
+        first = self.sync(page_size=3)
+        second = self.sync(first['token'], page_size=3)
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(
+            [item['id'] for data in (first, second)
+             for item in data['recipes']['changed']],
+            [recipe.id for recipe in recipes]
+        )
+
+    def test_log_keeps_latest_change(self):
+        '''Test that a change replaces the entry of its object'''
+        recipe = sample_recipe(self.user)
+        recipe_id = recipe.id
+        recipe.title = 'Green curry'
+        recipe.save()
+        recipe.delete()
+
+        entry = ChangeLog.objects.get()
+        self.assertEqual(
+            (entry.kind, entry.object_id, entry.deleted),
+            (ChangeLog.RECIPE, recipe_id, True)
+        )
+
+    def test_tokens_number_user_changes(self):
+        '''Test that tokens count the user's changes, not everyone's'''
+        other_user = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpassword'
+        )
+        sample_recipe(self.user)
+        token = self.sync()['token']
+
+        sample_recipe(other_user)
+        sample_recipe(self.user, 'Stew')
+
+        self.assertEqual(self.sync(token)['token'], token + 1)
+
+    def test_query_count_independent_of_account_size(self):
+        '''Test that a sync costs the same for small and large accounts'''
+        def count_sync_queries(recipe_count):
+            Recipe.objects.all().delete()
+            for i in range(recipe_count):
+                sample_recipe(self.user, f'Recipe {i}')
+            token = self.sync()['token']
+            sample_recipe(self.user, 'Latest')
+            with self.assertNumQueries(4) as queries:
+                self.sync(token)
+            return len(queries)
+
+        self.assertEqual(count_sync_queries(2), count_sync_queries(30))
+
+    def test_invalid_token(self):
+        '''Test that malformed tokens are rejected'''
+        res = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
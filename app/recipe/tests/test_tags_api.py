@@ -1,11 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Recipe
 
 from recipe.serializers import TagSerializer
 
@@ -48,7 +50,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         '''Test that tags returned are for the authenticated user'''
@@ -66,8 +68,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         '''Test that tags are created successfully'''
@@ -90,3 +92,102 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_tag_normalized_name_too_long(self):
+        '''Test that names longer once case folded are rejected'''
+        # 200 characters, but "ss" each when normalized
+        payload = {'name': 'ß' * 200}
+
+        res = self.client.post(TAGS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_retrieve_tags_assigned_to_recipes(self):
+        '''Test filtering tags by those assigned to recipes'''
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            title='Coriander eggs on toast',
+            time_minutes=10,
+            price=5.00,
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        names = [item['name'] for item in res.data['results']]
+        self.assertIn(tag1.name, names)
+        self.assertNotIn(tag2.name, names)
+
+    def test_retrieve_tags_assigned_unique(self):
+        '''Test filtering tags by assigned returns unique items'''
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe1 = Recipe.objects.create(
+            title='Pancakes',
+            time_minutes=5,
+            price=3.00,
+            user=self.user
+        )
+        recipe2 = Recipe.objects.create(
+            title='Porridge',
+            time_minutes=3,
+            price=2.00,
+            user=self.user
+        )
+        recipe1.tags.add(tag)
+        recipe2.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_order_by_recipe_count(self):
+        '''Test listing tags by how many recipes use them'''
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Spicy')
+        ]
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                title=f'Recipe {i}', time_minutes=5, price=1.00,
+                user=self.user
+            )
+            recipe.tags.set(tags[1:i + 1])
+
+        res = self.client.get(
+            TAGS_URL, {'ordering': '-recipe_count', 'page_size': 2}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(t['name'], t['recipe_count']) for t in res.data['results']],
+            [('Quick', 2), ('Spicy', 1)]
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [(t['name'], t['recipe_count']) for t in res.data['results']],
+            [('Vegan', 0)]
+        )
+
+    def test_order_by_recipe_count_without_join(self):
+        '''Test that the counts are read without touching the links'''
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL, {'ordering': '-recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through = Recipe.tags.through._meta.db_table
+        self.assertFalse(
+            [query for query in queries if through in query['sql']]
+        )
+
+    def test_invalid_ordering(self):
+        '''Test that unknown orderings are rejected'''
+        res = self.client.get(TAGS_URL, {'ordering': 'user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
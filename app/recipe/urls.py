@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from recipe import views
+from recipe.async_views import async_read_urls
 
 router = DefaultRouter()
 router.register('ingredients', views.IngredientViewSet)
@@ -10,6 +12,12 @@ router.register('tags', views.TagViewSet)
 
 app_name = 'recipe'
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('stats/', views.StatsView.as_view(), name='stats'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('', include(router_urls)),
 ]
@@ -1,26 +1,182 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+import codecs
+
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Count, Exists, Max, OuterRef, Prefetch, Subquery
+)
+from django.http import StreamingHttpResponse
+
+from rest_framework import status, viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Ingredient, Recipe, Tag
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ReplicaReadMixin
+from core.models import (
+    CollectionVersion, Ingredient, Recipe, Tag, normalize_name
+)
+from core.search import SEARCH_RANK, search_recipes
+from core.signals import deferred_updates
+from core.stats import stats_summary
+from core.throttling import RecipeReadThrottle, RecipeWriteThrottle
 from recipe import serializers
+from recipe.export import EXPORT_FORMATS, iter_recipes
+from recipe.imports import IMPORT_FORMATS, RecipeImporter
+from recipe.mixins import (
+    BulkModelMixin, FieldSelectionMixin, ResponseCacheMixin
+)
+from recipe.pagination import KeysetPagination
+from recipe.sync import build_sync
+
+
+def _params_to_ints(qs, param):
+    '''Convert a comma separated string of IDs to a list of integers'''
+    try:
+        return [int(str_id) for str_id in qs.split(',')]
+    except ValueError:
+        raise ValidationError({param: 'Expected comma separated IDs'})
+
+
+NAME_TAKEN = 'Names must be unique, ignoring case and spacing.'
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            FieldSelectionMixin,
+                            ResponseCacheMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
-                            mixins.CreateModelMixin):
+                            mixins.CreateModelMixin,
+                            BulkModelMixin):
     '''Base viewset for user owned recipe attributes'''
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeReadThrottle, RecipeWriteThrottle)
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
+    # choices of ?ordering=, each served by an index of the model
+    orderings = {
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+        'recipe_count': ('recipe_count', 'id'),
+        '-recipe_count': ('-recipe_count', '-id'),
+    }
+
+    def get_ordering(self):
+        '''Return the ordering chosen with ``?ordering=``'''
+        choice = self.request.query_params.get('ordering')
+        if choice is None:
+            return self.ordering
+        try:
+            return self.orderings[choice]
+        except KeyError:
+            raise ValidationError({
+                'ordering': f'Expected one of {", ".join(self.orderings)}'
+            })
 
     def get_queryset(self):
         '''Return recipe attr object for the authenticated user'''
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        self.ordering = self.get_ordering()
+        queryset = self.queryset.filter(user=self.request.user)
+        assigned_only = self.request.query_params.get('assigned_only')
+        if assigned_only and assigned_only != '0':
+            model = self.queryset.model
+            assigned = model.recipe_set.through.objects.filter(
+                **{model._meta.model_name: OuterRef('pk')}
+            )
+            queryset = queryset.filter(Exists(assigned))
+        if self.action == 'list':
+            queryset = self.sparse_queryset(queryset)
+        return queryset.order_by(*self.ordering)
+
+    def create(self, request, *args, **kwargs):
+        '''Create an object, or return the one that has its name already'''
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = self.perform_create(serializer)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            headers=self.get_success_headers(serializer.data)
+        )
 
     def perform_create(self, serializer):
-        '''Create a new recipe attr object'''
-        serializer.save(user=self.request.user)
+        '''Create a new recipe attr object unless the name is taken
+
+        Returns whether it was created. Otherwise the serializer holds the
+        existing object, so repeating a create is harmless. The unique
+        (user, normalized_name) index settles concurrent creates.
+        '''
+        existing = self.queryset.filter(
+            user=self.request.user,
+            normalized_name=normalize_name(serializer.validated_data['name'])
+        )
+        serializer.instance = existing.first()
+        if serializer.instance is not None:
+            return False
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # a concurrent request created it first
+            serializer.instance = existing.get()
+            return False
+        return True
+
+    def _check_names(self, serializer):
+        '''Reject the items whose names other items or objects have
+
+        Errors are reported per item, like the other bulk validation.
+        Items keeping their name are checked against the renamed ones.
+        '''
+        instances = serializer.instance or []
+        items = serializer.validated_data
+        kept = {
+            instance.normalized_name
+            for instance, attrs in zip(instances, items)
+            if 'name' not in attrs
+        }
+        names = [
+            normalize_name(attrs['name']) if 'name' in attrs else None
+            for attrs in items
+        ]
+        taken = set(
+            self.queryset.filter(
+                user=self.request.user, normalized_name__in=names
+            ).exclude(pk__in=[instance.pk for instance in instances])
+            .values_list('normalized_name', flat=True)
+        ) | kept
+        errors = []
+        for name in names:
+            if name is not None and name in taken:
+                errors.append({'name': [NAME_TAKEN]})
+            else:
+                errors.append({})
+            taken.add(name)
+        if any(errors):
+            raise ValidationError(errors)
+
+    def _save_named(self, serializer, save):
+        self._check_names(serializer)
+        try:
+            with transaction.atomic():
+                save()
+        except IntegrityError:
+            # a concurrent request took a name since the check
+            raise ValidationError({'name': [NAME_TAKEN]})
+
+    def perform_bulk_create(self, serializer):
+        '''Create the objects, rejecting names that are taken'''
+        self._save_named(
+            serializer, lambda: serializer.save(user=self.request.user)
+        )
+
+    def perform_bulk_update(self, serializer):
+        '''Save the objects, rejecting names that are taken'''
+        self._save_named(serializer, serializer.save)
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -28,19 +184,107 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    collection = CollectionVersion.INGREDIENTS
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    FieldSelectionMixin,
+                    ResponseCacheMixin,
+                    viewsets.ModelViewSet,
+                    BulkModelMixin):
     '''Manage recipes in the database'''
 
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    collection = CollectionVersion.RECIPES
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeReadThrottle, RecipeWriteThrottle)
+    pagination_class = KeysetPagination
+    ordering = ('-title', '-id')
+    export_chunk_size = 500
+    import_batch_size = 1000
+
+    def _filter_related(self, queryset, field_name):
+        '''Filter recipes by the IDs given in the field's query param
+
+        Matches go through the M2M table in a single subquery: ``any``
+        (the default) keeps recipes linked to at least one of the IDs,
+        ``all`` keeps recipes linked to every one of them.
+        '''
+        param = self.request.query_params.get(field_name)
+        if not param:
+            return queryset
+
+        ids = set(_params_to_ints(param, field_name))
+        through = getattr(Recipe, field_name).through
+        target = Recipe._meta.get_field(field_name).m2m_reverse_name()
+        links = through.objects.filter(**{f'{target}__in': ids})
+
+        match = self.request.query_params.get('match', 'any')
+        if match == 'all':
+            links = links.values('recipe_id') \
+                .annotate(matched=Count(target)) \
+                .filter(matched=len(ids))
+        elif match != 'any':
+            raise ValidationError({'match': 'Expected "any" or "all"'})
+
+        return queryset.filter(id__in=links.values('recipe_id'))
 
     def get_queryset(self):
         '''Return recipes for the authenticated user'''
-        return self.queryset.filter(user=self.request.user).order_by('-title')
+        queryset = self.queryset.filter(user=self.request.user)
+        queryset = self._filter_related(queryset, 'tags')
+        queryset = self._filter_related(queryset, 'ingredients')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+            # best matches first, paginated by rank
+            self.ordering = (f'-{SEARCH_RANK}', '-id')
+        if self.action in ('list', 'retrieve'):
+            queryset = self._prefetch_requested(
+                self.sparse_queryset(queryset)
+            )
+        elif self.action in ('bulk', 'bulk_update'):
+            queryset = self._prefetch_requested(queryset)
+        return queryset.order_by(*self.ordering)
+
+    def _prefetch_requested(self, queryset):
+        '''Prefetch the tags and ingredients the response renders'''
+        fields, expand = self.get_sparse_fieldset()
+        for field_name, model in (('ingredients', Ingredient),
+                                  ('tags', Tag)):
+            if fields is not None and field_name not in fields:
+                continue
+            if self.action == 'retrieve' or field_name in expand:
+                # nested serializers render full rows
+                queryset = queryset.prefetch_related(field_name)
+            else:
+                # the list serializer only renders related primary keys
+                queryset = queryset.prefetch_related(
+                    Prefetch(field_name, queryset=model.objects.only('id'))
+                )
+        return queryset
+
+    def object_updated_at(self, queryset):
+        '''Return when the recipe or a tag or ingredient it renders changed
+
+        The signals stamp a recipe whose links change, and an attribute
+        whose name or recipe count changes.
+        '''
+        row = queryset.order_by().values_list(
+            'updated_at',
+            Subquery(self._last_updated('tags')),
+            Subquery(self._last_updated('ingredients')),
+        ).first()
+        return max(filter(None, row)) if row else None
+
+    def _last_updated(self, field_name):
+        through = getattr(Recipe, field_name).through
+        target = Recipe._meta.get_field(field_name).m2m_reverse_field_name()
+        return through.objects.filter(recipe=OuterRef('pk')).order_by() \
+            .values('recipe').annotate(last=Max(f'{target}__updated_at')) \
+            .values('last')
 
     def get_serializer_class(self):
         '''Return appropriate serializer class'''
@@ -49,8 +293,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def perform_create(self, serializer):
-        '''Create a new recipe'''
-        serializer.save(user=self.request.user)
+        '''Create a new recipe, updating derived data once'''
+        with deferred_updates():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        '''Save a recipe, updating derived data once'''
+        with deferred_updates():
+            serializer.save()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        '''Stream every matching recipe as NDJSON or CSV
+
+        Recipes come in ID order; ``after`` resumes an interrupted export
+        after the last ID received. The list filters apply as well.
+        '''
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({
+                'export_format': f'Expected one of {", ".join(EXPORT_FORMATS)}'
+            })
+        try:
+            after = int(request.query_params.get('after', 0))
+        except ValueError:
+            raise ValidationError({'after': 'Expected a recipe ID'})
+
+        queryset = self.get_queryset().filter(id__gt=after)
+        # pin the database now, the rows are read after the view returned
+        queryset = queryset.using(queryset.db)
+        lines, content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            lines(iter_recipes(queryset, self.export_chunk_size)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{extension}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import',
+            url_name='import')
+    def import_recipes(self, request):
+        '''Create recipes from an NDJSON or CSV upload in large batches
+
+        The body is parsed while it is read, in the format given by
+        ``import_format``. Tags and ingredients are referenced by name and
+        created when the user has none of that name. Each batch commits on
+        its own; invalid rows are skipped and listed in the report.
+        '''
+        import_format = request.query_params.get('import_format', 'ndjson')
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationError({
+                'import_format': f'Expected one of {", ".join(IMPORT_FORMATS)}'
+            })
+
+        lines = codecs.iterdecode(request.stream or (), 'utf-8-sig')
+        importer = RecipeImporter(request.user, self.import_batch_size)
+        try:
+            report = importer.run(IMPORT_FORMATS[import_format](lines))
+        except UnicodeDecodeError:
+            raise ParseError('Expected a UTF-8 encoded body')
+        return Response(report, status=status.HTTP_201_CREATED)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -58,3 +361,50 @@ class TagViewSet(BaseRecipeAttrViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    collection = CollectionVersion.TAGS
+
+
+class StatsView(ReplicaReadMixin, APIView):
+    '''Report the recipe counts, sums and histograms of the user'''
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeReadThrottle,)
+
+    def get(self, request, format=None):
+        '''Return the stored stats, a single row lookup'''
+        return Response(stats_summary(request.user.pk))
+
+
+class SyncView(ReplicaReadMixin, APIView):
+    '''Report the recipes, tags and ingredients changed since a token
+
+    ``?since=`` takes the token of the previous sync; without it every
+    object is returned. ``?page_size=`` bounds the changes per response.
+    '''
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeReadThrottle,)
+    page_size = 500
+    max_page_size = 1000
+
+    def _int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = -1
+        if value < 0:
+            raise ValidationError({name: 'Expected a non-negative integer'})
+        return min(value, maximum) if maximum else value
+
+    def get(self, request, format=None):
+        '''Return a page of changes and the token to continue from'''
+        token = self._int_param('since', 0)
+        page_size = self._int_param(
+            'page_size', self.page_size, self.max_page_size
+        ) or self.page_size
+        return Response(build_sync(request.user, token, page_size))
@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model, authenticate
 # from django.utils.translation import ugettext_lazy as _
 
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
 
+from core.hashers import PasswordHashTimeout
+from core.timing import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Serializer for the user object'''
 
     class Meta:
@@ -43,11 +46,15 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        try:
+            user = authenticate(
+                request=self.context.get('request'),
+                username=email,
+                password=password
+            )
+        except PasswordHashTimeout:
+            # every hash worker is busy, ask the client to back off
+            raise exceptions.Throttled()
         if not user:
             msg = ('Unable to authenticate with credentials provided')
             raise serializers.ValidationError(msg, code='authentication')
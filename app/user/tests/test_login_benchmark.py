@@ -0,0 +1,53 @@
+import os
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase
+
+from core import hashers
+
+
+DEFAULT_HASHER = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+
+
+@skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+class LoginBenchmark(TestCase):
+    '''Measure logins per second per core with the configured hasher
+
+    Compares Django's default PBKDF2 hasher against the first entry of
+    PASSWORD_HASHERS, running one login at a time so the figures are per
+    core. Run with ``RUN_BENCHMARKS=1 python manage.py test user``.
+    '''
+
+    LOGINS = 20
+
+    def measure(self, hasher):
+        '''Return logins per second for users hashed with the hasher'''
+        with self.settings(PASSWORD_HASHERS=[hasher]):
+            get_user_model().objects.create_user(
+                'bench@gmail.com',
+                'benchpassword'
+            )
+            start = time.perf_counter()
+            for _ in range(self.LOGINS):
+                user = authenticate(
+                    username='bench@gmail.com',
+                    password='benchpassword'
+                )
+                self.assertIsNotNone(user)
+            elapsed = time.perf_counter() - start
+        get_user_model().objects.filter(email='bench@gmail.com').delete()
+        return self.LOGINS / elapsed
+
+    def test_logins_per_second(self):
+        '''Report login throughput before and after hasher tuning'''
+        before = self.measure(DEFAULT_HASHER)
+        after = self.measure(settings.PASSWORD_HASHERS[0])
+
+        print(
+            f'\nlogins/sec/core: {before:.1f} with {DEFAULT_HASHER}, '
+            f'{after:.1f} with {settings.PASSWORD_HASHERS[0]} '
+            f'(hash workers: {hashers.get_hash_pool()._max_workers})'
+        )